@@ -1,16 +1,57 @@
 from django.contrib.auth.backends import ModelBackend
 from django.db.models import Q
+from django.db.models.functions import Lower
 from .models import User
+from .ratelimit import clear_login_failures, login_blocked, record_login_failure
+from .user_cache import get_cached_user
+
+
+def find_login_user(identifier):
+    """
+    The user an identifier names: username, then email (case-insensitive),
+    then linked member id, resolved in one query over indexed columns.
+    """
+    identifier = (identifier or '').strip()
+    if not identifier:
+        return None
+    lookup = Q(username=identifier) | Q(email_lower=identifier.lower())
+    if identifier.isdigit():
+        lookup |= Q(member_id=int(identifier))
+    candidates = list(User._default_manager.alias(email_lower=Lower('email')).filter(lookup)[:3])
+
+    def rank(user):
+        if user.username == identifier:
+            return 0
+        return 1 if user.email.lower() == identifier.lower() else 2
+    return min(candidates, key=rank, default=None)
+
 
 class MultiFieldAuthBackend(ModelBackend):
+    """
+    Log in with a username, email or member id, checking exactly one
+    password hash per attempt, and refuse attempts over the failed-login
+    limits (accounts/ratelimit.py) without hashing at all. The user behind
+    a session is read from the hydrated user cache (accounts/user_cache.py).
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            user = User.objects.get(
-                Q(username=username) |
-                Q(email=username) |
-                Q(member_id=username)
-            )
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
             return None
+        if login_blocked(request, username):
+            return None
+
+        user = find_login_user(username)
+        if user is None:
+            # Hash anyway so unknown identifiers take as long as wrong passwords
+            User().set_password(password)
+        elif user.check_password(password) and self.user_can_authenticate(user):
+            clear_login_failures(request, username)
+            return user
+        record_login_failure(request, username)
+        return None
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:38
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_claimtoken'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('families', '0026_alter_deceasedmember_photo_alter_familymedia_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='accounts_user_email_lower_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 
 class User(AbstractUser):
     # 2. USER AUTHENTICATION
@@ -30,6 +31,12 @@ class User(AbstractUser):
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ['email'] # removed member_id from required as it's a FK now, usually set programmatically
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive email login (auth_backend.find_login_user)
+            models.Index(Lower('email'), name='accounts_user_email_lower_idx'),
+        ]
+
 class InviteToken(models.Model):
     """Legacy invite token — still used for general signup invites."""
     token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
@@ -0,0 +1,79 @@
+"""
+Failed-login limits, kept in the cache.
+
+Failures are counted per identifier (whatever was typed: username, email
+or member id) and per client IP in fixed windows. Once either count
+reaches its limit, further attempts are refused without checking the
+password, so a credential-stuffing burst costs a cache lookup per request
+instead of a password hash. A successful login clears the identifier's
+count.
+
+Limits are settings.LOGIN_RATE_LIMITS: {'identifier': (failures, seconds),
+'ip': (failures, seconds)}. The client IP honours REST_FRAMEWORK's
+NUM_PROXIES, as DRF's throttles do.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_LIMITS = {'identifier': (5, 15 * 60), 'ip': (30, 15 * 60)}
+
+
+def _limits():
+    return {**DEFAULT_LIMITS, **getattr(settings, 'LOGIN_RATE_LIMITS', {})}
+
+
+def _scopes(request, identifier):
+    """(scope, value) pairs counted for this attempt."""
+    scopes = []
+    if identifier:
+        normalized = str(identifier).strip().lower().encode()
+        scopes.append(('identifier', hashlib.sha256(normalized).hexdigest()))
+    if request is not None:
+        scopes.append(('ip', BaseThrottle().get_ident(request)))
+    return scopes
+
+
+def _key(scope, value, window, now):
+    return f"login-fail:{scope}:{value}:{int(now // window)}"
+
+
+def login_blocked(request, identifier):
+    """Seconds until another attempt is allowed, or 0 when it is allowed now."""
+    now = time.time()
+    limits = _limits()
+    keys = {}
+    for scope, value in _scopes(request, identifier):
+        keys[_key(scope, value, limits[scope][1], now)] = limits[scope]
+    counts = cache.get_many(keys)
+    waits = [
+        window - now % window
+        for key, (limit, window) in keys.items()
+        if counts.get(key, 0) >= limit
+    ]
+    return int(max(waits)) + 1 if waits else 0
+
+
+def record_login_failure(request, identifier):
+    now = time.time()
+    limits = _limits()
+    for scope, value in _scopes(request, identifier):
+        window = limits[scope][1]
+        key = _key(scope, value, window, now)
+        # add() then incr() keeps the count atomic on shared caches
+        cache.add(key, 0, timeout=window)
+        try:
+            cache.incr(key)
+        except ValueError:   # expired between the two calls
+            cache.add(key, 1, timeout=window)
+
+
+def clear_login_failures(request, identifier):
+    now = time.time()
+    limits = _limits()
+    for scope, value in _scopes(request, identifier):
+        if scope == 'identifier':
+            cache.delete(_key(scope, value, limits[scope][1], now))
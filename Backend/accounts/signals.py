@@ -1,6 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import User
+from .user_cache import invalidate_users
 from families.models import FamilyMember, FamilyHead
 
 @receiver(post_save, sender=User)
@@ -19,3 +20,23 @@ def sync_user_to_family_head(sender, instance, created, **kwargs):
                 family_head.save()
         except FamilyHead.DoesNotExist:
             pass
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, update_fields=None, **kwargs):
+    """Drop the user, and their guardian's managed-member list (has_account), from the user cache."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    guardian_ids = []
+    if instance.member_id:
+        guardian_ids = FamilyMember.objects.filter(pk=instance.member_id).values_list('created_by_id', flat=True)
+    invalidate_users(instance.pk, *guardian_ids)
+
+
+@receiver(post_save, sender=FamilyMember)
+@receiver(post_delete, sender=FamilyMember)
+def invalidate_cached_member_users(sender, instance, **kwargs):
+    """The member's own user and their guardian both show it."""
+    user_ids = User.objects.filter(member_id=instance.pk).values_list('pk', flat=True)
+    invalidate_users(instance.created_by_id, *user_ids)
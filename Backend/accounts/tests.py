@@ -3,11 +3,15 @@ Comprehensive tests for the accounts app.
 Covers: User creation, login (success/fail/email/member_id), signup with tokens,
         Give Access flow, Claim Account flow, Go Independent flow, CSRF init.
 """
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
 from families.models import Family, FamilyMember
 from rest_framework.test import APIClient
 import datetime
+import json
 from .models import InviteToken, ClaimToken
 
 User = get_user_model()
@@ -43,6 +47,7 @@ class LoginTests(TestCase):
     """Test login endpoint with various identifiers."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.family = Family.objects.create(sl_no="1", branch="Main", member_no="FAM-LOGIN-001")
         self.member = FamilyMember.objects.create(
@@ -75,6 +80,63 @@ class LoginTests(TestCase):
         res = self.client.post('/api/auth/login/', {"identifier": "loginuser"}, format='json')
         self.assertEqual(res.status_code, 400)
 
+    def test_login_with_member_id_and_email_case(self):
+        for identifier in (str(self.member.pk), "LOGIN@Example.com"):
+            res = self.client.post('/api/auth/login/', {"identifier": identifier, "password": "ComplexPass123!"}, format='json')
+            self.assertEqual(res.status_code, 200, identifier)
+
+    def test_one_lookup_and_one_hash_per_attempt(self):
+        from accounts.auth_backend import find_login_user
+        with self.assertNumQueries(1):
+            self.assertEqual(find_login_user("login@example.com"), self.user)
+
+        encode = PBKDF2PasswordHasher.encode
+        for identifier, password in (("loginuser", "wrong"), ("nobody", "any"), ("loginuser", "ComplexPass123!")):
+            with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=encode) as hashed:
+                self.client.post('/api/auth/login/', {"identifier": identifier, "password": password}, format='json')
+            self.assertEqual(hashed.call_count, 1, identifier)
+
+    def test_lookup_uses_indexes(self):
+        from django.db import connection
+        from django.db.models import Q
+        from django.db.models.functions import Lower
+        qs = User.objects.alias(email_lower=Lower('email')).filter(
+            Q(username='x') | Q(email_lower='x') | Q(member_id=1)
+        )
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('accounts_user_email_lower_idx', plan)
+        self.assertNotIn('SCAN', plan.replace('MULTI-INDEX', ''))
+
+    @override_settings(LOGIN_RATE_LIMITS={'identifier': (3, 60), 'ip': (5, 60)})
+    def test_failed_logins_are_limited(self):
+        for _ in range(3):
+            self.client.post('/api/auth/login/', {"identifier": "loginuser", "password": "wrong"}, format='json')
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode') as hashed, self.assertLogs('accounts.views', 'WARNING'):
+            res = self.client.post('/api/auth/login/', {"identifier": "LoginUser ", "password": "ComplexPass123!"}, format='json')
+        self.assertEqual(res.status_code, 429)
+        self.assertGreater(int(res['Retry-After']), 0)
+        hashed.assert_not_called()
+
+        # Other identifiers still work until the IP's own limit is used up
+        res = self.client.post('/api/auth/login/', {"identifier": "nobody", "password": "x"}, format='json')
+        self.assertEqual(res.status_code, 400)
+        self.client.post('/api/auth/login/', {"identifier": "nobody2", "password": "x"}, format='json')
+        with self.assertLogs('accounts.views', 'WARNING'):
+            res = self.client.post('/api/auth/login/', {"identifier": "nobody3", "password": "x"}, format='json')
+        self.assertEqual(res.status_code, 429)
+
+    @override_settings(LOGIN_RATE_LIMITS={'identifier': (3, 60)})
+    def test_success_clears_identifier_failures(self):
+        for _ in range(2):
+            self.client.post('/api/auth/login/', {"identifier": "loginuser", "password": "wrong"}, format='json')
+        self.client.post('/api/auth/login/', {"identifier": "loginuser", "password": "ComplexPass123!"}, format='json')
+        for _ in range(2):
+            res = self.client.post('/api/auth/login/', {"identifier": "loginuser", "password": "wrong"}, format='json')
+        self.assertEqual(res.status_code, 400)
+
 
 class SignupTests(TestCase):
     """Test signup with invite tokens."""
@@ -157,6 +219,81 @@ class MeAndLogoutTests(TestCase):
         self.assertEqual(res.status_code, 200)
 
 
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', USER_CACHE_TIMEOUT=300)
+class UserCacheTests(TestCase):
+    """Session and hydrated user come from the cache; profile writes drop them."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="FAM-UC-001")
+        self.member = FamilyMember.objects.create(family=self.family, name="Guardian", relation="Head")
+        self.user = User.objects.create_user(
+            username="guardian", email="guardian@example.com", password="Pass123!", member=self.member
+        )
+        self.child = FamilyMember.objects.create(
+            family=self.family, name="Child", relation="Son", created_by=self.user
+        )
+        self.assertTrue(self.client.login(username="guardian", password="Pass123!"))
+
+    def me(self):
+        res = self.client.get('/api/auth/me/')
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def test_warm_request_makes_no_queries(self):
+        expected = self.me()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.me(), expected)
+        self.assertEqual([m['name'] for m in expected['managed_members']], ["Child"])
+        self.assertFalse(expected['managed_members'][0]['has_account'])
+
+    def test_member_writes_refresh_the_user(self):
+        self.me()
+        self.member.name = "Renamed Guardian"
+        self.member.save()
+        self.assertEqual(self.me()['name'], "Renamed Guardian")
+
+        FamilyMember.objects.create(family=self.family, name="Second Child", relation="Daughter", created_by=self.user)
+        self.assertEqual([m['name'] for m in self.me()['managed_members']], ["Child", "Second Child"])
+
+    def test_managed_member_account_refreshes_the_guardian(self):
+        self.me()
+        User.objects.create_user(username="child", email="child@example.com", password="Pass123!", member=self.child)
+        self.assertTrue(self.me()['managed_members'][0]['has_account'])
+
+    def test_bulk_gender_fix_up_survives_a_cached_profile_save(self):
+        bob_member = FamilyMember.objects.create(family=self.family, name="Bob", relation="Other", gender='M')
+        User.objects.create_user(username="bob", email="bob@example.com", password="Pass123!", member=bob_member)
+        bob = APIClient()
+        self.assertTrue(bob.login(username="bob", password="Pass123!"))
+        self.assertEqual(bob.get('/api/auth/me/').status_code, 200)   # Bob's user and member now cached
+
+        res = self.client.post('/api/families/profile/', {
+            'relationships': json.dumps([{'to_member': bob_member.pk, 'relation_type': 'Mother'}]),
+        }, format='multipart')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(FamilyMember.objects.get(pk=bob_member.pk).gender, 'F')
+
+        self.assertEqual(bob.post('/api/families/profile/', {'bio': 'hi'}, format='multipart').status_code, 200)
+        bob_member.refresh_from_db()
+        self.assertEqual((bob_member.gender, bob_member.bio), ('F', 'hi'))
+
+    def test_password_change_ends_cached_sessions(self):
+        self.me()
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password("Other456!")
+        user.save()
+        self.assertIn(self.client.get('/api/auth/me/').status_code, [401, 403])
+
+    def test_inactive_user_is_not_served_from_cache(self):
+        self.me()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertIn(self.client.get('/api/auth/me/').status_code, [401, 403])
+
+
 class GiveAccessTests(TestCase):
     """Test the guardian Give Access flow."""
 
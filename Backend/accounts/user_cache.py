@@ -0,0 +1,66 @@
+"""
+Cache of the authenticated user, hydrated for the whole request.
+
+AuthenticationMiddleware resolves request.user once per request through
+MultiFieldAuthBackend.get_user(), which reads it from here: the User with
+its linked member and every managed member (and whether each has an
+account) already loaded, which is everything MeView/UserSerializer and
+the permission checks read. A cached entry lives USER_CACHE_TIMEOUT
+seconds and is dropped by signals (accounts/signals.py) whenever the
+user, their member or one of their managed members is saved or deleted,
+so a cached copy never predates the last write made through model saves.
+Bulk writes send no signals and call invalidate_member_users() instead.
+Write paths load the member they save from the database, never from the
+cached user.
+Together with the cached_db session engine an authenticated request
+needs no auth-related queries once both are warm.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from families.models import FamilyMember
+from .models import User
+
+DEFAULT_TIMEOUT = 300
+
+
+def _key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def hydrated_users():
+    return User._default_manager.select_related('member').prefetch_related(
+        Prefetch('managed_members', queryset=FamilyMember.objects.select_related('user_account').order_by('pk')),
+    )
+
+
+def get_cached_user(user_id):
+    """The hydrated User with this pk, or None."""
+    key = _key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = hydrated_users().filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, getattr(settings, 'USER_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    return user
+
+
+def invalidate_users(*user_ids):
+    keys = [_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # Again once the write is visible: a request in between may have cached the old rows
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_member_users(member_ids):
+    """After a bulk write to these members: drop their account holders and guardians."""
+    member_ids = list(member_ids)
+    if not member_ids:
+        return
+    user_ids = User._default_manager.filter(member_id__in=member_ids).values_list('pk', flat=True)
+    guardian_ids = FamilyMember.objects.filter(pk__in=member_ids).values_list('created_by_id', flat=True)
+    invalidate_users(*user_ids, *guardian_ids)
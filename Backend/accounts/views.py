@@ -8,6 +8,7 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .ratelimit import login_blocked
 from .serializers import UserSerializer
 
 
@@ -18,32 +19,19 @@ class LoginView(APIView):
     def post(self, request):
         identifier = request.data.get("identifier")
         password = request.data.get("password")
-
-        User = get_user_model()
         logger = logging.getLogger(__name__)
 
-        # Try authenticating directly (identifier as username)
-        user = authenticate(username=identifier, password=password)
-
-        # If that fails, try resolving identifier as email or member_id
-        if not user and identifier:
-            try:
-                # Try email
-                candidate = User.objects.filter(email__iexact=identifier).first()
-                if candidate:
-                    user = authenticate(username=candidate.username, password=password)
-            except Exception:
-                user = None
-
-        if not user and identifier:
-            try:
-                # Try member_id
-                candidate = User.objects.filter(member__id=identifier).first()
-                if candidate:
-                    user = authenticate(username=candidate.username, password=password)
-            except Exception:
-                user = None
+        retry_after = login_blocked(request, identifier)
+        if retry_after:
+            logger.warning("Login rate limited for identifier=%s", identifier)
+            return Response(
+                {"error": "Too many failed login attempts. Please try again later."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(retry_after)},
+            )
 
+        # Username, email or member id, resolved by MultiFieldAuthBackend in one query and one hash check
+        user = authenticate(request, username=identifier, password=password)
         if not user:
             logger.info("Login failed for identifier=%s", identifier)
             return Response({"error": "Invalid credentials"}, status=400)
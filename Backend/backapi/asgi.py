@@ -0,0 +1,8 @@
+"""ASGI config for backapi project, served by uvicorn workers (see Dockerfile)."""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backapi.settings')
+os.environ.setdefault('DJANGO_ASGI', 'True')
+
+application = get_asgi_application()
@@ -0,0 +1,107 @@
+"""
+Async read path for ASGI deployments.
+
+Served through asgi.py (settings.ASGI), the read-heavy endpoints are routed
+to async views built by read_view(). A plain JSON GET is answered in the
+event loop: from the response cache (backapi/cache.py, same entries as
+the sync views) or else by the view's `aread(request, ...)` coroutine,
+which reads through the async ORM and returns (data, headers), or None to
+decline. Everything else (writes, the browsable API, ?format=, requests
+with an Authorization header, anything aread() declines) goes to the DRF
+view in a thread, as Django runs any sync view under ASGI.
+
+aread() skips DRF's authentication and permission checks, so only views
+whose GET is public and the same for every user may define it. Under WSGI
+read_view() is simply as_view().
+
+Streamed responses wrap their generator in stream_body(): Django would
+otherwise read a sync iterator to the end before sending anything under
+ASGI.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .cache import _acount, agroup_versions, cached_response_from, response_key
+
+# Items pulled from a sync generator per thread hop in stream_body()
+STREAM_BATCH_SIZE = 500
+
+# Accept values DRF's negotiation answers with JSONRenderer
+JSON_ACCEPT = {'*/*', 'application/json', 'text/plain', 'application/*'}
+
+
+def plain_json_get(request):
+    if request.method not in ('GET', 'HEAD') or 'format' in request.GET or 'HTTP_AUTHORIZATION' in request.META:
+        return False
+    accepted = set()
+    for part in request.headers.get('Accept', '*/*').split(','):
+        media_type, _, params = part.partition(';')
+        if params and not params.strip().startswith('q='):
+            return False   # e.g. application/json; indent=4
+        accepted.add(media_type.strip())
+    return accepted <= JSON_ACCEPT and bool(accepted & {'*/*', 'application/json', 'application/*'})
+
+
+def as_async_view(view_class, **initkwargs):
+    sync_view = sync_to_async(view_class.as_view(**initkwargs))
+    renderer = JSONRenderer()
+
+    async def view(request, *args, **kwargs):
+        if not plain_json_get(request):
+            return await sync_view(request, *args, **kwargs)
+        self = view_class(**initkwargs)
+        self.setup(request, *args, **kwargs)
+        self.format_kwarg = None
+
+        policy = getattr(self, 'cache_policy', None)
+        caching = policy is not None and getattr(settings, 'RESPONSE_CACHING', True)
+        if caching:
+            versions = await agroup_versions(policy.groups)
+            key = response_key(policy, request.build_absolute_uri(), renderer.media_type, versions)
+            entry = await cache.aget(key)
+            if entry is not None:
+                await _acount(policy, 'hits')
+                return cached_response_from(entry)
+
+        result = await self.aread(request, *args, **kwargs)
+        if result is None:
+            return await sync_view(request, *args, **kwargs)
+        data, headers = result
+        content = renderer.render(data, renderer.media_type)
+        response = HttpResponse(content, content_type=renderer.media_type, headers=headers)
+        if caching:
+            await _acount(policy, 'misses')
+            await cache.aset(key, (content, renderer.media_type, headers), policy.timeout)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    # Writes reach the DRF view, which does its own CSRF checks
+    view.csrf_exempt = True
+    view.view_class = view_class
+    return view
+
+
+def read_view(view_class, **initkwargs):
+    """URLconf entry for a read-heavy DRF view: async under ASGI, as_view() otherwise."""
+    if settings.ASGI:
+        return as_async_view(view_class, **initkwargs)
+    return view_class.as_view(**initkwargs)
+
+
+async def _batches(iterator, batch_size):
+    # In the sync thread, where the generator's database reads belong
+    take = sync_to_async(lambda: list(islice(iterator, batch_size)))
+    while batch := await take():
+        yield ''.join(batch) if isinstance(batch[0], str) else b''.join(batch)
+
+
+def stream_body(iterable, batch_size=STREAM_BATCH_SIZE):
+    """StreamingHttpResponse content: `iterable` itself under WSGI, pulled in batches under ASGI."""
+    if settings.ASGI:
+        return _batches(iter(iterable), batch_size)
+    return iterable
@@ -0,0 +1,181 @@
+"""
+Response caching for public read endpoints.
+
+A view opts in by naming the data groups its response is built from:
+
+    class NewsListView(CachedResponseMixin, RowListMixin, ListAPIView):
+        cache_policy = CachePolicy('news-list', groups=('news',), timeout=60)
+
+Successful JSON GET responses are stored rendered, keyed by the policy,
+the absolute URL (bodies hold absolute links), the negotiated media type
+and the current version of each group. invalidate('news') bumps that
+group's version, so every entry built from it stops matching at once and
+ages out of the cache on its own; apps call it from model signals.
+Versions are kept in the cache as well, so on a shared backend (file,
+Redis) an invalidation reaches every process; on locmem each process only
+sees its own, and the policy timeout bounds how stale another process can
+be.
+
+Hits and misses are counted per policy (stats(), `manage.py cache_stats`)
+and reported in an X-Cache header. The backend is chosen with CACHE_URL
+(see settings); RESPONSE_CACHING = False turns response caching off.
+The async read views (backapi/asyncviews.py) share the same entries
+through the a-prefixed helpers.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+# Response headers kept with a cached body (Content-Type is stored separately)
+CACHED_HEADERS = ('X-Tree-Version',)
+
+policies = {}
+
+
+class CachePolicy:
+    def __init__(self, name, groups=(), timeout=60):
+        self.name = name
+        self.groups = tuple(groups)
+        self.timeout = timeout
+        policies[name] = self
+
+    def __repr__(self):
+        return f"CachePolicy({self.name!r}, groups={self.groups!r}, timeout={self.timeout})"
+
+
+def _version_key(group):
+    return f"respcache:version:{group}"
+
+
+def group_versions(groups):
+    keys = [_version_key(group) for group in groups]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # Start from the clock, not 1, so an evicted counter never repeats an old version
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+async def agroup_versions(groups):
+    keys = [_version_key(group) for group in groups]
+    found = await cache.aget_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            version = await cache.aget(key)
+        versions.append(version)
+    return versions
+
+
+def response_key(policy, path, media_type, versions):
+    parts = [path, media_type or '', *(str(version) for version in versions)]
+    digest = hashlib.sha256('|'.join(parts).encode()).hexdigest()
+    return f"respcache:{policy.name}:{digest}"
+
+
+def cached_response_from(entry):
+    content, content_type, headers = entry
+    return HttpResponse(content, content_type=content_type, headers={**headers, 'X-Cache': 'HIT'})
+
+
+def invalidate(*groups):
+    """Make every cached response built from `groups` stale, in every process sharing the cache."""
+    def bump():
+        for group in groups:
+            try:
+                cache.incr(_version_key(group))
+            except ValueError:
+                cache.set(_version_key(group), time.time_ns(), timeout=None)
+
+    bump()
+    # Again once the write is visible: a read in between may have cached the old data
+    transaction.on_commit(bump)
+
+
+def _count(policy, outcome):
+    key = f"respcache:stats:{policy.name}:{outcome}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+
+async def _acount(policy, outcome):
+    key = f"respcache:stats:{policy.name}:{outcome}"
+    if not await cache.aadd(key, 1, timeout=None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aadd(key, 1, timeout=None)
+
+
+def stats():
+    """{policy name: {'hits': n, 'misses': n}} for every policy defined so far."""
+    keys = {
+        f"respcache:stats:{name}:{outcome}": (name, outcome)
+        for name in policies for outcome in ('hits', 'misses')
+    }
+    found = cache.get_many(keys)
+    result = {name: {'hits': 0, 'misses': 0} for name in policies}
+    for key, (name, outcome) in keys.items():
+        result[name][outcome] = found.get(key, 0)
+    return result
+
+
+def reset_stats():
+    cache.delete_many([f"respcache:stats:{name}:{outcome}" for name in policies for outcome in ('hits', 'misses')])
+
+
+class CachedResponseMixin:
+    """
+    Serve GET from the cache according to `cache_policy` (a CachePolicy).
+
+    Views that define get() themselves return
+    self.cached_response(request, handler) from it instead.
+    """
+    cache_policy = None
+
+    def response_cache_key(self, request):
+        policy = self.cache_policy
+        return response_key(policy, request.build_absolute_uri(), request.accepted_media_type, group_versions(policy.groups))
+
+    def get(self, request, *args, **kwargs):
+        return self.cached_response(request, super().get, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        policy = self.cache_policy
+        # Only JSON: the browsable API embeds the user and a CSRF token
+        if policy is None or not getattr(settings, 'RESPONSE_CACHING', True) or request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key = self.response_cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            _count(policy, 'hits')
+            return cached_response_from(entry)
+
+        _count(policy, 'misses')
+        response = handler(request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            # Render now (finalize_response would otherwise do it later) to store the bytes
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            headers = {name: response[name] for name in CACHED_HEADERS if name in response}
+            cache.set(key, (response.content, response['Content-Type'], headers), policy.timeout)
+        response['X-Cache'] = 'MISS'
+        return response
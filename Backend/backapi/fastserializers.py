@@ -0,0 +1,192 @@
+"""
+Lightweight read-only serialization for hot list endpoints.
+
+A RowSerializer turns `.values()` rows into plain dicts using a field map
+compiled once per request: each output key gets a getter built from its
+(column, converter) pair, with converters only where the raw database value
+differs from what DRF would render. No serializer, field or model instances
+are created per row.
+
+Output matches the ModelSerializer it stands in for byte for byte once
+rendered by JSONRenderer; datetimes and file URLs follow the same rules DRF
+applies (see DateTimeValue and FileURL). Each app's serializers.py pairs
+its DRF serializer with a RowSerializer subclass, and the app's tests
+compare the two renderings.
+"""
+from itertools import islice
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from rest_framework import ISO_8601, serializers
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class DateTimeValue:
+    """
+    Converter matching DRF's DateTimeField: current timezone, ISO 8601, 'Z'
+    for UTC. The timezone is resolved once per bind instead of per value;
+    naive values and non-ISO DATETIME_FORMAT settings go through the DRF
+    field itself.
+    """
+
+    def bind(self, request):
+        field = serializers.DateTimeField()
+        tz = field.default_timezone()
+        output_format = api_settings.DATETIME_FORMAT
+        if tz is None or not isinstance(output_format, str) or output_format.lower() != ISO_8601:
+            return lambda value: field.to_representation(value) if value is not None else None
+
+        def convert(value):
+            if value is None:
+                return None
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return convert
+
+
+datetime_value = DateTimeValue()
+
+
+def date_value(value):
+    return value.isoformat() if value is not None else None
+
+
+class FileURL:
+    """
+    Converter for a FileField/ImageField column holding the stored name.
+
+    Like DRF's FileField, the URL is made absolute when the serializer is
+    bound to a request; SerializerMethodFields returning `field.url` as is
+    use `absolute=False`.
+    """
+
+    def __init__(self, model, field_name, absolute=True):
+        self.storage = model._meta.get_field(field_name).storage
+        self.absolute = absolute
+
+    def bind(self, request):
+        url = self.storage.url
+        if self.absolute and request is not None:
+            build = request.build_absolute_uri
+            return lambda name: build(url(name)) if name else None
+        return lambda name: url(name) if name else None
+
+
+class Nested:
+    """Converter rendering a list of attached rows with another RowSerializer."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    def bind(self, request):
+        return self.serializer_class(request).many
+
+
+def _getter(column, convert):
+    if convert is None:
+        return itemgetter(column)
+    if column is None:
+        # Converter computes the value from the whole row
+        return convert
+    return lambda row: convert(row[column])
+
+
+class RowSerializer:
+    """
+    Read-only serializer over dict rows.
+
+    `fields` lists (key, column, converter) triples in output order. The
+    converter is None (copy the column), a callable taking the column value
+    (or the whole row when column is None), or an object whose bind(request)
+    returns such a callable. Columns named in `attached` are filled in by
+    attach() from separate batched queries rather than selected by rows().
+    """
+    fields = ()
+    attached = ()
+    extra_columns = ()
+
+    def __init__(self, request=None):
+        self.request = request
+        self.plan = tuple(
+            (key, _getter(column, convert.bind(request) if hasattr(convert, 'bind') else convert))
+            for key, column, convert in self.fields
+        )
+
+    @classmethod
+    def columns(cls):
+        names = [column for _, column, _ in cls.fields if column and column not in cls.attached]
+        return tuple(dict.fromkeys([*names, *cls.extra_columns]))
+
+    def rows(self, queryset):
+        # Prefetches belong to the model path; attach() does the batching here
+        return queryset.prefetch_related(None).values(*self.columns())
+
+    def attach(self, rows):
+        """Add the `attached` columns to a batch of rows."""
+
+    def to_dict(self, row):
+        return {key: get(row) for key, get in self.plan}
+
+    def many(self, rows):
+        to_dict = self.to_dict
+        return [to_dict(row) for row in rows]
+
+    def serialize_rows(self, rows):
+        rows = list(rows)
+        self.attach(rows)
+        return self.many(rows)
+
+    def serialize(self, queryset):
+        return self.serialize_rows(self.rows(queryset))
+
+    async def aserialize(self, queryset):
+        """serialize() through the async ORM."""
+        rows = [row async for row in self.rows(queryset)]
+        if self.attached:
+            await sync_to_async(self.attach)(rows)
+        return self.many(rows)
+
+    def iter_serialized(self, queryset, chunk_size):
+        """Serialize lazily, reading and attaching `chunk_size` rows at a time."""
+        rows = self.rows(queryset).iterator(chunk_size=chunk_size)
+        while batch := list(islice(rows, chunk_size)):
+            self.attach(batch)
+            yield from self.many(batch)
+
+
+class RowListMixin:
+    """
+    For ListAPIView/ListCreateAPIView: GET lists through `row_serializer_class`
+    instead of the view's ModelSerializer; writes are unchanged. The view's
+    paginator pages the `.values()` rows directly (DRF paginators accept
+    dicts), so the columns it orders on must be part of the field map.
+    """
+    row_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.row_serializer_class(request)
+        page = self.paginate_queryset(serializer.rows(queryset))
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize_rows(page))
+        return Response(serializer.serialize(queryset))
+
+    async def aread(self, request, *args, **kwargs):
+        """list() for the async read view (backapi/asyncviews.py)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.row_serializer_class(request)
+        if self.paginator is None:
+            return await serializer.aserialize(queryset), {}
+
+        # DRF paginators are synchronous (and read query_params off a DRF
+        # Request): page and serialize in one thread hop
+        self.request = Request(request)
+
+        def paginated():
+            page = self.paginate_queryset(serializer.rows(queryset))
+            return self.get_paginated_response(serializer.serialize_rows(page)).data
+        return await sync_to_async(paginated)(), {}
@@ -0,0 +1,156 @@
+"""
+Image derivatives.
+
+Every uploaded image gets fixed-size variants so clients can fetch the
+smallest one that fits instead of the original upload:
+
+    thumb  300 px on the long edge   (gallery tiles, member cards)
+    card   800 px                    (detail panes, modals)
+    full  1920 px                    (lightbox)
+
+each written as WebP and JPEG. Variants are re-encoded from pixels only, so
+EXIF/GPS/ICC metadata is dropped; EXIF orientation is applied first, so the
+variants are upright whatever the camera recorded. Images smaller than a
+variant are not enlarged.
+
+Derivatives live at a name derived from the source file's name
+(`derivatives/<source path without extension>/<variant>.<ext>`), so their
+URLs are computed from the stored name alone; see variant_urls(). Apps'
+signals call schedule_variants() when an image field is saved, which queues
+the work for a background worker (jobs app, `manage.py runworker`), and
+`manage.py generate_image_variants` backfills files uploaded earlier.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.storage import default_storage, storages
+from django.db import transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from jobs.queue import task
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {'thumb': 300, 'card': 800, 'full': 1920}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVES_DIR = 'derivatives'
+
+# (model label, image field, filter) for every field that gets variants; used
+# by the backfill command. Media rows also hold videos.
+IMAGE_SOURCES = (
+    ('families.FamilyMember', 'photo', {}),
+    ('families.FamilyMedia', 'image', {}),
+    ('news.Media', 'media_url', {'media_type': 'image'}),
+    ('profiles.Gallery', 'image', {}),
+    ('profiles.Committee', 'pic', {}),
+)
+
+
+def variant_name(name, variant, ext):
+    stem = os.path.splitext(name)[0]
+    return f"{DERIVATIVES_DIR}/{stem}/{variant}.{ext}"
+
+
+def variant_urls(name, storage=default_storage):
+    """{variant: {ext: url}} for a stored image name, or None when there is no image."""
+    if not name:
+        return None
+    return {
+        variant: {ext: storage.url(variant_name(name, variant, ext)) for ext in VARIANT_FORMATS}
+        for variant in VARIANT_SIZES
+    }
+
+
+def _encode(image, fmt, options):
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha: flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=default_storage, overwrite=False):
+    """
+    Write every variant of the stored image `name`; returns the names written.
+
+    Files Pillow cannot read (videos, corrupt uploads, decompression bombs)
+    are skipped with a log message and produce no variants.
+    """
+    try:
+        with storage.open(name, 'rb') as source:
+            image = Image.open(source)
+            # JPEGs can decode straight at reduced scale when far larger than needed
+            image.draft('RGB', (max(VARIANT_SIZES.values()),) * 2)
+            image = ImageOps.exif_transpose(image)
+            has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("No image variants for %s: %s", name, e)
+        return []
+
+    written = []
+    # Largest first, each variant resampled from the previous one
+    for variant, size in sorted(VARIANT_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for ext, (fmt, options) in VARIANT_FORMATS.items():
+            target = variant_name(name, variant, ext)
+            if storage.exists(target):
+                if not overwrite:
+                    continue
+                storage.delete(target)
+            written.append(storage.save(target, ContentFile(_encode(image, fmt, options))))
+    return written
+
+
+@task(queue='media', max_attempts=3, timeout=300)
+def ensure_variants(name, storage='default'):
+    """Generate variants for `name` unless they already exist; `storage` is a STORAGES alias or instance."""
+    if isinstance(storage, str):
+        storage = storages[storage]
+    if not name or storage.exists(variant_name(name, 'thumb', 'webp')):
+        return []
+    return generate_variants(name, storage)
+
+
+def _storage_alias(storage):
+    if storage is default_storage:
+        return 'default'
+    return next((alias for alias in settings.STORAGES if storages[alias] is storage), None)
+
+
+def queue_variants(name, storage=default_storage):
+    """
+    Have a worker generate variants for a stored image. The job is queued in
+    the current transaction; images on a storage that is not configured in
+    settings.STORAGES cannot be named in a job and are processed after commit.
+    """
+    if not name:
+        return
+    alias = _storage_alias(storage)
+    if alias is not None:
+        ensure_variants.enqueue(name, alias, job_options={'unique_key': f"variants:{name}"})
+    else:
+        transaction.on_commit(lambda: ensure_variants(name, storage))
+
+
+def schedule_variants(field_file):
+    """queue_variants() for a just-saved image field."""
+    if field_file:
+        queue_variants(field_file.name, field_file.storage)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Serializer field exposing variant_urls() for an image field (`source=`)."""
+
+    def to_representation(self, value):
+        return variant_urls(value.name, value.storage) if value else None
@@ -0,0 +1,29 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backapi.cache import policies, reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = "Show response cache hits and misses per cache policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        # Policies are defined on the views; loading the URLconf imports them all
+        import_module(settings.ROOT_URLCONF)
+        self.stdout.write(f"Cache backend: {settings.CACHES['default']['BACKEND']}")
+        for name, counts in sorted(stats().items()):
+            total = counts['hits'] + counts['misses']
+            ratio = f"{counts['hits'] / total:.0%}" if total else "-"
+            policy = policies[name]
+            self.stdout.write(
+                f"{name:<20} hits {counts['hits']:>8}  misses {counts['misses']:>8}  hit rate {ratio:>4}  "
+                f"(groups: {', '.join(policy.groups)}; timeout {policy.timeout}s)"
+            )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,242 @@
+"""
+Media file delivery.
+
+serve_media answers MEDIA_URL in every environment, keeping file bytes out
+of Python wherever the deployment allows (settings.MEDIA_SENDFILE):
+
+    'x-accel'     nginx sends the file from an `internal` location mounted
+                  at MEDIA_ACCEL_PREFIX (X-Accel-Redirect)
+    'x-sendfile'  Apache mod_xsendfile / lighttpd send it (X-Sendfile)
+    ''            FileResponse; gunicorn passes the open file to
+                  sendfile(2) through wsgi.file_wrapper
+
+The view answers conditional requests itself (ETag / Last-Modified → 304)
+and, when it sends the file, single byte ranges (206 / 416) so videos can
+seek. Content-addressed files (files/storage.py) never change and are
+cached for a year as immutable; anything else must be revalidated hourly.
+
+Uploads are user content served from the API's origin, so only the image,
+video and audio types in INLINE_TYPES are shown inline; anything else
+(HTML, SVG, PDF, ...) is sent as an attachment, and every response carries
+a sandboxing Content-Security-Policy so a file opened directly can never
+run script against the site.
+Under ASGI, aserve_media does the same but streams the file through an
+async iterator.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from files.storage import HASH_DIR
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+MUTABLE_CACHE = 'public, max-age=3600'
+# Nothing runs or loads; the browser's own image/video viewer still works
+MEDIA_CSP = "sandbox; default-src 'none'; img-src 'self'; media-src 'self'; style-src 'unsafe-inline'"
+# Types a browser renders without running anything: no image/svg+xml
+INLINE_TYPES = {
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/avif', 'image/bmp',
+    'video/mp4', 'video/webm', 'video/ogg', 'video/quicktime',
+    'audio/mpeg', 'audio/mp4', 'audio/ogg', 'audio/wav', 'audio/x-wav', 'audio/webm', 'audio/aac', 'audio/flac',
+}
+# Read size for aserve_media; ASGI sends the body in 64 KiB messages
+STREAM_CHUNK_SIZE = 64 * 1024
+_RANGE = re.compile(r'bytes=(\d*)-(\d*)')
+_HASHED = re.compile(rf'{HASH_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[a-z0-9]+)?')
+
+
+class RangeFile:
+    """`length` bytes of an open file from `start`; keeps fileno() so servers can still sendfile() it."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def byte_range(header, size):
+    """(start, end) inclusive for a single-range Range header; None to send everything, False if unsatisfiable."""
+    match = _RANGE.fullmatch(header.strip()) if header else None
+    if match is None:
+        return None   # absent, malformed or multiple ranges: a full 200 is a valid answer
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        return (max(size - suffix, 0), size - 1) if suffix and size else False
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        return False
+    return start, end
+
+
+def _validators(path, stat):
+    hashed = _HASHED.fullmatch(path)
+    if hashed:
+        return f'"{hashed.group(1)}"', True
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', False
+
+
+def _range_applies(request, etag, last_modified):
+    """If-Range: only serve a range of the representation the client already has part of."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _resolve(request, path):
+    """
+    Everything up to sending the file: an HttpResponse when the request is
+    answered without the file's bytes, else (full_path, size, (start, end)
+    or None, content_type, headers).
+    """
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404("Media file not found")   # dotfiles and in-progress uploads (news/uploads.py)
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    etag, immutable = _validators(path, stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': IMMUTABLE_CACHE if immutable else MUTABLE_CACHE,
+        'Accept-Ranges': 'bytes',
+        'Content-Security-Policy': MEDIA_CSP,
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified.headers.setdefault(name, value)
+        return not_modified
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    headers['Content-Disposition'] = content_disposition_header(
+        content_type not in INLINE_TYPES, os.path.basename(full_path),
+    )
+    mode = getattr(settings, 'MEDIA_SENDFILE', '')
+    if mode == 'x-accel':
+        # nginx does the transfer, including ranges, and keeps these headers
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path.replace(os.sep, '/'))
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Sendfile'] = full_path
+        return response
+
+    size = stat.st_size
+    requested = byte_range(request.META.get('HTTP_RANGE'), size)
+    if requested is not None and not _range_applies(request, etag, last_modified):
+        requested = None
+    if requested is False:
+        headers['Content-Range'] = f'bytes */{size}'
+        return HttpResponse(status=416, headers=headers)
+    return full_path, size, requested, content_type, headers
+
+
+@require_safe
+def serve_media(request, path):
+    resolved = _resolve(request, path)
+    if isinstance(resolved, HttpResponse):
+        return resolved
+    full_path, size, requested, content_type, headers = resolved
+
+    # FileResponse writes Content-Disposition itself; give it the same answer
+    as_attachment = content_type not in INLINE_TYPES
+    filename = os.path.basename(full_path)
+    file = open(full_path, 'rb')
+    if requested is None:
+        response = FileResponse(
+            file, as_attachment=as_attachment, filename=filename, content_type=content_type, headers=headers,
+        )
+    else:
+        start, end = requested
+        response = FileResponse(
+            RangeFile(file, start, end - start + 1), status=206, as_attachment=as_attachment, filename=filename,
+            content_type=content_type, headers=headers,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    return response
+
+
+def _open_at(full_path, start):
+    file = open(full_path, 'rb')
+    file.seek(start)
+    return file
+
+
+# File system calls block: aserve_media runs them in worker threads, off the event loop
+_aresolve = sync_to_async(_resolve, thread_sensitive=False)
+_aopen_at = sync_to_async(_open_at, thread_sensitive=False)
+
+
+async def _file_chunks(full_path, start, length):
+    read = sync_to_async(lambda file, size: file.read(size), thread_sensitive=False)
+    file = await _aopen_at(full_path, start)
+    try:
+        while length > 0:
+            data = await read(file, min(STREAM_CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+@require_safe
+async def aserve_media(request, path):
+    """
+    serve_media for ASGI: the body is an async iterator reading the file a
+    chunk at a time, so a slow client holds only a coroutine and a chunk,
+    not a thread (Django would read a sync FileResponse into memory first).
+    """
+    resolved = await _aresolve(request, path)
+    if isinstance(resolved, HttpResponse):
+        return resolved
+    full_path, size, requested, content_type, headers = resolved
+
+    start, end = requested or (0, size - 1)
+    response = StreamingHttpResponse(
+        _file_chunks(full_path, start, end - start + 1),
+        status=200 if requested is None else 206, content_type=content_type, headers=headers,
+    )
+    response['Content-Length'] = end - start + 1
+    if requested is not None:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
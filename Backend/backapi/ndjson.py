@@ -0,0 +1,54 @@
+"""
+Newline-delimited JSON (NDJSON) streaming helpers.
+
+Adding NDJSONRenderer to a DRF view's renderer_classes lets clients pick
+the streaming variant with `?format=ndjson` or `Accept: application/x-ndjson`.
+The view checks wants_ndjson(request) and returns stream_ndjson(records),
+which encodes one record per line as the response is consumed, so neither
+the records nor the rendered body are ever held in memory as a whole.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+from .asyncviews import stream_body
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+def encode_line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders non-streamed responses (e.g. errors) as NDJSON: one line per list item."""
+    media_type = NDJSON_MEDIA_TYPE
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        records = data if isinstance(data, list) else [data]
+        return ''.join(encode_line(r) for r in records).encode(self.charset)
+
+
+def with_ndjson(renderer_classes=None):
+    """Default renderers plus NDJSONRenderer, for a view's renderer_classes."""
+    return [*(renderer_classes or api_settings.DEFAULT_RENDERER_CLASSES), NDJSONRenderer]
+
+
+def wants_ndjson(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == NDJSONRenderer.format
+
+
+def stream_ndjson(records):
+    """StreamingHttpResponse that encodes `records` lazily, one JSON document per line."""
+    return StreamingHttpResponse(
+        stream_body(encode_line(record) for record in records),
+        content_type=f'{NDJSON_MEDIA_TYPE}; charset=utf-8',
+    )
@@ -50,6 +50,9 @@ INSTALLED_APPS = [
     'families',
     'news',
     'profiles',
+    'jobs',
+    'files',
+    'backapi',
 ]
 
 REST_FRAMEWORK = {
@@ -61,11 +64,20 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    # Reverse proxies in front of the app (traefik in docker-compose), so
+    # client IPs for throttling and login limits come from X-Forwarded-For
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
+# Username / email / member id login with one hash check and failed-login
+# limits (accounts/auth_backend.py, accounts/ratelimit.py)
+AUTHENTICATION_BACKENDS = ['accounts.auth_backend.MultiFieldAuthBackend']
+# Failed logins allowed per identifier and per client IP: (count, window seconds)
+LOGIN_RATE_LIMITS = {'identifier': (5, 15 * 60), 'ip': (30, 15 * 60)}
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'backapi.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +92,8 @@ ROOT_URLCONF = 'backapi.urls'
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000').split(',')
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOW_CREDENTIALS = True
+# Lets the frontend read the tree version it needs for /tree/changes/?since=
+CORS_EXPOSE_HEADERS = ['X-Tree-Version']
 CSRF_TRUSTED_ORIGINS = os.environ.get(
     'CSRF_TRUSTED_ORIGINS', 
     'http://localhost:3000,http://127.0.0.1:3000,http://localhost:8000,http://127.0.0.1:8000'
@@ -105,6 +119,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backapi.wsgi.application'
+ASGI_APPLICATION = 'backapi.asgi.application'
+# Set by asgi.py: read-heavy endpoints are routed to their async views
+# (backapi/asyncviews.py) and database connections are not kept per thread.
+ASGI = os.environ.get('DJANGO_ASGI', 'False') == 'True'
 
 if os.environ.get('DB_ENGINE') == 'mysql':
     DATABASES = {
@@ -131,6 +149,21 @@ elif os.environ.get('POSTGRES_DB'):
             'PORT': os.environ.get('POSTGRES_PORT', 5432),
         }
     }
+    if os.environ.get('DB_POOL', 'False') == 'True':
+        # psycopg 3 connection pool, one per process. Django hands pooled
+        # connections out and back per request, so CONN_MAX_AGE must be 0.
+        from psycopg_pool import ConnectionPool
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                # Connections idle longer than this are closed down to min_size
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+                # Health check on checkout, as CONN_HEALTH_CHECKS does without the pool
+                'check': ConnectionPool.check_connection,
+            },
+        }
 else:
     DATABASES = {
         'default': {
@@ -139,6 +172,17 @@ else:
         }
     }
 
+# Server connections are kept open between requests for DB_CONN_MAX_AGE
+# seconds (0 closes them after every request, None never does) and checked
+# before reuse, so a connection the server dropped is replaced instead of
+# failing the next request. With DB_POOL the pool keeps them instead.
+if DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+    _pooled = 'pool' in DATABASES['default'].get('OPTIONS', {})
+    # Under ASGI, requests don't reuse a thread's connection; use DB_POOL there
+    _max_age = os.environ.get('DB_CONN_MAX_AGE', '0' if ASGI else '60')
+    DATABASES['default']['CONN_MAX_AGE'] = 0 if _pooled else (None if _max_age == 'None' else int(_max_age))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = not _pooled
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -167,6 +211,25 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = str(BASE_DIR / 'media')
 
+# Uploads go to content-addressed storage (files/storage.py): one copy per
+# distinct file, reference-counted, under MEDIA_ROOT like everything else.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'media': {'BACKEND': 'files.storage.ContentAddressedStorage'},
+}
+# Seconds an unreferenced file is kept before the purge job deletes it
+FILES_PURGE_GRACE = 3600
+
+# Who sends /media/ file bytes (backapi/media.py): '' = the app server via
+# sendfile, 'x-accel' = nginx internal location at MEDIA_ACCEL_PREFIX,
+# 'x-sendfile' = Apache mod_xsendfile / lighttpd.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
+# Largest file accepted by the chunked upload API (news/uploads.py)
+NEWS_UPLOAD_MAX_SIZE = 2 * 1024 ** 3
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Logging Configuration for Production
@@ -199,6 +262,49 @@ LOGGING = {
     },
 }
 
+# Cache backend, from CACHE_URL:
+#   locmem://            per-process memory (default)
+#   file:///path         one directory shared by every process on the host
+#   redis://host:6379/0  any Redis-protocol server (Redis, Valkey, KeyDB, ...)
+#   dummy://             no caching
+CACHE_URL = os.environ.get('CACHE_URL', 'locmem://')
+_cache_scheme, _, _cache_location = CACHE_URL.partition('://')
+CACHES = {
+    'default': {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+            'redis': 'django.core.cache.backends.redis.RedisCache',
+            'rediss': 'django.core.cache.backends.redis.RedisCache',
+            'dummy': 'django.core.cache.backends.dummy.DummyCache',
+        }[_cache_scheme],
+        'LOCATION': CACHE_URL if _cache_scheme.startswith('redis') else _cache_location,
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'familysite'),
+    }
+}
+# Cached responses for public read endpoints (backapi/cache.py). Off in
+# tests, which enable it where they exercise it.
+RESPONSE_CACHING = os.environ.get('RESPONSE_CACHING', 'True') == 'True' and 'test' not in sys.argv
+
+# Sessions and the hydrated request.user (accounts/user_cache.py) are read
+# from the cache only when every process shares it: with locmem a logout or
+# password change would not reach the other workers' copies.
+_shared_cache = _cache_scheme not in ('locmem', 'dummy')
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if _shared_cache else 'django.contrib.sessions.backends.db',
+)
+# Seconds a hydrated user stays cached; 0 disables the cache
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 300 if _shared_cache else 0))
+
+# Background jobs (see jobs/queue.py); served by `manage.py runworker`.
+# concurrency = most jobs of a queue running at once across all workers.
+JOB_QUEUES = {
+    'default': {'concurrency': 4},
+    'media': {'concurrency': 2},
+}
+JOB_RETENTION_DAYS = 7
+
 # Use the custom user model defined in the `accounts` app
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -1,9 +1,10 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.http import JsonResponse
 from accounts.views import CsrfInitView
+from backapi.media import aserve_media, serve_media
 
 def health_check(request):
     return JsonResponse({"status": "ok"})
@@ -20,8 +21,9 @@ urlpatterns = [
     ])),
     # Health check for Docker/Load balancer
     path('health/', health_check),
+    # Uploaded media, in every environment (sendfile / X-Accel-Redirect, ranges, caching)
+    re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", aserve_media if settings.ASGI else serve_media),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
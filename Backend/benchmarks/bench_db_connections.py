@@ -0,0 +1,126 @@
+"""
+Benchmark: /api/news/list/ latency per database connection mode.
+
+Sends requests through Django's WSGI handler, which (unlike the test
+client) closes or hands back the connection at the end of every request
+exactly as under gunicorn, against a throwaway Postgres test database:
+
+    per-request   CONN_MAX_AGE = 0: connect and authenticate every request
+    persistent    CONN_MAX_AGE = 60 with health checks (the default)
+    pool          psycopg 3 connection pool (DB_POOL=True)
+
+Point POSTGRES_* at a server over TCP (POSTGRES_HOST=127.0.0.1 rather than
+a socket) so each connect pays the handshake a deployment pays.
+
+    cd Backend && POSTGRES_DB=family POSTGRES_USER=postgres POSTGRES_PASSWORD=... \\
+        POSTGRES_HOST=127.0.0.1 python benchmarks/bench_db_connections.py [--requests 500]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backapi.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+MODES = [
+    ('per-request', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, None),
+    ('persistent', {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True}, None),
+    ('pool', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, {'min_size': 1, 'max_size': 4}),
+]
+
+
+def use_mode(options, pool):
+    connection.close()
+    connection.close_pool()
+    connection.settings_dict.update(options)
+    connection.settings_dict['OPTIONS'].pop('pool', None)
+    if pool:
+        connection.settings_dict['OPTIONS']['pool'] = pool
+
+
+def get(handler, path):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_ACCEPT': 'application/json', 'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+    }
+    status = []
+    response = handler(environ, lambda s, headers: status.append(s))
+    try:
+        b''.join(response)
+    finally:
+        response.close()   # request_finished: the connection is closed, kept or returned here
+    if not status[0].startswith('200'):
+        raise SystemExit(f"{path} answered {status[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=200)
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        raise SystemExit("Set POSTGRES_DB/POSTGRES_USER/POSTGRES_PASSWORD/POSTGRES_HOST to a local Postgres.")
+    # Measure the database, not the response cache
+    settings.RESPONSE_CACHING = False
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        from families.models import Family, FamilyMember
+        from news.models import Post
+
+        family = Family.objects.create(sl_no="1", branch="Bench", member_no="BENCH")
+        author = FamilyMember.objects.create(family=family, name="Author", relation="Head")
+        Post.objects.bulk_create([
+            Post(creator=author, post_type='news', title=f"Post {i}", description="Body")
+            for i in range(args.posts)
+        ])
+
+        connects = []
+        connection_created.connect(lambda **kwargs: connects.append(1), weak=False)
+        handler = WSGIHandler()
+
+        print(f"{'mode':<12}  {'median':>9}  {'p95':>9}  {'mean':>9}  {'connects':>8}")
+        for label, options, pool in MODES:
+            use_mode(options, pool)
+            for _ in range(10):
+                get(handler, '/api/news/list/')
+            connects.clear()
+            if connection.pool:
+                connection.pool.pop_stats()
+            timings = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                get(handler, '/api/news/list/')
+                timings.append((time.perf_counter() - start) * 1000)
+            # With the pool connection_created fires per checkout; count real connects instead
+            opened = connection.pool.get_stats().get('connections_num', 0) if connection.pool else len(connects)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(
+                f"{label:<12}  {statistics.median(timings):>6.2f} ms  {p95:>6.2f} ms  "
+                f"{statistics.fmean(timings):>6.2f} ms  {opened:>8}"
+            )
+    finally:
+        use_mode({'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, None)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
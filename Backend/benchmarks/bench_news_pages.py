@@ -0,0 +1,82 @@
+"""
+Benchmark: news feed page fetch time as the post archive grows.
+
+Fills a throwaway test database in steps and, at each size, times the
+first page and a page deep in the archive through the real view (cursor
+pagination + row serializer). With keyset pagination both stay flat.
+
+    cd Backend && python benchmarks/bench_news_pages.py [--sizes 1000 10000 50000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backapi.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+
+def grow(author, target):
+    from news.models import Post
+    missing = target - Post.objects.count()
+    Post.objects.bulk_create([
+        Post(creator=author, post_type='news' if i % 3 else 'event', title=f"Post {i}", description="Body")
+        for i in range(missing)
+    ], batch_size=5000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def fetch(client, url, repeat):
+    best, data = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        data = response.json()
+    return best, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--depth', type=int, default=50, help="pages to walk for the deep-page timing")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Time the view, not the response cache in front of it
+    settings.RESPONSE_CACHING = False
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        from rest_framework.test import APIClient
+        from families.models import Family, FamilyMember
+
+        family = Family.objects.create(sl_no="1", branch="Bench", member_no="BENCH")
+        author = FamilyMember.objects.create(family=family, name="Author", relation="Head")
+        client = APIClient()
+
+        print(f"{'posts':>8}  {'first page':>12}  {f'page {args.depth}':>12}")
+        for size in sorted(args.sizes):
+            grow(author, size)
+            first, data = fetch(client, '/api/news/list/', args.repeat)
+            url = data['next']
+            for _ in range(args.depth - 2):
+                url = client.get(url).json()['next'] or url
+            deep, _ = fetch(client, url, args.repeat)
+            print(f"{size:>8}  {first * 1000:>9.2f} ms  {deep * 1000:>9.2f} ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
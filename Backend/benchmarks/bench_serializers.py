@@ -0,0 +1,113 @@
+"""
+Micro-benchmark: ModelSerializer vs RowSerializer on the hot list endpoints.
+
+Builds a throwaway test database, fills it with posts (with media) and
+managed members (with relationships), then times serialize + JSON render
+for each path and prints the per-row cost. Both paths are checked to render
+identical bytes before timing.
+
+    cd Backend && python benchmarks/bench_serializers.py [--rows 2000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backapi.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+
+def populate(rows):
+    from django.contrib.auth import get_user_model
+    from families.models import Family, FamilyMember, Relationship
+    from news.models import Post, Media
+
+    User = get_user_model()
+    family = Family.objects.create(sl_no="1", branch="Bench", member_no="BENCH")
+    head = FamilyMember.objects.create(family=family, name="Head", relation="Head")
+    owner = User.objects.create_user(username="bench", email="bench@example.com", password="x", member=head)
+
+    members = FamilyMember.objects.bulk_create([
+        FamilyMember(family=family, name=f"Member {i}", relation="Son", age=i % 90, created_by=owner)
+        for i in range(rows)
+    ])
+    FamilyMember.parents.through.objects.bulk_create([
+        FamilyMember.parents.through(from_familymember_id=m.pk, to_familymember_id=head.pk) for m in members
+    ])
+    Relationship.objects.bulk_create([
+        Relationship(from_member=m, to_member=head, relation_type='Father') for m in members
+    ])
+
+    posts = Post.objects.bulk_create([
+        Post(creator=head, post_type='news', title=f"Post {i}", description="Body " * 20)
+        for i in range(rows)
+    ])
+    Media.objects.bulk_create([
+        Media(uploader=head, post=post, media_url=f"media_gallery/{post.pk}.jpg") for post in posts
+    ])
+    return owner
+
+
+def timed(label, rows, repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<18} {best * 1000:9.1f} ms   {best / rows * 1e6:8.1f} µs/row")
+    return body, best
+
+
+def compare(name, rows, repeat, model_path, row_path):
+    print(f"{name} ({rows} rows, best of {repeat})")
+    expected, slow = timed("ModelSerializer", rows, repeat, model_path)
+    actual, fast = timed("RowSerializer", rows, repeat, row_path)
+    assert actual == expected, f"{name}: row serializer output differs"
+    print(f"  speed-up           {slow / fast:9.1f}x\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        from families.models import FamilyMember
+        from families.serializers import FamilyMemberSerializer, FamilyMemberRowSerializer
+        from news.models import Post
+        from news.serializers import PostSerializer, PostRowSerializer
+
+        owner = populate(args.rows)
+        render = JSONRenderer().render
+
+        posts = Post.objects.order_by('-created_at')
+        compare(
+            "News list", args.rows, args.repeat,
+            lambda: render(PostSerializer(posts.with_serializer_data(), many=True).data),
+            lambda: render(PostRowSerializer().serialize(posts)),
+        )
+
+        members = FamilyMember.objects.with_profile_data().filter(created_by=owner).order_by('pk')
+        compare(
+            "Managed members", args.rows, args.repeat,
+            lambda: render(FamilyMemberSerializer(members, many=True).data),
+            lambda: render(FamilyMemberRowSerializer().serialize(members)),
+        )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
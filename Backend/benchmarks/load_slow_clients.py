@@ -0,0 +1,121 @@
+"""
+Load test: fast requests while slow clients hold downloads open.
+
+Opens --slow connections that each download --slow-path while reading only
+--rate bytes a second through a small receive buffer, and meanwhile sends
+--probe-path requests one after another, reporting their latency. Run it
+against each server mode, one worker each so the difference is per process:
+
+    cd Backend
+    gunicorn backapi.wsgi:application --bind 127.0.0.1:8000 --workers 1
+    gunicorn backapi.asgi:application --bind 127.0.0.1:8001 --workers 1 \\
+        --worker-class uvicorn_worker.UvicornWorker
+
+    python benchmarks/load_slow_clients.py --url http://127.0.0.1:8000 --slow-path /media/<a large file>
+    python benchmarks/load_slow_clients.py --url http://127.0.0.1:8001 --slow-path /media/<a large file>
+
+A sync worker serves one request at a time, so its probes wait behind the
+slow downloads (or time out); a uvicorn worker keeps answering them.
+Standard library only: it needs nothing installed beyond Python.
+"""
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def connect(host, port, rcvbuf=None):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if rcvbuf:
+        # Set before connecting so the advertised window stays small
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    return await asyncio.open_connection(sock=sock)
+
+
+def request_bytes(host, path):
+    return f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\nConnection: close\r\n\r\n".encode()
+
+
+async def slow_client(host, port, path, rate, stop, stats):
+    reader, writer = await connect(host, port, rcvbuf=4096)
+    writer.write(request_bytes(host, path))
+    await writer.drain()
+    stats['connected'] += 1
+    try:
+        while not stop.is_set():
+            chunk = await reader.read(rate)
+            if not chunk:
+                stats['finished'] += 1
+                return
+            stats['bytes'] += len(chunk)
+            await asyncio.sleep(1)
+    finally:
+        writer.close()
+
+
+async def probe(host, port, path, timeout):
+    start = time.perf_counter()
+    reader, writer = await asyncio.wait_for(connect(host, port), timeout)
+    try:
+        writer.write(request_bytes(host, path))
+        status = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    if b' 200 ' not in status:
+        raise RuntimeError(status.decode().strip())
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    stop = asyncio.Event()
+    stats = {'connected': 0, 'finished': 0, 'bytes': 0}
+    slow = [
+        asyncio.create_task(slow_client(host, port, args.slow_path, args.rate, stop, stats))
+        for _ in range(args.slow)
+    ]
+    await asyncio.sleep(args.settle)
+
+    timings, failures = [], 0
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        try:
+            timings.append(await probe(host, port, args.probe_path, args.timeout))
+        except (asyncio.TimeoutError, OSError, RuntimeError):
+            failures += 1
+
+    stop.set()
+    await asyncio.gather(*slow, return_exceptions=True)
+    print(f"{args.url}  {args.slow} slow clients on {args.slow_path} ({stats['connected']} connected)")
+    if timings:
+        timings.sort()
+        print(
+            f"  probes {args.probe_path}: {len(timings)} ok, {failures} failed/timed out; "
+            f"median {statistics.median(timings):.1f} ms, p95 {timings[int(len(timings) * 0.95) - 1]:.1f} ms, "
+            f"max {timings[-1]:.1f} ms"
+        )
+    else:
+        print(f"  probes {args.probe_path}: none answered within {args.timeout}s ({failures} attempts)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--slow', type=int, default=200, help="slow clients held open")
+    parser.add_argument('--slow-path', default='/api/families/tree/')
+    parser.add_argument('--rate', type=int, default=1024, help="bytes each slow client reads per second")
+    parser.add_argument('--probe-path', default='/api/news/list/')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--settle', type=float, default=2, help="seconds between opening slow clients and probing")
+    parser.add_argument('--timeout', type=float, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
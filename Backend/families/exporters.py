@@ -0,0 +1,235 @@
+"""
+Genealogy Export
+================
+Streams the whole genealogy as GEDCOM 5.5.1 or as a compact JSON dump.
+
+Both exporters are generators of text chunks: rows are read with chunked
+`.values()` iterators and turned into text as the consumer pulls, so a
+management command can write them to a file and a view can hand them to a
+StreamingHttpResponse. No model instances are built, and the first bytes go
+out before the last rows have been read.
+
+GEDCOM needs each person's FAMC/FAMS links while writing their INDI record,
+so union (FAM) membership is worked out first from the parent and spouse
+rows; that pass keeps only integer ids, never member rows.
+"""
+import json
+import os
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Family, FamilyMember, Relationship
+
+EXPORT_CHUNK_SIZE = 2000
+WRITE_BUFFER_SIZE = 64 * 1024
+GEDCOM_MONTHS = ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC')
+GEDCOM_SEX = {'M': 'M', 'F': 'F'}
+
+MEMBER_EXPORT_FIELDS = (
+    'id', 'family_id', 'temp_member_id', 'name', 'nickname', 'age', 'relation', 'gender',
+    'date_of_birth', 'date_of_death', 'is_deceased', 'is_independent', 'address_if_different',
+    'education', 'occupation', 'place_of_work', 'blood_group', 'bio', 'phone_no', 'email_id',
+    'church_parish', 'photo', 'created_by_id',
+)
+
+
+def _parent_rows(chunk_size):
+    """(child_id, parent_id) from the parents M2M, grouped by child."""
+    return (
+        FamilyMember.parents.through.objects
+        .order_by('from_familymember_id', 'to_familymember_id')
+        .values_list('from_familymember_id', 'to_familymember_id')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+_photo_storage = FamilyMember._meta.get_field('photo').storage
+
+
+def _photo_url(name):
+    return _photo_storage.url(name) if name else None
+
+
+# -- GEDCOM --------------------------------------------------------------------
+
+def _gedcom_date(value):
+    return f"{value.day} {GEDCOM_MONTHS[value.month - 1]} {value.year}"
+
+
+def _gedcom_text(value):
+    """GEDCOM line values cannot contain line breaks; '@' must be doubled."""
+    return ' '.join(str(value).split()).replace('@', '@@')
+
+
+class Unions:
+    """
+    GEDCOM FAM records derived from parent sets and Spouse relationships.
+
+    Children sharing the same parents form one union; a spouse pair with no
+    children forms its own. Only ids are kept: union → partners/children and
+    member → unions it belongs to as child (FAMC) or partner (FAMS).
+    """
+
+    def __init__(self, chunk_size=EXPORT_CHUNK_SIZE):
+        self.ids = {}                         # sorted partner tuple -> union number
+        self.partners = []                    # union number - 1 -> partner ids
+        self.children = defaultdict(list)     # union number -> child ids
+        self.famc = {}                        # member id -> union number
+        self.fams = defaultdict(list)         # member id -> [union number]
+
+        child, parents = None, []
+        for child_id, parent_id in _parent_rows(chunk_size):
+            if child_id != child:
+                self._add_child(child, parents)
+                child, parents = child_id, []
+            parents.append(parent_id)
+        self._add_child(child, parents)
+
+        spouses = (
+            Relationship.objects.filter(relation_type='Spouse').order_by('pk')
+            .values_list('from_member_id', 'to_member_id').iterator(chunk_size=chunk_size)
+        )
+        for a, b in spouses:
+            if a != b:
+                self._union((a, b))
+
+    def _union(self, partner_ids):
+        key = tuple(sorted(partner_ids))
+        number = self.ids.get(key)
+        if number is None:
+            number = self.ids[key] = len(self.partners) + 1
+            self.partners.append(key)
+            for partner_id in key:
+                self.fams[partner_id].append(number)
+        return number
+
+    def _add_child(self, child_id, parent_ids):
+        if child_id is None:
+            return
+        # GEDCOM families have at most two partners
+        number = self._union(parent_ids[:2])
+        self.children[number].append(child_id)
+        self.famc[child_id] = number
+
+
+def _gedcom_pieces(chunk_size):
+    unions = Unions(chunk_size)
+    genders = {}
+
+    yield (
+        "0 HEAD\n1 SOUR FAMILYSITE\n1 GEDC\n2 VERS 5.5.1\n2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n"
+        f"1 DATE {_gedcom_date(timezone.now().date())}\n"
+    )
+
+    members = FamilyMember.objects.order_by('pk').values(
+        'id', 'name', 'gender', 'date_of_birth', 'date_of_death', 'is_deceased',
+        'occupation', 'education', 'temp_member_id', 'photo',
+    ).iterator(chunk_size=chunk_size)
+    for m in members:
+        genders[m['id']] = m['gender']
+        lines = [f"0 @I{m['id']}@ INDI", f"1 NAME {_gedcom_text(m['name'])}"]
+        lines.append(f"1 SEX {GEDCOM_SEX.get(m['gender'], 'U')}")
+        if m['date_of_birth']:
+            lines += ["1 BIRT", f"2 DATE {_gedcom_date(m['date_of_birth'])}"]
+        if m['date_of_death']:
+            lines += ["1 DEAT", f"2 DATE {_gedcom_date(m['date_of_death'])}"]
+        elif m['is_deceased']:
+            lines.append("1 DEAT Y")
+        if m['occupation']:
+            lines.append(f"1 OCCU {_gedcom_text(m['occupation'])}")
+        if m['education']:
+            lines.append(f"1 EDUC {_gedcom_text(m['education'])}")
+        if m['temp_member_id']:
+            lines.append(f"1 REFN {_gedcom_text(m['temp_member_id'])}")
+        if m['photo']:
+            extension = os.path.splitext(m['photo'])[1].lstrip('.').lower() or 'jpg'
+            lines += ["1 OBJE", f"2 FILE {_photo_url(m['photo'])}", f"3 FORM {extension}"]
+        if m['id'] in unions.famc:
+            lines.append(f"1 FAMC @F{unions.famc[m['id']]}@")
+        lines += [f"1 FAMS @F{number}@" for number in unions.fams.get(m['id'], ())]
+        yield '\n'.join(lines) + '\n'
+
+    for number, partners in enumerate(unions.partners, start=1):
+        lines = [f"0 @F{number}@ FAM"]
+        # Order partners so a male partner is HUSB where genders allow it
+        ordered = sorted(partners, key=lambda pk: genders.get(pk) != 'M')
+        for tag, partner_id in zip(('HUSB', 'WIFE'), ordered):
+            lines.append(f"1 {tag} @I{partner_id}@")
+        lines += [f"1 CHIL @I{child_id}@" for child_id in unions.children.get(number, ())]
+        yield '\n'.join(lines) + '\n'
+
+    yield "0 TRLR\n"
+
+
+# -- JSON ----------------------------------------------------------------------
+
+def _encode(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def _json_array(key, rows, first=False):
+    """Yield `"key":[row,row,...]` one row at a time."""
+    yield ('' if first else ',') + f'"{key}":['
+    separator = ''
+    for row in rows:
+        yield separator + _encode(row)
+        separator = ','
+    yield ']'
+
+
+def _json_pieces(chunk_size):
+    yield '{' + f'"format":"familysite-genealogy","version":1,"exported_at":{_encode(timezone.now())},'
+
+    families = Family.objects.order_by('pk').values('id', 'sl_no', 'branch', 'member_no', 'created_at')
+    yield from _json_array('families', families.iterator(chunk_size=chunk_size), first=True)
+
+    def members():
+        rows = FamilyMember.objects.order_by('pk').values(*MEMBER_EXPORT_FIELDS)
+        for row in rows.iterator(chunk_size=chunk_size):
+            row['photo'] = _photo_url(row['photo'])
+            yield row
+    yield from _json_array('members', members())
+
+    relationships = (
+        Relationship.objects.order_by('pk')
+        .values_list('from_member_id', 'to_member_id', 'relation_type')
+        .iterator(chunk_size=chunk_size)
+    )
+    yield from _json_array('relationships', relationships)
+    yield from _json_array('parents', _parent_rows(chunk_size))
+    yield '}\n'
+
+
+def _buffered(pieces, size=WRITE_BUFFER_SIZE):
+    """Join small text pieces into chunks of roughly `size` characters."""
+    buffer, length = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_gedcom(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the genealogy as GEDCOM 5.5.1 text in ~64 KB chunks."""
+    return _buffered(_gedcom_pieces(chunk_size))
+
+
+def iter_json(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield a compact JSON document in ~64 KB chunks:
+        { format, version, exported_at, families: [...], members: [...],
+          relationships: [[from, to, type]], parents: [[child, parent]] }
+    """
+    return _buffered(_json_pieces(chunk_size))
+
+
+EXPORTERS = {
+    'gedcom': (iter_gedcom, 'text/vnd.familysearch.gedcom; charset=utf-8', 'ged'),
+    'json': (iter_json, 'application/json', 'json'),
+}
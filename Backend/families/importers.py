@@ -0,0 +1,374 @@
+"""
+Genealogy Import
+================
+Bulk import of people from CSV or GEDCOM files into FamilyMember, the
+`parents` M2M and Spouse relationships.
+
+Input is read one line at a time: parsers yield PersonRow / UnionRow
+records, and GenealogyImporter buffers members into fixed-size chunks for
+bulk_create. Only the external-reference → pk map and the pending parent
+and spouse pairs stay in memory; references are resolved once every member
+is stored, so rows may mention people defined later in the file.
+
+External references are kept in FamilyMember.temp_member_id, so a re-import
+skips people already loaded and may link new rows to them.
+
+Parent links that would make someone their own ancestor (together with the
+links already stored or accepted earlier in the file) are reported as row
+errors and not stored, as the interactive forms reject them with
+LineageCycleError, so the rebuilt closure covers every imported member.
+
+CSV columns (header row required; all but `name` optional):
+    id, name | first_name + last_name, gender, date_of_birth, date_of_death,
+    is_deceased, relation, father, mother, parents (';'-separated ids),
+    spouse (';'-separated ids), age, nickname, occupation, education,
+    place_of_work, blood_group, phone_no, email_id, church_parish, address, bio
+
+GEDCOM: INDI records (NAME, SEX, BIRT/DEAT DATE, OCCU, EDUC) and FAM
+records (HUSB, WIFE, CHIL).
+"""
+import csv
+from collections import defaultdict, namedtuple
+from datetime import date
+
+from django.db import transaction
+
+from accounts.user_cache import invalidate_users
+from .lineage import rebuild_lineage
+from .models import FamilyMember, Lineage, Relationship
+from .tree_cache import bump_tree_version
+
+IMPORT_CHUNK_SIZE = 1000
+
+# line: source line number; ref: external id; fields: FamilyMember values
+PersonRow = namedtuple('PersonRow', 'line ref fields parent_refs spouse_refs')
+# A GEDCOM FAM record: its partners are spouses and parents of every child
+UnionRow = namedtuple('UnionRow', 'line partner_refs child_refs')
+
+GENDERS = {'m': 'M', 'male': 'M', 'f': 'F', 'female': 'F', 'o': 'O', 'other': 'O', 'u': 'O', '': 'M'}
+TEXT_COLUMNS = {
+    'nickname': 'nickname', 'occupation': 'occupation', 'education': 'education',
+    'place_of_work': 'place_of_work', 'blood_group': 'blood_group', 'phone_no': 'phone_no',
+    'email_id': 'email_id', 'church_parish': 'church_parish', 'address': 'address_if_different',
+    'bio': 'bio',
+}
+RELATION_VALUES = {value for value, _ in FamilyMember.RELATION_CHOICES}
+GEDCOM_MONTHS = {m: i for i, m in enumerate(
+    ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'), start=1)}
+
+
+class ImportRowError(ValueError):
+    """A single input row cannot be imported; the rest of the file carries on."""
+
+
+def _split_refs(value):
+    return [ref.strip() for ref in (value or '').split(';') if ref.strip()]
+
+
+def _iso_date(value, column):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ImportRowError(f"'{column}' must be a YYYY-MM-DD date, got {value!r}.")
+
+
+def _age(dob, dod=None):
+    if not dob:
+        return None
+    until = dod or date.today()
+    return until.year - dob.year - ((until.month, until.day) < (dob.month, dob.day))
+
+
+def _member_fields(name, gender, dob=None, dod=None, is_deceased=False, relation='Other', age=None, **extra):
+    """Validate and normalise the values shared by every input format."""
+    name = (name or '').strip()
+    if not name:
+        raise ImportRowError("A name is required.")
+    if len(name) > 100:
+        raise ImportRowError("Names are limited to 100 characters.")
+    gender_code = GENDERS.get((gender or '').strip().lower())
+    if gender_code is None:
+        raise ImportRowError(f"Unknown gender {gender!r}.")
+    if relation not in RELATION_VALUES:
+        raise ImportRowError(f"Unknown relation {relation!r}.")
+    return dict(
+        name=name, gender=gender_code, date_of_birth=dob, date_of_death=dod,
+        is_deceased=bool(is_deceased or dod), relation=relation,
+        age=age if age is not None else _age(dob, dod), **extra,
+    )
+
+
+# -- CSV -----------------------------------------------------------------------
+
+def iter_csv_rows(lines):
+    """Yield a PersonRow, or a (line, ref, ImportRowError) tuple, per data row of a CSV file."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        line = reader.line_num
+        row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+        ref = row.get('id') or None
+        try:
+            name = row.get('name') or f"{row.get('first_name', '')} {row.get('last_name', '')}".strip()
+            age = row.get('age')
+            if age and not age.isdigit():
+                raise ImportRowError(f"'age' must be a whole number, got {age!r}.")
+            fields = _member_fields(
+                name, row.get('gender'),
+                dob=_iso_date(row.get('date_of_birth'), 'date_of_birth'),
+                dod=_iso_date(row.get('date_of_death'), 'date_of_death'),
+                is_deceased=row.get('is_deceased', '').lower() in ('1', 'true', 'yes'),
+                relation=row.get('relation') or 'Other',
+                age=int(age) if age else None,
+                **{field: row[column] for column, field in TEXT_COLUMNS.items() if row.get(column)},
+            )
+        except ImportRowError as e:
+            yield line, ref, e
+            continue
+        parent_refs = [r for r in (row.get('father'), row.get('mother')) if r] + _split_refs(row.get('parents'))
+        yield PersonRow(line, ref, fields, parent_refs, _split_refs(row.get('spouse')))
+
+
+# -- GEDCOM --------------------------------------------------------------------
+
+def _gedcom_date(value):
+    """'12 MAR 1950' → date; partial or approximate dates are left out."""
+    parts = value.upper().split()
+    if len(parts) == 3 and parts[1] in GEDCOM_MONTHS and parts[0].isdigit() and parts[2].isdigit():
+        try:
+            return date(int(parts[2]), GEDCOM_MONTHS[parts[1]], int(parts[0]))
+        except ValueError:
+            return None
+    return None
+
+
+def _gedcom_records(lines):
+    """Group GEDCOM lines into (line, xref, tag, [(level, tag, value)]) level-0 records."""
+    record = None
+    for number, raw in enumerate(lines, start=1):
+        parts = raw.strip().lstrip('\ufeff').split(' ', 2)
+        if len(parts) < 2 or not parts[0].isdigit():
+            continue
+        level = int(parts[0])
+        if level == 0:
+            if record:
+                yield record
+            if parts[1].startswith('@'):
+                record = (number, parts[1].strip('@'), parts[2].strip() if len(parts) > 2 else '', [])
+            else:
+                record = None
+        elif record:
+            record[3].append((level, parts[1], parts[2].strip() if len(parts) > 2 else ''))
+    if record:
+        yield record
+
+
+def iter_gedcom_rows(lines):
+    """Yield a PersonRow (or error tuple) per INDI record and a UnionRow per FAM record."""
+    for line, xref, tag, body in _gedcom_records(lines):
+        if tag == 'INDI':
+            values = {'gender': 'U', 'name': ''}
+            event = None
+            deceased = False
+            for level, sub_tag, value in body:
+                if level == 1:
+                    event = sub_tag
+                    if sub_tag == 'NAME' and not values['name']:
+                        values['name'] = ' '.join(value.replace('/', ' ').split())
+                    elif sub_tag == 'SEX':
+                        values['gender'] = value
+                    elif sub_tag == 'DEAT':
+                        deceased = True
+                    elif sub_tag == 'OCCU':
+                        values['occupation'] = value[:100]
+                    elif sub_tag == 'EDUC':
+                        values['education'] = value[:100]
+                elif level == 2 and sub_tag == 'DATE' and event in ('BIRT', 'DEAT'):
+                    values['dob' if event == 'BIRT' else 'dod'] = _gedcom_date(value)
+            try:
+                fields = _member_fields(values.pop('name'), values.pop('gender'), is_deceased=deceased, **values)
+            except ImportRowError as e:
+                yield line, xref, e
+                continue
+            yield PersonRow(line, xref, fields, [], [])
+        elif tag == 'FAM':
+            partners, children = [], []
+            for level, sub_tag, value in body:
+                if level == 1 and sub_tag in ('HUSB', 'WIFE'):
+                    partners.append(value.strip('@'))
+                elif level == 1 and sub_tag == 'CHIL':
+                    children.append(value.strip('@'))
+            yield UnionRow(line, partners, children)
+
+
+PARSERS = {'csv': iter_csv_rows, 'gedcom': iter_gedcom_rows}
+
+
+def detect_format(filename):
+    """'csv' or 'gedcom' from a file name, or None."""
+    lowered = (filename or '').lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.ged', '.gedcom')):
+        return 'gedcom'
+    return None
+
+
+# -- Import --------------------------------------------------------------------
+
+class GenealogyImporter:
+    """
+    Stream parsed rows into the database for one Family.
+
+    Members are flushed with bulk_create every `chunk_size` rows; parent and
+    spouse pairs are resolved and bulk-inserted at the end. Everything runs
+    in one transaction (rolled back with `dry_run`); rows that fail
+    validation or reference unknown people are reported, not fatal.
+    """
+
+    def __init__(self, family, created_by=None, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False):
+        self.family = family
+        self.created_by = created_by
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.ref_to_pk = {}
+        self.pending = []          # [(line, ref, FamilyMember)] awaiting bulk_create
+        self.parent_pairs = []     # [(line, parent_ref, child_ref)]
+        self.spouse_pairs = []     # [(line, ref, ref)]
+        self.errors = []
+        self.created = 0
+
+    def error(self, line, ref, message):
+        self.errors.append({"line": line, "ref": ref, "error": str(message)})
+
+    def run(self, rows):
+        """Import every row and return the report dict."""
+        with transaction.atomic():
+            self.ref_to_pk = dict(
+                FamilyMember.objects.filter(family=self.family, temp_member_id__isnull=False)
+                .values_list('temp_member_id', 'pk')
+            )
+            existing = set(self.ref_to_pk)
+            seen = set()
+
+            for row in rows:
+                if isinstance(row, UnionRow):
+                    for child_ref in row.child_refs:
+                        self.parent_pairs.extend((row.line, p, child_ref) for p in row.partner_refs)
+                    partners = row.partner_refs
+                    self.spouse_pairs.extend(
+                        (row.line, partners[i], partners[j])
+                        for i in range(len(partners)) for j in range(i + 1, len(partners))
+                    )
+                    continue
+                if not isinstance(row, PersonRow):
+                    self.error(*row)
+                    continue
+                if row.ref and row.ref in existing:
+                    self.error(row.line, row.ref, "Already imported; skipped.")
+                    continue
+                if row.ref and row.ref in seen:
+                    self.error(row.line, row.ref, "Duplicate id in file; skipped.")
+                    continue
+                if row.ref:
+                    seen.add(row.ref)
+                    self.parent_pairs.extend((row.line, p, row.ref) for p in row.parent_refs)
+                    self.spouse_pairs.extend((row.line, row.ref, s) for s in row.spouse_refs)
+                elif row.parent_refs or row.spouse_refs:
+                    self.error(row.line, None, "Rows without an id cannot be linked; imported unlinked.")
+
+                member = FamilyMember(
+                    family=self.family, temp_member_id=row.ref, created_by=self.created_by, **row.fields
+                )
+                self.pending.append((row.line, row.ref, member))
+                if len(self.pending) >= self.chunk_size:
+                    self.flush()
+            self.flush()
+
+            parent_links = self.link_parents()
+            relationships = self.link_spouses()
+            cyclic = sorted(rebuild_lineage()) if (parent_links or self.created) else []
+            bump_tree_version()
+            if self.created and self.created_by is not None:
+                # bulk_create sends no signals: the guardian's cached managed members
+                invalidate_users(self.created_by.pk)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        return {
+            "members": self.created,
+            "parent_links": parent_links,
+            "relationships": relationships,
+            "cyclic_members": cyclic,
+            "errors": self.errors,
+            "dry_run": self.dry_run,
+        }
+
+    def flush(self):
+        if not self.pending:
+            return
+        members = FamilyMember.objects.bulk_create([member for _, _, member in self.pending])
+        for (_, ref, _), member in zip(self.pending, members):
+            if ref:
+                self.ref_to_pk[ref] = member.pk
+        self.created += len(members)
+        self.pending = []
+
+    def _resolve(self, pairs):
+        """Yield (line, pk, pk, ref) for pairs whose references both exist; report the rest."""
+        for line, a_ref, b_ref in pairs:
+            missing = [ref for ref in (a_ref, b_ref) if ref not in self.ref_to_pk]
+            if missing:
+                self.error(line, b_ref, f"Unknown reference {missing[0]!r}.")
+                continue
+            a, b = self.ref_to_pk[a_ref], self.ref_to_pk[b_ref]
+            if a == b:
+                self.error(line, b_ref, "A person cannot be linked to themselves.")
+                continue
+            yield line, a, b, b_ref
+
+    def link_parents(self):
+        Through = FamilyMember.parents.through
+        # Direct parent → child edges: those stored (depth-1 closure rows) plus those accepted so far
+        children = defaultdict(set)
+        for parent, child in Lineage.objects.filter(depth=1).values_list('ancestor_id', 'descendant_id'):
+            children[parent].add(child)
+
+        def is_descendant(member, of):
+            stack, seen = [of], {of}
+            while stack:
+                for child in children[stack.pop()]:
+                    if child == member:
+                        return True
+                    if child not in seen:
+                        seen.add(child)
+                        stack.append(child)
+            return False
+
+        rows = {}
+        for line, parent, child, ref in self._resolve(self.parent_pairs):
+            if child not in children[parent]:
+                if is_descendant(parent, child):
+                    self.error(line, ref, "This parent link would make a member their own ancestor; skipped.")
+                    continue
+                children[parent].add(child)
+            rows[(child, parent)] = Through(from_familymember_id=child, to_familymember_id=parent)
+        self.parent_pairs = []
+        Through.objects.bulk_create(rows.values(), batch_size=self.chunk_size, ignore_conflicts=True)
+        return len(rows)
+
+    def link_spouses(self):
+        rows = {
+            tuple(sorted((a, b))): Relationship(from_member_id=a, to_member_id=b, relation_type='Spouse')
+            for _, a, b, _ in self._resolve(self.spouse_pairs)
+        }
+        self.spouse_pairs = []
+        Relationship.objects.bulk_create(rows.values(), batch_size=self.chunk_size, ignore_conflicts=True)
+        return len(rows)
+
+
+def import_genealogy(lines, file_format, family, **options):
+    """Parse `lines` (any iterable of text lines) as `file_format` and import them into `family`."""
+    return GenealogyImporter(family, **options).run(PARSERS[file_format](lines))
@@ -0,0 +1,191 @@
+"""
+Kinship Resolver
+================
+Names how two members are related ("second cousin once removed",
+"wife's brother") and returns the path between them through the inferred
+tree.
+
+KinshipIndex is built once per tree version from the parent and spouse
+links of the assembled tree (the same graph FamilyTreeView serves). Every
+member carries a map of its ancestors at their nearest generation, filled
+in topological order, so a query is a lookup-and-intersect of two small
+pedigrees instead of a search over the whole clan.
+
+Members have two parents, so the parent graph is a DAG rather than a tree
+and single-parent LCA schemes (Euler tour, binary lifting) do not apply;
+the per-member ancestor maps play their role here.
+"""
+from collections import defaultdict, deque
+
+ORDINALS = {1: "first", 2: "second", 3: "third", 4: "fourth", 5: "fifth",
+            6: "sixth", 7: "seventh", 8: "eighth", 9: "ninth", 10: "tenth"}
+REMOVALS = {1: "once", 2: "twice", 3: "thrice"}
+
+
+def _gendered(gender, male, female, neutral):
+    return {'M': male, 'F': female}.get(gender, neutral)
+
+
+def _ordinal(n):
+    return ORDINALS.get(n, f"{n}th")
+
+
+def describe(da, db, gender):
+    """
+    Name of B as seen from A, where their closest common ancestor is `da`
+    generations above A and `db` generations above B. `gender` is B's.
+    """
+    if da == 0 and db == 0:
+        return "self"
+    if da == 0:
+        base = _gendered(gender, "son", "daughter", "child")
+        if db == 1:
+            return base
+        return "great-" * (db - 2) + "grand" + base
+    if db == 0:
+        base = _gendered(gender, "father", "mother", "parent")
+        if da == 1:
+            return base
+        return "great-" * (da - 2) + "grand" + base
+    if da == 1 and db == 1:
+        return _gendered(gender, "brother", "sister", "sibling")
+    if da == 1:
+        return "great-" * (db - 2) + _gendered(gender, "nephew", "niece", "sibling's child")
+    if db == 1:
+        return "great-" * (da - 2) + _gendered(gender, "uncle", "aunt", "parent's sibling")
+
+    degree = min(da, db) - 1
+    removed = abs(da - db)
+    name = f"{_ordinal(degree)} cousin"
+    if removed:
+        name += f" {REMOVALS.get(removed, f'{removed} times')} removed"
+    return name
+
+
+def spouse_word(gender):
+    return _gendered(gender, "husband", "wife", "spouse")
+
+
+class KinshipIndex:
+    """Nearest-generation ancestor maps and spouse adjacency for one tree version."""
+    __slots__ = ('nodes', 'parents', 'spouses', 'ancestors')
+
+    def __init__(self, graph):
+        self.nodes = {node['id']: node for node in graph.nodes}
+        self.parents = {child: list(parents) for child, parents in graph.parents.items()}
+        self.spouses = defaultdict(list)
+        for link in graph.links:
+            if link['type'] == 'spouse' and link['source'] != link['target']:
+                self.spouses[link['source']].append(link['target'])
+                self.spouses[link['target']].append(link['source'])
+        self.ancestors = self._build_ancestors(graph.children)
+
+    def _build_ancestors(self, children):
+        """member -> {ancestor: nearest generation}, computed parents-first (Kahn's algorithm)."""
+        pending = {node_id: len(set(self.parents.get(node_id, ()))) for node_id in self.nodes}
+        ready = deque(node_id for node_id, count in pending.items() if count == 0)
+        ancestors = {}
+        while ready:
+            node_id = ready.popleft()
+            mine = {}
+            for parent_id in set(self.parents.get(node_id, ())):
+                mine[parent_id] = 1
+                for ancestor_id, depth in ancestors.get(parent_id, {}).items():
+                    if depth + 1 < mine.get(ancestor_id, depth + 2):
+                        mine[ancestor_id] = depth + 1
+            ancestors[node_id] = mine
+            for child_id in set(children.get(node_id, ())):
+                if child_id in pending:
+                    pending[child_id] -= 1
+                    if pending[child_id] == 0:
+                        ready.append(child_id)
+        # Members caught in a parent cycle never become ready; they only match themselves
+        return ancestors
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def _generations(self, node_id):
+        mine = dict(self.ancestors.get(node_id, {}))
+        mine[node_id] = 0
+        return mine
+
+    def common_ancestor(self, a, b):
+        """(ancestor, da, db) minimising da + db, or None when A and B share no ancestor."""
+        gens_a, gens_b = self._generations(a), self._generations(b)
+        if len(gens_a) > len(gens_b):
+            smaller, larger, swapped = gens_b, gens_a, True
+        else:
+            smaller, larger, swapped = gens_a, gens_b, False
+
+        best = None
+        for ancestor_id, depth in smaller.items():
+            other = larger.get(ancestor_id)
+            if other is None:
+                continue
+            da, db = (other, depth) if swapped else (depth, other)
+            key = (da + db, abs(da - db), ancestor_id)
+            if best is None or key < best[0]:
+                best = (key, ancestor_id, da, db)
+        return best and best[1:]
+
+    def _climb(self, node_id, ancestor_id, depth):
+        """Members from `node_id` up to `ancestor_id`, following nearest-generation parents."""
+        path = [node_id]
+        while depth > 0:
+            for parent_id in self.parents.get(node_id, ()):
+                reach = 0 if parent_id == ancestor_id else self.ancestors.get(parent_id, {}).get(ancestor_id)
+                if reach == depth - 1:
+                    node_id = parent_id
+                    break
+            path.append(node_id)
+            depth -= 1
+        return path
+
+    def blood_relation(self, a, b):
+        """(name of B from A, path, common ancestor) through their closest common ancestor, or None."""
+        hit = self.common_ancestor(a, b)
+        if hit is None:
+            return None
+        ancestor_id, da, db = hit
+        up = self._climb(a, ancestor_id, da)
+        down = self._climb(b, ancestor_id, db)
+        return describe(da, db, self.nodes[b].get('gender')), up + down[-2::-1], ancestor_id
+
+    def relate(self, a, b):
+        """
+        Return {relation, path, common_ancestor} describing B as seen from A.
+
+        Tries a blood relation first, then one marriage on either side:
+        A's spouse's relative ("wife's brother") or a relative's spouse
+        ("brother's wife"). `relation` is None when nothing connects them.
+        """
+        gender = lambda node_id: self.nodes[node_id].get('gender')
+
+        blood = self.blood_relation(a, b)
+        if blood:
+            return self._result(*blood)
+
+        if b in self.spouses.get(a, ()):
+            return self._result(spouse_word(gender(b)), [a, b])
+
+        for spouse_id in self.spouses.get(a, ()):
+            blood = self.blood_relation(spouse_id, b)
+            if blood:
+                name, path, common = blood
+                return self._result(f"{spouse_word(gender(spouse_id))}'s {name}", [a] + path, common)
+
+        for spouse_id in self.spouses.get(b, ()):
+            blood = self.blood_relation(a, spouse_id)
+            if blood:
+                name, path, common = blood
+                return self._result(f"{name}'s {spouse_word(gender(b))}", path + [b], common)
+
+        return self._result(None, [])
+
+    def _result(self, relation, path, common=None):
+        return {
+            "relation": relation,
+            "common_ancestor": common,
+            "path": [{"id": node_id, "name": self.nodes[node_id]['name']} for node_id in path],
+        }
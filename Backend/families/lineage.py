@@ -0,0 +1,238 @@
+"""
+Lineage Closure Table
+=====================
+Keeps the Lineage closure table (ancestor, descendant, depth, path_count)
+in step with parent edges, so lineage questions are single indexed queries
+instead of recursive walks over `parents`.
+
+A parent edge (parent → child) exists while at least one source declares it:
+    - a FamilyMember.parents M2M row (child.parents contains parent)
+    - Relationship(from=child, to=parent, type Father/Mother)
+    - Relationship(from=parent, to=child, type Son/Daughter)
+
+Edges are added/removed incrementally by signals (see signals.py); writes
+that would make a member their own ancestor raise LineageCycleError before
+anything is stored. rebuild_lineage() recomputes the table from scratch for
+bulk writes that bypass signals.
+"""
+from collections import defaultdict, deque
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+
+from .models import FamilyMember, Relationship, Lineage
+
+# Relationship types whose to_member is the parent of from_member, and vice versa
+CHILD_TO_PARENT_TYPES = ('Father', 'Mother')
+PARENT_TO_CHILD_TYPES = ('Son', 'Daughter')
+
+
+class LineageCycleError(ValidationError):
+    """Raised when a parent edge would make a member their own ancestor."""
+
+
+def relationship_edge(from_id, to_id, relation_type):
+    """(parent_id, child_id) encoded by a Relationship row, or None if it is not a parent edge."""
+    if relation_type in CHILD_TO_PARENT_TYPES:
+        return to_id, from_id
+    if relation_type in PARENT_TO_CHILD_TYPES:
+        return from_id, to_id
+    return None
+
+
+def check_edge(parent_id, child_id):
+    """Raise LineageCycleError if adding parent → child would create a cycle."""
+    if parent_id == child_id:
+        raise LineageCycleError("A member cannot be their own parent.")
+    if Lineage.objects.filter(ancestor_id=child_id, descendant_id=parent_id).exists():
+        raise LineageCycleError("This parent link would make a member their own ancestor.")
+
+
+def edge_declared(parent_id, child_id):
+    """True while any source (M2M row or Relationship) still declares parent → child."""
+    Through = FamilyMember.parents.through
+    if Through.objects.filter(from_familymember_id=child_id, to_familymember_id=parent_id).exists():
+        return True
+    return Relationship.objects.filter(
+        Q(from_member_id=child_id, to_member_id=parent_id, relation_type__in=CHILD_TO_PARENT_TYPES) |
+        Q(from_member_id=parent_id, to_member_id=child_id, relation_type__in=PARENT_TO_CHILD_TYPES)
+    ).exists()
+
+
+def _edge_in_closure(parent_id, child_id):
+    # Depth-1 rows only ever come from direct edges
+    return Lineage.objects.filter(ancestor_id=parent_id, descendant_id=child_id, depth=1).exists()
+
+
+def _paths_through(parent_id, child_id):
+    """{(ancestor, descendant, depth): paths} contributed by the single edge parent → child."""
+    ups = [(parent_id, 0, 1)]
+    ups += Lineage.objects.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth', 'path_count')
+    downs = [(child_id, 0, 1)]
+    downs += Lineage.objects.filter(ancestor_id=child_id).values_list('descendant_id', 'depth', 'path_count')
+
+    paths = defaultdict(int)
+    for ancestor_id, up_depth, up_paths in ups:
+        for descendant_id, down_depth, down_paths in downs:
+            paths[(ancestor_id, descendant_id, up_depth + 1 + down_depth)] += up_paths * down_paths
+    return paths
+
+
+def _apply(paths, sign):
+    """Add (sign=1) or subtract (sign=-1) path counts, creating and deleting rows as needed."""
+    if not paths:
+        return
+    ancestor_ids = {a for a, _, _ in paths}
+    descendant_ids = {d for _, d, _ in paths}
+    existing = {
+        (row.ancestor_id, row.descendant_id, row.depth): row
+        for row in Lineage.objects.filter(ancestor_id__in=ancestor_ids, descendant_id__in=descendant_ids)
+    }
+
+    to_create, to_update, to_delete = [], [], []
+    for key, count in paths.items():
+        row = existing.get(key)
+        if row is None:
+            if sign > 0:
+                to_create.append(Lineage(ancestor_id=key[0], descendant_id=key[1], depth=key[2], path_count=count))
+            continue
+        row.path_count += sign * count
+        (to_update if row.path_count > 0 else to_delete).append(row)
+
+    Lineage.objects.bulk_create(to_create)
+    Lineage.objects.bulk_update(to_update, ['path_count'])
+    if to_delete:
+        Lineage.objects.filter(pk__in=[row.pk for row in to_delete]).delete()
+
+
+def add_edge(parent_id, child_id):
+    """Record parent → child in the closure (no-op if another source already declared it)."""
+    with transaction.atomic():
+        if _edge_in_closure(parent_id, child_id):
+            return
+        check_edge(parent_id, child_id)
+        _apply(_paths_through(parent_id, child_id), sign=1)
+
+
+def remove_edge(parent_id, child_id, force=False):
+    """Drop parent → child from the closure once no source declares it (or unconditionally with force)."""
+    with transaction.atomic():
+        if not _edge_in_closure(parent_id, child_id):
+            return
+        if not force and edge_declared(parent_id, child_id):
+            return
+        _apply(_paths_through(parent_id, child_id), sign=-1)
+
+
+def detach_member(member_id):
+    """Remove every parent edge touching a member that is about to be deleted."""
+    edges = Lineage.objects.filter(Q(ancestor_id=member_id) | Q(descendant_id=member_id), depth=1)
+    for parent_id, child_id in list(edges.values_list('ancestor_id', 'descendant_id')):
+        remove_edge(parent_id, child_id, force=True)
+
+
+def declared_edges():
+    """Every distinct (parent_id, child_id) pair declared by any source."""
+    Through = FamilyMember.parents.through
+    edges = set(Through.objects.values_list('to_familymember_id', 'from_familymember_id'))
+    rows = Relationship.objects.filter(
+        relation_type__in=CHILD_TO_PARENT_TYPES + PARENT_TO_CHILD_TYPES
+    ).values_list('from_member_id', 'to_member_id', 'relation_type')
+    for from_id, to_id, relation_type in rows:
+        edges.add(relationship_edge(from_id, to_id, relation_type))
+    return edges
+
+
+def compute_closure(edges):
+    """
+    {(ancestor, descendant, depth): paths} for a set of (parent, child) edges.
+
+    Processes members in topological order (Kahn's algorithm); members caught
+    in a cycle never become ready and are left out, so bad legacy data cannot
+    loop forever. Returns (closure, skipped_member_ids).
+    """
+    parents_of = defaultdict(list)
+    children_of = defaultdict(list)
+    for parent_id, child_id in edges:
+        if parent_id != child_id:
+            parents_of[child_id].append(parent_id)
+            children_of[parent_id].append(child_id)
+
+    members = set(parents_of) | set(children_of)
+    pending = {m: len(parents_of[m]) for m in members}
+    ready = deque(m for m in members if pending[m] == 0)
+    ancestors = {}   # member -> {(ancestor, depth): paths}
+
+    while ready:
+        member = ready.popleft()
+        mine = defaultdict(int)
+        for parent_id in parents_of[member]:
+            mine[(parent_id, 1)] += 1
+            for (ancestor_id, depth), paths in ancestors[parent_id].items():
+                mine[(ancestor_id, depth + 1)] += paths
+        ancestors[member] = mine
+        for child_id in children_of[member]:
+            pending[child_id] -= 1
+            if pending[child_id] == 0:
+                ready.append(child_id)
+
+    closure = {
+        (ancestor_id, member, depth): paths
+        for member, mine in ancestors.items()
+        for (ancestor_id, depth), paths in mine.items()
+    }
+    return closure, members - ancestors.keys()
+
+
+def rebuild_lineage(batch_size=5000):
+    """Recompute the whole closure table from the declared edges; returns members skipped as cyclic."""
+    closure, skipped = compute_closure(declared_edges())
+    # Closure rows number in the hundreds of thousands for large imports; insert
+    # plain tuples rather than building a model instance per row.
+    table = connection.ops.quote_name(Lineage._meta.db_table)
+    sql = f"INSERT INTO {table} (ancestor_id, descendant_id, depth, path_count) VALUES (%s, %s, %s, %s)"
+    rows = ((a, d, depth, paths) for (a, d, depth), paths in closure.items())
+    with transaction.atomic():
+        Lineage.objects.all().delete()
+        with connection.cursor() as cursor:
+            while batch := list(islice(rows, batch_size)):
+                cursor.executemany(sql, batch)
+    return skipped
+
+
+# -- Lineage queries: each is a single indexed query ---------------------------
+
+def ancestors_of(member_id, max_depth=None):
+    """Ancestors of a member annotated with their nearest `depth`, closest first."""
+    rows = Lineage.objects.filter(descendant_id=member_id)
+    if max_depth is not None:
+        rows = rows.filter(depth__lte=max_depth)
+    return rows.values('ancestor_id', 'ancestor__name').annotate(depth=Min('depth')).order_by('depth', 'ancestor_id')
+
+
+def descendants_of(member_id, max_depth=None):
+    """Descendants of a member annotated with their nearest `depth`, closest first."""
+    rows = Lineage.objects.filter(ancestor_id=member_id)
+    if max_depth is not None:
+        rows = rows.filter(depth__lte=max_depth)
+    return rows.values('descendant_id', 'descendant__name').annotate(depth=Min('depth')).order_by('depth', 'descendant_id')
+
+
+def descendant_counts(member_ids):
+    """{member_id: number of distinct descendants} for a set of branch roots."""
+    rows = (
+        Lineage.objects.filter(ancestor_id__in=member_ids)
+        .values('ancestor_id')
+        .annotate(count=Count('descendant_id', distinct=True))
+    )
+    counts = {member_id: 0 for member_id in member_ids}
+    counts.update((row['ancestor_id'], row['count']) for row in rows)
+    return counts
+
+
+def delete_subtree(member_id):
+    """Delete a member together with all of their descendants."""
+    descendants = Lineage.objects.filter(ancestor_id=member_id).values('descendant_id')
+    return FamilyMember.objects.filter(Q(pk=member_id) | Q(pk__in=descendants)).delete()
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from families.tree_cache import compact_tree_changes
+
+
+class Command(BaseCommand):
+    help = "Delete tree delta-sync log entries older than --days; older clients get a resync."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Keep this many days of changes (default 30).")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = compact_tree_changes(before)
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tree change entries."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from families.exporters import EXPORT_CHUNK_SIZE, EXPORTERS
+
+
+class Command(BaseCommand):
+    help = "Stream the whole genealogy as GEDCOM 5.5.1 or a compact JSON dump."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORTERS), default='gedcom', help="Output format (default gedcom).")
+        parser.add_argument('--output', '-o', help="File to write (default: standard output).")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        exporter = EXPORTERS[options['format']][0]
+        chunks = exporter(chunk_size=options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        try:
+            with open(options['output'], 'w', encoding='utf-8', newline='\n') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['format']} export to {options['output']}."))
@@ -0,0 +1,33 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from backapi.imaging import IMAGE_SOURCES, ensure_variants, generate_variants
+
+
+class Command(BaseCommand):
+    help = "Generate thumb/card/full WebP and JPEG variants for stored images that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help="Limit to a model label, e.g. profiles.Gallery (repeatable).")
+        parser.add_argument('--overwrite', action='store_true', help="Regenerate variants that already exist.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for label, field_name, filters in IMAGE_SOURCES:
+            if options['model'] and label not in options['model']:
+                continue
+            model = apps.get_model(label)
+            storage = model._meta.get_field(field_name).storage
+            names = (
+                model.objects.filter(**filters).exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True).distinct().iterator()
+            )
+            written = 0
+            for name in names:
+                if options['overwrite']:
+                    written += len(generate_variants(name, storage, overwrite=True))
+                else:
+                    written += len(ensure_variants(name, storage))
+            self.stdout.write(f"{label}.{field_name}: {written} files written.")
+            total += written
+        self.stdout.write(self.style.SUCCESS(f"Generated {total} image variants."))
@@ -0,0 +1,45 @@
+import io
+
+from django.core.management.base import BaseCommand, CommandError
+
+from families.importers import IMPORT_CHUNK_SIZE, detect_format, import_genealogy
+from families.models import Family
+
+
+class Command(BaseCommand):
+    help = "Import people, parent links and spouses from a CSV or GEDCOM file into a family."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (.csv) or GEDCOM (.ged) file to import.")
+        parser.add_argument('--family', required=True, help="member_no of the target family (created if missing).")
+        parser.add_argument('--branch', default="Main Branch", help="Branch for a newly created family.")
+        parser.add_argument('--format', choices=['csv', 'gedcom'], help="Input format (default: from the file extension).")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Members per bulk insert.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report without saving anything.")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        if not file_format:
+            raise CommandError("Cannot tell the format from the file name; pass --format csv|gedcom.")
+
+        family, _ = Family.objects.get_or_create(
+            member_no=options['family'], defaults={'sl_no': "1", 'branch': options['branch']}
+        )
+        try:
+            with io.open(options['path'], encoding='utf-8-sig', newline='') as lines:
+                report = import_genealogy(
+                    lines, file_format, family,
+                    chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']} ({error['ref'] or '-'}): {error['error']}")
+        if report['cyclic_members']:
+            self.stderr.write(f"Members caught in parent cycles: {report['cyclic_members']}")
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['members']} members, {report['parent_links']} parent links and "
+            f"{report['relationships']} relationships into {family} ({len(report['errors'])} errors)."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from families.lineage import rebuild_lineage
+from families.models import Lineage
+
+
+class Command(BaseCommand):
+    help = "Recompute the Lineage closure table from parents and parent-type relationships."
+
+    def handle(self, *args, **options):
+        skipped = rebuild_lineage()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt lineage: {Lineage.objects.count()} rows."))
+        if skipped:
+            ids = ", ".join(str(pk) for pk in sorted(skipped))
+            self.stdout.write(self.style.WARNING(f"Skipped members caught in parent cycles: {ids}"))
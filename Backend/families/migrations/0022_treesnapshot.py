@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:27
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def create_singleton(apps, schema_editor):
+    # Signals bump the version of row pk=1; it must exist before the first write
+    TreeSnapshot = apps.get_model('families', 'TreeSnapshot')
+    TreeSnapshot.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0021_alter_relationship_relation_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreeSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('built_version', models.PositiveBigIntegerField(default=0)),
+                ('payload', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_singleton, migrations.RunPython.noop),
+    ]
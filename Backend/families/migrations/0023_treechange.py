@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0022_treesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(db_index=True)),
+                ('kind', models.CharField(choices=[('node', 'Node'), ('link', 'Link')], max_length=4)),
+                ('op', models.CharField(choices=[('add', 'Add'), ('update', 'Update'), ('remove', 'Remove')], max_length=6)),
+                ('node_id', models.BigIntegerField(blank=True, null=True)),
+                ('source', models.BigIntegerField(blank=True, null=True)),
+                ('target', models.BigIntegerField(blank=True, null=True)),
+                ('link_type', models.CharField(blank=True, max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='treesnapshot',
+            name='log_floor',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
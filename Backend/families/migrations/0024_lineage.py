@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0023_treechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lineage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('path_count', models.PositiveIntegerField(default=1)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='families.familymember')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='families.familymember')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='families_li_descend_322a5c_idx')],
+                'unique_together': {('ancestor', 'descendant', 'depth')},
+            },
+        ),
+    ]
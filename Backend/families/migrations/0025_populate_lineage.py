@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def populate_lineage(apps, schema_editor):
+    from families.lineage import CHILD_TO_PARENT_TYPES, PARENT_TO_CHILD_TYPES, compute_closure, relationship_edge
+
+    FamilyMember = apps.get_model('families', 'FamilyMember')
+    Relationship = apps.get_model('families', 'Relationship')
+    Lineage = apps.get_model('families', 'Lineage')
+
+    edges = set(FamilyMember.parents.through.objects.values_list('to_familymember_id', 'from_familymember_id'))
+    rows = Relationship.objects.filter(
+        relation_type__in=CHILD_TO_PARENT_TYPES + PARENT_TO_CHILD_TYPES
+    ).values_list('from_member_id', 'to_member_id', 'relation_type')
+    edges.update(relationship_edge(*row) for row in rows)
+
+    closure, _ = compute_closure(edges)
+    Lineage.objects.bulk_create(
+        (
+            Lineage(ancestor_id=a, descendant_id=d, depth=depth, path_count=paths)
+            for (a, d, depth), paths in closure.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0024_lineage'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_lineage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:26
+
+import files.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0025_populate_lineage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deceasedmember',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=files.storage.content_storage, upload_to='deceased/photos/'),
+        ),
+        migrations.AlterField(
+            model_name='familymedia',
+            name='image',
+            field=models.ImageField(storage=files.storage.content_storage, upload_to='family/gallery/'),
+        ),
+        migrations.AlterField(
+            model_name='familymember',
+            name='photo',
+            field=models.ImageField(blank=True, null=True, storage=files.storage.content_storage, upload_to='members/photos/'),
+        ),
+    ]
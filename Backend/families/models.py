@@ -11,9 +11,16 @@ Models:
     - FamilyMedia: Gallery images categorised by event type.
     - Relationship: Directed edge between two FamilyMembers encoding a named
       relation (Father, Spouse, Uncle, etc.) used by the tree-builder.
+    - TreeSnapshot: Versioned, cross-process cache of the assembled tree payload.
+    - TreeChange: Node/link change log between tree versions, for delta sync.
+    - Lineage: Ancestor/descendant closure table over parent edges, kept
+      up to date at write time (see lineage.py).
 """
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from files.storage import content_storage
 
 
 class Family(models.Model):
@@ -51,6 +58,30 @@ class FamilyHead(models.Model):
     occupation = models.CharField(max_length=100)
 
 
+class FamilyMemberQuerySet(models.QuerySet):
+    def with_profile_data(self):
+        """
+        Annotate and prefetch everything FamilyMemberSerializer reads, so a
+        page of N members serializes in a constant number of queries:
+        committee_role / on_committee / account_exists annotations (used by
+        `role`, `is_committee` and `has_account`), plus relationships with
+        their target member and parent ids.
+        """
+        from django.apps import apps
+        Committee = apps.get_model('profiles', 'Committee')
+        User = apps.get_model(settings.AUTH_USER_MODEL)
+
+        first_entry = Committee.objects.filter(user__member=models.OuterRef('pk')).order_by('pk')
+        return self.annotate(
+            committee_role=models.Subquery(first_entry.values('role')[:1]),
+            on_committee=models.Exists(first_entry),
+            account_exists=models.Exists(User.objects.filter(member=models.OuterRef('pk'))),
+        ).prefetch_related(
+            models.Prefetch('relationships_from', queryset=Relationship.objects.select_related('to_member').order_by('pk')),
+            models.Prefetch('parents', queryset=FamilyMember.objects.only('pk').order_by('pk')),
+        )
+
+
 class FamilyMember(models.Model):
     """
     Individual family member with full profile data.
@@ -122,7 +153,7 @@ class FamilyMember(models.Model):
     email_id = models.EmailField(blank=True, null=True)
     church_parish = models.CharField(max_length=100, blank=True, null=True)
 
-    photo = models.ImageField(upload_to="members/photos/", blank=True, null=True)
+    photo = models.ImageField(upload_to="members/photos/", storage=content_storage, blank=True, null=True)
 
     # Link to other FamilyMember instances to represent parent/child relationships.
     # Use `symmetrical=False` so `parents` and `children` are distinct.
@@ -142,9 +173,14 @@ class FamilyMember(models.Model):
         blank=True,
     )
 
+    objects = FamilyMemberQuerySet.as_manager()
+
     @property
     def role(self):
         """Return committee role title if member is on a committee, else relation label."""
+        if hasattr(self, 'committee_role'):
+            # Annotated by FamilyMemberQuerySet.with_profile_data()
+            return self.committee_role or self.relation
         try:
             if hasattr(self, 'user_account') and self.user_account:
                 committee_entry = self.user_account.committee_entries.first()
@@ -157,6 +193,8 @@ class FamilyMember(models.Model):
     @property
     def is_committee(self):
         """True if this member's linked user account has any committee entries."""
+        if hasattr(self, 'on_committee'):
+            return self.on_committee
         try:
             if hasattr(self, 'user_account') and self.user_account:
                 return self.user_account.committee_entries.exists()
@@ -182,7 +220,7 @@ class DeceasedMember(models.Model):
 
     crematory = models.CharField(max_length=100)
 
-    photo = models.ImageField(upload_to="deceased/photos/", blank=True, null=True)
+    photo = models.ImageField(upload_to="deceased/photos/", storage=content_storage, blank=True, null=True)
 
 
 class FamilyMedia(models.Model):
@@ -196,7 +234,7 @@ class FamilyMedia(models.Model):
     family = models.ForeignKey(Family, on_delete=models.CASCADE, related_name="media")
 
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
-    image = models.ImageField(upload_to="family/gallery/")
+    image = models.ImageField(upload_to="family/gallery/", storage=content_storage)
 
 
 class Relationship(models.Model):
@@ -265,3 +303,72 @@ class Relationship(models.Model):
 
     def __str__(self):
         return f"{self.from_member.name} -> {self.relation_type} -> {self.to_member.name}"
+
+
+class TreeSnapshot(models.Model):
+    """
+    Persisted /api/families/tree/ payload shared by every worker process.
+
+    A single row (pk=1). `version` is bumped by signals on every write that
+    can change the tree; `payload` is valid while `built_version == version`.
+    Readers rebuild under a row lock, so concurrent misses share one rebuild.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    built_version = models.PositiveBigIntegerField(default=0)
+    payload = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(null=True, blank=True)
+    # TreeChange rows are complete for every version after this one
+    log_floor = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Tree v{self.version} (built v{self.built_version})"
+
+
+class TreeChange(models.Model):
+    """
+    Delta-sync log entry: one node or link that changed when the tree was
+    rebuilt at `version`. Rows are appended by tree_cache on every rebuild
+    (old payload diffed against the new one) and compacted by age.
+    """
+    KIND_CHOICES = [("node", "Node"), ("link", "Link")]
+    OP_CHOICES = [("add", "Add"), ("update", "Update"), ("remove", "Remove")]
+
+    version = models.PositiveBigIntegerField(db_index=True)
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+
+    # kind == "node"
+    node_id = models.BigIntegerField(null=True, blank=True)
+    # kind == "link"
+    source = models.BigIntegerField(null=True, blank=True)
+    target = models.BigIntegerField(null=True, blank=True)
+    link_type = models.CharField(max_length=50, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        if self.kind == "node":
+            return f"v{self.version} {self.op} node {self.node_id}"
+        return f"v{self.version} {self.op} {self.link_type} {self.source}->{self.target}"
+
+
+class Lineage(models.Model):
+    """
+    Closure-table row: `ancestor` is `depth` generations above `descendant`.
+
+    Parent edges come from FamilyMember.parents and parent-type Relationship
+    rows. Pedigrees can reach the same ancestor along several routes, so
+    `path_count` counts the distinct parent paths of this length; a row goes
+    away when its last path is removed. Maintained by lineage.py.
+    """
+    ancestor = models.ForeignKey(FamilyMember, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(FamilyMember, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveIntegerField()
+    path_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant', 'depth')
+        indexes = [models.Index(fields=['descendant', 'depth'])]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -[{self.depth}]-> {self.descendant_id}"
@@ -0,0 +1,174 @@
+"""
+Relationship Writes
+===================
+Shared write path for the `relationships` list submitted by the profile
+and managed-member forms.
+
+sync_relationships() diffs the submitted (to_member, relation_type) set
+against the member's stored rows and, inside one transaction:
+
+    - bulk-creates members referenced by name only,
+    - deletes only the rows that are no longer submitted,
+    - bulk-creates only the rows that are new,
+    - batches gender fix-ups, parent M2M additions and in-law spouse rows.
+
+Bulk writes do not send model signals, so the lineage closure and the tree
+version are updated here explicitly (see lineage.py and tree_cache.py).
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from accounts.user_cache import invalidate_member_users, invalidate_users
+
+from .models import FamilyMember, Relationship
+from .tree_cache import bump_tree_version
+from . import lineage
+
+IN_LAW_TYPES = ('Sister-in-law', 'Brother-in-law', 'Son-in-law', 'Daughter-in-law')
+# Onboarding also files grandparents under `parents` for tree compatibility
+PROFILE_PARENT_TYPES = (
+    'Father', 'Mother', 'Grandfather', 'Grandmother',
+    'Paternal Grandfather', 'Paternal Grandmother',
+    'Maternal Grandfather', 'Maternal Grandmother',
+)
+
+
+def parse_relationship_items(raw):
+    """The submitted list, whether it arrived as JSON text (FormData) or already parsed."""
+    try:
+        items = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        raise ValidationError("Relationships must be a JSON list.")
+    items = items or []
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValidationError("Relationships must be a list of objects.")
+    return items
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sync_relationships(member, items, created_by, parent_types=('Father', 'Mother'), assign_gender=False):
+    """
+    Make `member`'s outgoing relationships match `items`.
+
+    Each item carries `relation_type` and either `to_member`/`to_member_id`
+    or a `name`/`to_member_name` for a member to create. Targets of
+    `parent_types` are also added to `member.parents`. With `assign_gender`,
+    new and existing targets get the gender implied by the relation type
+    (Relationship.GENDER_MAP), and in-law items may name `married_to` to
+    record the in-law's spouse.
+
+    Raises LineageCycleError (rolling everything back) if a parent link
+    would make a member their own ancestor.
+    """
+    with transaction.atomic():
+        # 1. Resolve targets, creating members that were given by name only
+        resolved, to_create = [], []
+        for item in items:
+            rel_type = item.get('relation_type')
+            to_id = _as_id(item.get('to_member') or item.get('to_member_id'))
+            name = item.get('name') or item.get('to_member_name')
+            if not rel_type:
+                continue
+            if to_id is None and name:
+                new_member = FamilyMember(
+                    name=name,
+                    relation=rel_type,
+                    age=0,
+                    created_by=created_by,
+                    family=member.family,
+                )
+                if assign_gender:
+                    new_member.gender = Relationship.GENDER_MAP.get(rel_type, 'M')
+                to_create.append(new_member)
+                resolved.append((new_member, rel_type, item))
+            elif to_id is not None:
+                resolved.append((to_id, rel_type, item))
+
+        FamilyMember.objects.bulk_create(to_create)
+        if to_create:
+            invalidate_users(getattr(created_by, 'pk', None))   # the guardian's managed members
+        resolved = [
+            (target.pk if isinstance(target, FamilyMember) else target, rel_type, item)
+            for target, rel_type, item in resolved
+        ]
+
+        # 2. One query for every referenced member: drops unknown ids, drives gender fix-ups
+        genders = dict(
+            FamilyMember.objects.filter(pk__in={to_id for to_id, _, _ in resolved}).values_list('pk', 'gender')
+        )
+        submitted = {}
+        for to_id, rel_type, item in resolved:
+            if to_id in genders:
+                submitted.setdefault((to_id, rel_type), item)
+
+        # 3. Diff against the stored rows
+        stored = {
+            (to_id, rel_type): pk
+            for pk, to_id, rel_type in Relationship.objects.filter(from_member=member)
+            .values_list('pk', 'to_member_id', 'relation_type')
+        }
+        stale = [pk for key, pk in stored.items() if key not in submitted]
+        new = [key for key in submitted if key not in stored]
+
+        if stale:
+            # Deleted through the ORM so lineage and tree signals still fire
+            Relationship.objects.filter(pk__in=stale).delete()
+
+        Relationship.objects.bulk_create([
+            Relationship(from_member=member, to_member_id=to_id, relation_type=rel_type)
+            for to_id, rel_type in new
+        ])
+        for to_id, rel_type in new:
+            edge = lineage.relationship_edge(member.pk, to_id, rel_type)
+            if edge:
+                lineage.add_edge(*edge)
+
+        # 4. Batched side effects
+        changed = False
+        if assign_gender:
+            fixes = []
+            created_ids = {m.pk for m in to_create}
+            for to_id, rel_type in submitted:
+                gender = Relationship.GENDER_MAP.get(rel_type)
+                if gender and to_id not in created_ids and genders[to_id] != gender:
+                    genders[to_id] = gender
+                    fixes.append(FamilyMember(pk=to_id, gender=gender))
+            FamilyMember.objects.bulk_update(fixes, ['gender'])
+            invalidate_member_users(m.pk for m in fixes)
+            changed = bool(fixes)
+
+            spouse_pairs = set()
+            for (to_id, rel_type), item in submitted.items():
+                married_to = _as_id(item.get('married_to'))
+                if married_to and rel_type in IN_LAW_TYPES:
+                    spouse_pairs.add((married_to, to_id))
+            if spouse_pairs:
+                existing = set(
+                    Relationship.objects.filter(
+                        relation_type='Spouse',
+                        from_member_id__in={a for a, _ in spouse_pairs},
+                        to_member_id__in={b for _, b in spouse_pairs},
+                    ).values_list('from_member_id', 'to_member_id')
+                )
+                spouses = Relationship.objects.bulk_create([
+                    Relationship(from_member_id=a, to_member_id=b, relation_type='Spouse')
+                    for a, b in spouse_pairs - existing
+                ])
+                changed = changed or bool(spouses)
+
+        parent_ids = [to_id for to_id, rel_type in submitted if rel_type in parent_types]
+        if parent_ids:
+            member.parents.add(*parent_ids)
+
+        if to_create or new or changed:
+            bump_tree_version()
+
+    return {"created": len(new), "deleted": len(stale), "members_created": len(to_create)}
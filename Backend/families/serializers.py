@@ -1,4 +1,8 @@
+from collections import defaultdict
+
 from rest_framework import serializers
+from backapi.fastserializers import RowSerializer, FileURL, Nested, date_value
+from backapi.imaging import ImageVariantsField, variant_urls
 from .models import FamilyMember, Relationship
 
 class RelationshipSerializer(serializers.ModelSerializer):
@@ -9,9 +13,15 @@ class RelationshipSerializer(serializers.ModelSerializer):
         fields = ['id', 'to_member', 'to_member_name', 'relation_type']
 
 class FamilyMemberSerializer(serializers.ModelSerializer):
+    """
+    Full member profile. Serialize querysets from
+    `FamilyMember.objects.with_profile_data()` to keep the query count
+    constant; plain instances still work, one lookup per field.
+    """
     role = serializers.ReadOnlyField()
     is_committee = serializers.ReadOnlyField()
     profile_pic = serializers.SerializerMethodField()
+    photo_variants = ImageVariantsField(source='photo')
     has_account = serializers.SerializerMethodField()
     relationships = RelationshipSerializer(source='relationships_from', many=True, read_only=True)
 
@@ -21,7 +31,7 @@ class FamilyMemberSerializer(serializers.ModelSerializer):
             'id', 'name', 'nickname', 'age', 'gender', 'relation', 'role', 'is_committee',
             'date_of_birth', 'date_of_death', 'blood_group', 'is_deceased', 'is_independent', 'has_account',
             'phone_no', 'email_id', 'photo',
-            'profile_pic', 'bio', 'occupation', 'education', 'address_if_different', 
+            'profile_pic', 'photo_variants', 'bio', 'occupation', 'education', 'address_if_different', 
             'place_of_work', 'church_parish', 'parents', 'created_by', 'relationships'
         ]
         extra_kwargs = {
@@ -37,6 +47,9 @@ class FamilyMemberSerializer(serializers.ModelSerializer):
         return None
 
     def get_has_account(self, obj):
+        # Annotated by FamilyMember.objects.with_profile_data()
+        if hasattr(obj, 'account_exists'):
+            return obj.account_exists
         return hasattr(obj, 'user_account') and obj.user_account is not None
 
 class FamilyTreeSerializer(serializers.ModelSerializer):
@@ -48,8 +61,85 @@ class FamilyTreeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'role', 'is_committee', 'photo', 'parents', 'children']
         depth = 1 
 
+
+# -- Read path for member lists (see backapi/fastserializers.py) ---------------
+
+class RelationshipRowSerializer(RowSerializer):
+    """Rows rendered exactly like RelationshipSerializer."""
+    fields = (
+        ('id', 'id', None),
+        ('to_member', 'to_member_id', None),
+        ('to_member_name', 'to_member__name', None),
+        ('relation_type', 'relation_type', None),
+    )
+    extra_columns = ('from_member_id',)
+
+
+class FamilyMemberRowSerializer(RowSerializer):
+    """
+    Rows rendered exactly like FamilyMemberSerializer. Expects a queryset from
+    `FamilyMember.objects.with_profile_data()` for the role/committee/account
+    annotations; relationships and parent ids are fetched once per batch.
+    """
+    fields = (
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('nickname', 'nickname', None),
+        ('age', 'age', None),
+        ('gender', 'gender', None),
+        ('relation', 'relation', None),
+        ('role', None, lambda row: row['committee_role'] or row['relation']),
+        ('is_committee', 'on_committee', None),
+        ('date_of_birth', 'date_of_birth', date_value),
+        ('date_of_death', 'date_of_death', date_value),
+        ('blood_group', 'blood_group', None),
+        ('is_deceased', 'is_deceased', None),
+        ('is_independent', 'is_independent', None),
+        ('has_account', 'account_exists', None),
+        ('phone_no', 'phone_no', None),
+        ('email_id', 'email_id', None),
+        ('photo', 'photo', FileURL(FamilyMember, 'photo')),
+        ('profile_pic', 'photo', FileURL(FamilyMember, 'photo', absolute=False)),
+        ('photo_variants', 'photo', variant_urls),
+        ('bio', 'bio', None),
+        ('occupation', 'occupation', None),
+        ('education', 'education', None),
+        ('address_if_different', 'address_if_different', None),
+        ('place_of_work', 'place_of_work', None),
+        ('church_parish', 'church_parish', None),
+        ('parents', 'parents', None),
+        ('created_by', 'created_by', None),
+        ('relationships', 'relationships', Nested(RelationshipRowSerializer)),
+    )
+    attached = ('parents', 'relationships')
+    extra_columns = ('committee_role',)
+
+    def attach(self, rows):
+        parents, relationships = defaultdict(list), defaultdict(list)
+        if rows:
+            member_ids = [row['id'] for row in rows]
+            Through = FamilyMember.parents.through
+            pairs = (
+                Through.objects.filter(from_familymember_id__in=member_ids)
+                .order_by('to_familymember_id')
+                .values_list('from_familymember_id', 'to_familymember_id')
+            )
+            for child_id, parent_id in pairs:
+                parents[child_id].append(parent_id)
+            for rel in (
+                Relationship.objects.filter(from_member_id__in=member_ids).order_by('pk')
+                .values(*RelationshipRowSerializer.columns())
+            ):
+                relationships[rel['from_member_id']].append(rel)
+        for row in rows:
+            row['parents'] = parents.get(row['id'], [])
+            row['relationships'] = relationships.get(row['id'], [])
+
+
 from .models import FamilyMedia
 class FamilyMediaSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = FamilyMedia
         fields = '__all__'
@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from backapi.imaging import schedule_variants
+from profiles.models import Committee
+from .models import FamilyMember, FamilyMedia, Relationship
+from .tree_cache import bump_tree_version
+from . import lineage
+
+# User saves that cannot change the tree (e.g. login stamping last_login)
+TREE_IRRELEVANT_USER_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=FamilyMember)
+@receiver(post_delete, sender=FamilyMember)
+@receiver(post_save, sender=Relationship)
+@receiver(post_delete, sender=Relationship)
+@receiver(post_save, sender=Committee)
+@receiver(post_delete, sender=Committee)
+def invalidate_tree_on_write(sender, **kwargs):
+    """Any member, relationship or committee write invalidates the cached tree."""
+    bump_tree_version()
+
+
+@receiver(m2m_changed, sender=FamilyMember.parents.through)
+def invalidate_tree_on_parents_change(sender, action, **kwargs):
+    """Parent M2M additions/removals produce tree links."""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_tree_version()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_tree_on_user_change(sender, update_fields=None, **kwargs):
+    """Users feed the node username and committee role; skip login/password-only saves."""
+    if update_fields and set(update_fields) <= TREE_IRRELEVANT_USER_FIELDS:
+        return
+    bump_tree_version()
+
+
+# -- Lineage closure maintenance ---------------------------------------------
+
+def _m2m_edges(instance, reverse, pk_set):
+    """(parent_id, child_id) pairs touched by a parents M2M change."""
+    if reverse:
+        # parent.children.add(...): instance is the parent
+        return [(instance.pk, child_id) for child_id in pk_set]
+    return [(parent_id, instance.pk) for parent_id in pk_set]
+
+
+@receiver(m2m_changed, sender=FamilyMember.parents.through)
+def update_lineage_on_parents_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reject cyclic parent rows before they are stored; keep the closure in step afterwards."""
+    if action == 'pre_add':
+        for parent_id, child_id in _m2m_edges(instance, reverse, pk_set):
+            lineage.check_edge(parent_id, child_id)
+    elif action == 'post_add':
+        for parent_id, child_id in _m2m_edges(instance, reverse, pk_set):
+            lineage.add_edge(parent_id, child_id)
+    elif action == 'post_remove':
+        for parent_id, child_id in _m2m_edges(instance, reverse, pk_set):
+            lineage.remove_edge(parent_id, child_id)
+    elif action == 'pre_clear':
+        # clear() reports no pk_set, so remember what is about to go
+        related = instance.children if reverse else instance.parents
+        instance._lineage_cleared = _m2m_edges(instance, reverse, related.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        for parent_id, child_id in getattr(instance, '_lineage_cleared', ()):
+            lineage.remove_edge(parent_id, child_id)
+        instance._lineage_cleared = ()
+
+
+@receiver(pre_save, sender=Relationship)
+def check_relationship_lineage(sender, instance, raw=False, **kwargs):
+    """Remember the edge being replaced and refuse a new one that would close a cycle."""
+    if raw:
+        return
+    old_edge = None
+    if instance.pk:
+        old = Relationship.objects.filter(pk=instance.pk).values_list(
+            'from_member_id', 'to_member_id', 'relation_type'
+        ).first()
+        if old:
+            old_edge = lineage.relationship_edge(*old)
+    instance._lineage_old_edge = old_edge
+
+    new_edge = lineage.relationship_edge(instance.from_member_id, instance.to_member_id, instance.relation_type)
+    if new_edge and new_edge != old_edge:
+        lineage.check_edge(*new_edge)
+
+
+@receiver(post_save, sender=Relationship)
+def update_lineage_on_relationship_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_edge = getattr(instance, '_lineage_old_edge', None)
+    new_edge = lineage.relationship_edge(instance.from_member_id, instance.to_member_id, instance.relation_type)
+    if old_edge and old_edge != new_edge:
+        lineage.remove_edge(*old_edge)
+    if new_edge:
+        lineage.add_edge(*new_edge)
+
+
+@receiver(post_delete, sender=Relationship)
+def update_lineage_on_relationship_delete(sender, instance, **kwargs):
+    edge = lineage.relationship_edge(instance.from_member_id, instance.to_member_id, instance.relation_type)
+    if edge:
+        lineage.remove_edge(*edge)
+
+
+@receiver(pre_delete, sender=FamilyMember)
+def detach_member_lineage(sender, instance, **kwargs):
+    """Paths that ran through a deleted member must go before the cascade removes its rows."""
+    lineage.detach_member(instance.pk)
+
+
+@receiver(post_save, sender=FamilyMember)
+def generate_member_photo_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and 'photo' not in update_fields):
+        return
+    schedule_variants(instance.photo)
+
+
+@receiver(post_save, sender=FamilyMedia)
+def generate_family_media_variants(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance.image)
@@ -0,0 +1,15 @@
+"""Background tasks for the families app (run by `manage.py runworker`)."""
+from jobs.queue import task
+
+from .tree_cache import get_current_snapshot
+
+
+@task(queue='default', priority=5)
+def warm_tree_cache():
+    """Rebuild the cached tree payload now, so the next reader after a write does not pay for it."""
+    get_current_snapshot()
+
+
+def schedule_tree_warmup():
+    # One pending warm-up covers any number of writes queued before it runs
+    return warm_tree_cache.enqueue(job_options={'unique_key': 'families:warm_tree_cache'})
@@ -4,10 +4,13 @@ Covers: FamilyMember CRUD, Relationships, Profile management,
         Managed Members (list/create/edit/delete), Guardian permissions,
         Family tree endpoint.
 """
-from django.test import TestCase
+from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 import datetime
+import json
 from families.models import Family, FamilyMember, Relationship
 
 User = get_user_model()
@@ -223,6 +226,52 @@ class ManagedMembersViewTests(TestCase):
         }, format='multipart')
         self.assertEqual(res.status_code, 200)
 
+    def test_lineage_cycle_rolls_back_the_whole_edit(self):
+        from families.models import Lineage
+        managed = FamilyMember.objects.create(
+            family=self.family, name="Cycle", relation="Son",
+            created_by=self.guardian, is_independent=False
+        )
+        self.client.force_authenticate(user=self.guardian)
+        # Managed member declared the guardian's parent and their child at once
+        res = self.client.put(f'/api/families/managed/{managed.id}/', {
+            "name": "Renamed",
+            "relationships": json.dumps([{"to_member": self.guardian_member.id, "relation_type": "Son"}]),
+            "parents": [self.guardian_member.id],
+        }, format='multipart')
+        self.assertEqual(res.status_code, 400)
+        managed.refresh_from_db()
+        self.assertEqual(managed.name, "Cycle")
+        self.assertFalse(Relationship.objects.filter(from_member=managed).exists())
+        self.assertFalse(managed.parents.exists())
+        self.assertFalse(Lineage.objects.exists())
+
+        res = self.client.post('/api/families/managed/', {
+            "name": "Newborn",
+            "parents": [self.guardian_member.id],
+            "relationships": json.dumps([{"to_member": self.guardian_member.id, "relation_type": "Son"}]),
+        }, format='multipart')
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(FamilyMember.objects.filter(name="Newborn").exists())
+        self.assertFalse(Lineage.objects.exists())
+
+    def test_malformed_relationships_roll_back_the_whole_edit(self):
+        managed = FamilyMember.objects.create(
+            family=self.family, name="Keep", relation="Son",
+            created_by=self.guardian, is_independent=False
+        )
+        self.client.force_authenticate(user=self.guardian)
+        for relationships in ("not json", json.dumps(["not an object"]), json.dumps({"to_member": 1})):
+            res = self.client.put(f'/api/families/managed/{managed.id}/', {
+                "name": "Renamed",
+                "parents": [self.guardian_member.id],
+                "relationships": relationships,
+            }, format='multipart')
+            self.assertEqual(res.status_code, 400, relationships)
+        managed.refresh_from_db()
+        self.assertEqual(managed.name, "Keep")
+        self.assertFalse(managed.parents.exists())
+
     def test_cannot_edit_independent_member(self):
         managed = FamilyMember.objects.create(
             family=self.family, name="Free", relation="Son",
@@ -263,6 +312,390 @@ class ManagedMembersViewTests(TestCase):
         self.assertEqual(res.data['name'], "Detail")
 
 
+class RelationshipWriteTests(TestCase):
+    """Diff-based relationship saves from the profile and managed-member forms."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-REL-001")
+        self.member = FamilyMember.objects.create(family=self.family, name="Me", relation="Head", gender="M")
+        self.user = User.objects.create_user(
+            username="reluser", email="rel@example.com", password="Pass123!", member=self.member
+        )
+        self.dad = FamilyMember.objects.create(family=self.family, name="Dad", relation="Father", gender="F")
+        self.sis = FamilyMember.objects.create(family=self.family, name="Sis", relation="Sister", gender="F")
+        self.client.force_authenticate(user=self.user)
+
+    def save_profile(self, relationships):
+        import json
+        return self.client.post('/api/families/profile/', {
+            "first_name": "Me", "relationships": json.dumps(relationships),
+        }, format='multipart')
+
+    def stored(self):
+        return dict(
+            ((to_id, rel_type), pk) for pk, to_id, rel_type in
+            Relationship.objects.filter(from_member=self.member).values_list('pk', 'to_member_id', 'relation_type')
+        )
+
+    def test_profile_save_applies_diff(self):
+        res = self.save_profile([
+            {"to_member": self.dad.id, "relation_type": "Father"},
+            {"to_member": self.sis.id, "relation_type": "Sister"},
+            {"name": "Grandma", "relation_type": "Grandmother"},
+        ])
+        self.assertEqual(res.status_code, 200)
+        first = self.stored()
+        self.assertEqual(len(first), 3)
+        grandma = FamilyMember.objects.get(name="Grandma")
+        self.assertEqual(grandma.gender, 'F')
+        self.dad.refresh_from_db()
+        self.assertEqual(self.dad.gender, 'M')  # fixed up from the relation type
+        self.assertEqual(set(self.member.parents.values_list('name', flat=True)), {"Dad", "Grandma"})
+
+        # Dropping Sis and re-sending the rest keeps the untouched rows
+        self.save_profile([
+            {"to_member": self.dad.id, "relation_type": "Father"},
+            {"to_member": grandma.id, "relation_type": "Grandmother"},
+        ])
+        second = self.stored()
+        self.assertEqual(set(second), set(first) - {(self.sis.id, "Sister")})
+        for key, pk in second.items():
+            self.assertEqual(first[key], pk)
+
+    def test_bulk_writes_keep_lineage_and_tree_current(self):
+        from families.models import Lineage
+        version = self.client.get('/api/families/tree/')['X-Tree-Version']
+        self.save_profile([{"to_member": self.sis.id, "relation_type": "Daughter"}])
+        self.assertNotEqual(self.client.get('/api/families/tree/')['X-Tree-Version'], version)
+        self.assertTrue(Lineage.objects.filter(ancestor=self.member, descendant=self.sis, depth=1).exists())
+
+    def test_in_law_spouse_recorded_once(self):
+        item = {"name": "Bro-in-law", "relation_type": "Brother-in-law", "married_to": self.sis.id}
+        self.save_profile([item])
+        in_law = FamilyMember.objects.get(name="Bro-in-law")
+        item = {"to_member": in_law.id, "relation_type": "Brother-in-law", "married_to": self.sis.id}
+        self.save_profile([item])
+        self.assertEqual(
+            Relationship.objects.filter(from_member=self.sis, to_member=in_law, relation_type='Spouse').count(), 1
+        )
+
+    def test_cyclic_save_is_rejected_atomically(self):
+        self.save_profile([{"to_member": self.dad.id, "relation_type": "Father"}])
+        before = self.stored()
+        res = self.save_profile([
+            {"to_member": self.sis.id, "relation_type": "Sister"},
+            {"to_member": self.dad.id, "relation_type": "Son"},
+            {"to_member": self.dad.id, "relation_type": "Father"},
+        ])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.stored(), before)
+
+    def test_query_count_is_flat(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from families.relationship_writes import sync_relationships
+        cousins = [
+            FamilyMember.objects.create(family=self.family, name=f"Cousin {i}", relation="Cousin", gender="M")
+            for i in range(20)
+        ]
+        items = [{"to_member": c.id, "relation_type": "Cousin"} for c in cousins]
+        with CaptureQueriesContext(connection) as ctx:
+            sync_relationships(self.member, items, self.user, assign_gender=True)
+        self.assertEqual(Relationship.objects.filter(from_member=self.member).count(), 20)
+        self.assertLessEqual(len(ctx), 10)
+
+    def test_managed_member_edit_diffs(self):
+        import json
+        managed = FamilyMember.objects.create(
+            family=self.family, name="Kid", relation="Son", created_by=self.user, is_independent=False
+        )
+        Relationship.objects.create(from_member=managed, to_member=self.sis, relation_type='Sister')
+        kept = Relationship.objects.create(from_member=managed, to_member=self.member, relation_type='Father')
+        res = self.client.put(f'/api/families/managed/{managed.id}/', {
+            "relationships": json.dumps([{"to_member": self.member.id, "relation_type": "Father"}]),
+        }, format='multipart')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(list(Relationship.objects.filter(from_member=managed).values_list('pk', flat=True)), [kept.pk])
+        self.assertTrue(managed.parents.filter(pk=self.member.pk).exists())
+
+
+class GenealogyImportTests(TestCase):
+    """CSV/GEDCOM bulk import through the command and the admin API."""
+
+    CSV = (
+        "id,name,gender,date_of_birth,father,mother,spouse\n"
+        "p1,Joseph Elder,M,1940-02-01,,,p2\n"
+        "p2,Mary Elder,F,1942-05-09,,,\n"
+        "p3,John Elder,M,1965-07-20,p1,p2,\n"
+        "p4,,M,1990-01-01,p3,,\n"
+        "p5,Ann Elder,X,,,,\n"
+        "p6,Rose Elder,F,not-a-date,,,\n"
+        "p7,Lucy Elder,F,1992-03-03,p3,ghost,\n"
+    )
+    GEDCOM = (
+        "0 HEAD\n1 CHAR UTF-8\n"
+        "0 @I1@ INDI\n1 NAME Thomas /Kurian/\n1 SEX M\n1 BIRT\n2 DATE 12 MAR 1950\n"
+        "0 @I2@ INDI\n1 NAME Annamma /Kurian/\n1 SEX F\n1 DEAT\n2 DATE 1 JAN 2010\n"
+        "0 @I3@ INDI\n1 NAME Jacob /Kurian/\n1 SEX M\n1 BIRT\n2 DATE ABT 1975\n"
+        "0 @F1@ FAM\n1 HUSB @I1@\n1 WIFE @I2@\n1 CHIL @I3@\n"
+        "0 TRLR\n"
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username="importer", email="importer@example.com", password="Pass123!", is_staff=True
+        )
+
+    def upload(self, name, content, **extra):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.force_authenticate(user=self.admin)
+        data = {"file": SimpleUploadedFile(name, content.encode()), "family": "F-IMP-001", **extra}
+        return self.client.post('/api/families/import/', data, format='multipart')
+
+    def test_csv_import_with_row_errors(self):
+        res = self.upload("branch.csv", self.CSV)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['members'], 4)
+        self.assertEqual(res.data['parent_links'], 3)
+        self.assertEqual(res.data['relationships'], 1)
+        self.assertEqual([e['line'] for e in res.data['errors']], [5, 6, 7, 8])
+
+        john = FamilyMember.objects.get(name="John Elder")
+        self.assertEqual(john.family.member_no, "F-IMP-001")
+        self.assertEqual(set(john.parents.values_list('name', flat=True)), {"Joseph Elder", "Mary Elder"})
+        self.assertTrue(Relationship.objects.filter(relation_type='Spouse', from_member__name="Joseph Elder").exists())
+        from families.models import Lineage
+        self.assertTrue(Lineage.objects.filter(ancestor__name="Joseph Elder", descendant__name="Lucy Elder", depth=2).exists())
+
+        # Tree reflects the bulk insert
+        names = {n['name'] for n in self.client.get('/api/families/tree/').data['nodes']}
+        self.assertIn("Lucy Elder", names)
+
+    def test_reimport_skips_existing_and_links_to_them(self):
+        self.upload("branch.csv", self.CSV)
+        res = self.upload("more.csv", "id,name,gender,father\np1,Joseph Elder,M,\np9,New Kid,F,p3\n")
+        self.assertEqual(res.data['members'], 1)
+        self.assertEqual(res.data['errors'][0]['ref'], "p1")
+        kid = FamilyMember.objects.get(name="New Kid")
+        self.assertEqual(list(kid.parents.values_list('name', flat=True)), ["John Elder"])
+
+    def test_parent_cycles_rejected_per_row(self):
+        from families.models import Lineage
+        res = self.upload("loop.csv", "id,name,father\nA,Anna,B\nB,Ben,A\nC,Cara,A\n")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.data['members'], res.data['parent_links']), (3, 2))
+        self.assertEqual(res.data['cyclic_members'], [])
+        self.assertEqual([(e['line'], e['ref']) for e in res.data['errors']], [(3, "B")])
+        anna = FamilyMember.objects.get(name="Anna")
+        self.assertEqual(list(anna.parents.values_list('name', flat=True)), ["Ben"])
+        self.assertFalse(FamilyMember.objects.get(name="Ben").parents.exists())
+        # Everyone is in the closure, Cara included
+        self.assertTrue(Lineage.objects.filter(ancestor__name="Ben", descendant__name="Cara", depth=2).exists())
+
+        # Checked against links stored by an earlier import too
+        self.upload("kurian.ged", self.GEDCOM)
+        res = self.upload("loop.ged", "0 HEAD\n0 @F2@ FAM\n1 HUSB @I3@\n1 CHIL @I1@\n0 TRLR\n")
+        self.assertEqual((res.data['parent_links'], len(res.data['errors'])), (0, 1))
+        self.assertFalse(FamilyMember.objects.get(name="Thomas Kurian").parents.exists())
+
+    def test_gedcom_import(self):
+        res = self.upload("kurian.ged", self.GEDCOM)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.data['members'], res.data['parent_links'], res.data['relationships']), (3, 2, 1))
+        thomas = FamilyMember.objects.get(name="Thomas Kurian")
+        self.assertEqual(thomas.date_of_birth, datetime.date(1950, 3, 12))
+        self.assertTrue(FamilyMember.objects.get(name="Annamma Kurian").is_deceased)
+        jacob = FamilyMember.objects.get(name="Jacob Kurian")
+        self.assertIsNone(jacob.date_of_birth)
+        self.assertEqual(jacob.parents.count(), 2)
+
+    def test_dry_run_saves_nothing(self):
+        res = self.upload("branch.csv", self.CSV, dry_run="true")
+        self.assertEqual(res.data['members'], 4)
+        self.assertFalse(FamilyMember.objects.filter(name="John Elder").exists())
+
+    def test_admin_only(self):
+        user = User.objects.create_user(username="plain", email="plain@example.com", password="Pass123!")
+        self.client.force_authenticate(user=user)
+        res = self.client.post('/api/families/import/', {}, format='multipart')
+        self.assertEqual(res.status_code, 403)
+
+    def test_management_command_chunks(self):
+        import io
+        import tempfile
+        from django.core.management import call_command
+        rows = ["id,name,gender,father"] + [f"c{i},Child {i},M,{'c0' if i else ''}" for i in range(25)]
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("\n".join(rows) + "\n")
+        out = io.StringIO()
+        call_command('import_genealogy', f.name, family="F-CMD-001", chunk_size=10, stdout=out)
+        self.assertIn("Imported 25 members, 24 parent links", out.getvalue())
+        self.assertEqual(FamilyMember.objects.get(name="Child 0").children.count(), 24)
+
+
+class GenealogyExportTests(TestCase):
+    """Streaming GEDCOM/JSON export, round-tripped through the importer."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username="exporter", email="exporter@example.com", password="Pass123!", is_staff=True
+        )
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-EXP-001")
+        make = lambda name, gender, **kw: FamilyMember.objects.create(
+            family=self.family, name=name, gender=gender, relation="Other", **kw
+        )
+        self.dad = make("Joseph Export", "M", date_of_birth=datetime.date(1950, 3, 12))
+        self.mum = make("Mary Export", "F", is_deceased=True)
+        self.kid = make("John Export", "M")
+        self.kid.parents.add(self.dad, self.mum)
+        self.lonely = make("Widow Export", "F")
+        Relationship.objects.create(from_member=self.lonely, to_member=self.dad, relation_type='Spouse')
+
+    def download(self, kind):
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.get(f'/api/families/export/{kind}/')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        self.assertIn('attachment;', res['Content-Disposition'])
+        return b''.join(res.streaming_content).decode()
+
+    def test_gedcom_export(self):
+        text = self.download('gedcom')
+        self.assertTrue(text.startswith("0 HEAD\n"))
+        self.assertIn("2 VERS 5.5.1", text)
+        self.assertTrue(text.endswith("0 TRLR\n"))
+        self.assertIn(f"0 @I{self.dad.id}@ INDI\n1 NAME Joseph Export\n1 SEX M\n1 BIRT\n2 DATE 12 MAR 1950", text)
+        self.assertIn("1 DEAT Y", text)
+        self.assertIn(
+            f"1 HUSB @I{self.dad.id}@\n1 WIFE @I{self.mum.id}@\n1 CHIL @I{self.kid.id}@", text
+        )
+
+    def test_gedcom_round_trip(self):
+        from families.importers import import_genealogy
+        text = self.download('gedcom')
+        target = Family.objects.create(sl_no="2", branch="Copy", member_no="F-EXP-COPY")
+        report = import_genealogy(text.splitlines(), 'gedcom', target)
+        self.assertEqual(report['errors'], [])
+        self.assertEqual((report['members'], report['parent_links'], report['relationships']), (4, 2, 2))
+        kid = FamilyMember.objects.get(family=target, name="John Export")
+        self.assertEqual(set(kid.parents.values_list('name', flat=True)), {"Joseph Export", "Mary Export"})
+
+    def test_json_export(self):
+        import json
+        data = json.loads(self.download('json'))
+        self.assertEqual(data['format'], "familysite-genealogy")
+        self.assertEqual([f['member_no'] for f in data['families']], ["F-EXP-001"])
+        self.assertEqual([m['name'] for m in data['members']][:3], ["Joseph Export", "Mary Export", "John Export"])
+        self.assertEqual(data['members'][0]['date_of_birth'], "1950-03-12")
+        self.assertEqual(data['relationships'], [[self.lonely.id, self.dad.id, "Spouse"]])
+        self.assertEqual(sorted(data['parents']), sorted([[self.kid.id, self.dad.id], [self.kid.id, self.mum.id]]))
+
+    def test_staff_only_and_unknown_format(self):
+        res = self.client.get('/api/families/export/json/')
+        self.assertIn(res.status_code, [401, 403])
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get('/api/families/export/xml/').status_code, 404)
+
+    def test_management_command(self):
+        import io
+        from django.core.management import call_command
+        out = io.StringIO()
+        call_command('export_genealogy', format='gedcom', chunk_size=2, stdout=out)
+        self.assertEqual(out.getvalue().count(" INDI\n"), 4)
+
+
+class MemberSerializerQueryCountTests(TestCase):
+    """FamilyMemberSerializer reads annotations and prefetches, not per-member queries."""
+
+    def setUp(self):
+        from profiles.models import Committee
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-SER-001")
+        self.guardian_member = FamilyMember.objects.create(family=self.family, name="Guardian", relation="Head")
+        self.guardian = User.objects.create_user(
+            username="ser_guard", email="ser_guard@example.com", password="Pass123!", member=self.guardian_member
+        )
+        Committee.objects.create(user=self.guardian, role="Treasurer", pic="committee/x.jpg")
+        self.client.force_authenticate(user=self.guardian)
+
+    def add_household(self, count):
+        start = FamilyMember.objects.filter(created_by=self.guardian).count()
+        for i in range(start, start + count):
+            child = FamilyMember.objects.create(
+                family=self.family, name=f"Child {i}", relation="Son", created_by=self.guardian
+            )
+            child.parents.add(self.guardian_member)
+            Relationship.objects.create(from_member=child, to_member=self.guardian_member, relation_type='Father')
+            Relationship.objects.create(from_member=child, to_member=self.guardian_member, relation_type='Uncle')
+            if i % 2:
+                User.objects.create_user(
+                    username=f"ser_child{i}", email=f"ser_child{i}@example.com", password="Pass123!", member=child
+                )
+
+    def list_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/api/families/managed/')
+        self.assertEqual(res.status_code, 200)
+        return res.data, len(ctx)
+
+    def test_constant_queries(self):
+        self.add_household(2)
+        _, small = self.list_queries()
+        self.add_household(8)
+        data, large = self.list_queries()
+        self.assertEqual(len(data), 10)
+        self.assertEqual(small, large)
+
+    def test_output_matches_plain_instances(self):
+        from families.serializers import FamilyMemberSerializer
+        self.add_household(3)
+        plain = FamilyMemberSerializer(
+            FamilyMember.objects.filter(created_by=self.guardian).order_by('pk'), many=True
+        ).data
+        annotated = FamilyMemberSerializer(
+            FamilyMember.objects.with_profile_data().filter(created_by=self.guardian).order_by('pk'), many=True
+        ).data
+        self.assertEqual(annotated, plain)
+        self.assertEqual([r['to_member_name'] for r in annotated[0]['relationships']], ["Guardian", "Guardian"])
+        self.assertEqual([m['has_account'] for m in annotated], [False, True, False])
+
+    def test_row_serializer_renders_identical_json(self):
+        from rest_framework.renderers import JSONRenderer
+        from families.serializers import FamilyMemberSerializer, FamilyMemberRowSerializer
+        self.add_household(3)
+        FamilyMember.objects.filter(name="Child 1").update(
+            photo="members/photos/c1.jpg", date_of_birth=datetime.date(2001, 2, 3), nickname="Kid"
+        )
+        FamilyMember.objects.get(name="Child 2").parents.add(FamilyMember.objects.get(name="Child 0"))
+        members = FamilyMember.objects.with_profile_data().filter(created_by=self.guardian).order_by('pk')
+
+        expected = JSONRenderer().render(FamilyMemberSerializer(members, many=True).data)
+        self.assertEqual(JSONRenderer().render(FamilyMemberRowSerializer().serialize(members)), expected)
+        self.assertEqual(self.client.get('/api/families/managed/').content, expected)
+
+    def test_row_serializer_ndjson_stream(self):
+        import json
+        from families.serializers import FamilyMemberSerializer
+        self.add_household(3)
+        res = self.client.get('/api/families/managed/?format=ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        members = FamilyMember.objects.with_profile_data().filter(created_by=self.guardian).order_by('pk')
+        self.assertEqual([json.loads(line) for line in lines], json.loads(json.dumps(
+            FamilyMemberSerializer(members, many=True).data
+        )))
+
+    def test_committee_role_annotation(self):
+        member = FamilyMember.objects.with_profile_data().get(pk=self.guardian_member.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(member.role, "Treasurer")
+            self.assertTrue(member.is_committee)
+
+
 class FamilyTreeViewTests(TestCase):
     """Test the /api/families/tree/ endpoint."""
 
@@ -287,6 +720,614 @@ class FamilyTreeViewTests(TestCase):
         res = self.client.get('/api/families/tree/')
         self.assertEqual(res.status_code, 200)  # Tree is public
 
+    @override_settings(RESPONSE_CACHING=True)
+    def test_cached_tree_keeps_version_and_follows_writes(self):
+        cache.clear()
+        first = self.client.get('/api/families/tree/')
+        hit = self.client.get('/api/families/tree/')
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit['X-Tree-Version'], first['X-Tree-Version'])
+        self.assertEqual(hit.content, first.content)
+
+        FamilyMember.objects.create(family=self.family, name="New Branch", relation="Son")
+        fresh = self.client.get('/api/families/tree/')
+        self.assertEqual(fresh['X-Cache'], 'MISS')
+        self.assertNotEqual(fresh['X-Tree-Version'], first['X-Tree-Version'])
+        self.assertIn("New Branch", {node['name'] for node in fresh.json()['nodes']})
+        # NDJSON streams straight from the database and is never cached
+        self.assertNotIn('X-Cache', self.client.get('/api/families/tree/?format=ndjson'))
+
+    async def test_async_tree_matches_the_sync_view(self):
+        from backapi.asyncviews import as_async_view
+        from families.views import FamilyTreeView
+        expected = await sync_to_async(self.client.get)('/api/families/tree/')
+        response = await as_async_view(FamilyTreeView)(AsyncRequestFactory().get('/api/families/tree/'))
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['X-Tree-Version'], expected['X-Tree-Version'])
+
+        await sync_to_async(FamilyMember.objects.create)(family=self.family, name="Async Branch", relation="Son")
+        response = await as_async_view(FamilyTreeView)(AsyncRequestFactory().get('/api/families/tree/'))
+        self.assertIn("Async Branch", {node['name'] for node in json.loads(response.content)['nodes']})
+        # Focus queries are answered by the DRF view
+        focus = await as_async_view(FamilyTreeView)(
+            AsyncRequestFactory().get(f'/api/families/tree/?focus={self.member.pk}')
+        )
+        await sync_to_async(focus.render)()
+        self.assertIn('nodes', json.loads(focus.content))
+
+
+class FamilyTreeQueryCountTests(TestCase):
+    """The tree endpoint must issue a fixed number of queries regardless of tree size."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-TREEQ-001")
+        self.root = FamilyMember.objects.create(family=self.family, name="Root", relation="Head")
+
+    def add_generation(self, count, prefix):
+        """Add `count` members, each a child of root with an account and a committee seat."""
+        from profiles.models import Committee
+        for i in range(count):
+            child = FamilyMember.objects.create(
+                family=self.family, name=f"{prefix} {i}", relation="Son"
+            )
+            child.parents.add(self.root)
+            user = User.objects.create_user(
+                username=f"{prefix}_{i}", email=f"{prefix}_{i}@example.com",
+                password="Pass123!", member=child
+            )
+            Committee.objects.create(user=user, pic="committee/test.png", role="Treasurer")
+
+    def count_tree_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/api/families/tree/')
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries), res
+
+    def test_query_count_independent_of_member_count(self):
+        # First build has no previous snapshot to diff against; measure rebuilds after it
+        self.count_tree_queries()
+        self.add_generation(3, "small")
+        small_count, _ = self.count_tree_queries()
+
+        self.add_generation(20, "large")
+        large_count, res = self.count_tree_queries()
+
+        self.assertEqual(small_count, large_count)
+        self.assertEqual(len(res.data['nodes']), 24)
+
+    def test_preloaded_fields_match_model_properties(self):
+        self.add_generation(2, "props")
+        _, res = self.count_tree_queries()
+        nodes = {n['id']: n for n in res.data['nodes']}
+        for member in FamilyMember.objects.all():
+            node = nodes[member.id]
+            self.assertEqual(node['role'], member.role)
+            self.assertEqual(node['is_committee'], member.is_committee)
+            expected_username = member.user_account.username if hasattr(member, 'user_account') else None
+            self.assertEqual(node['username'], expected_username)
+        parent_links = [l for l in res.data['links'] if l['type'] == 'parent']
+        self.assertEqual(len(parent_links), 2)
+
+
+class FamilyTreeInferenceTests(TestCase):
+    """The in-memory inference engine must reproduce the original link output exactly."""
+
+    RELATIONSHIPS = [
+        ("Me", "Father", "Dad"), ("Me", "Mother", "Mom"),
+        ("Me", "Paternal Grandfather", "PGF"), ("Me", "Maternal Grandmother", "MGM"),
+        ("Me", "Brother", "Bro"), ("Me", "Sister", "Sis"),
+        ("Me", "Sister-in-law", "SIL"), ("Me", "Brother-in-law", "BIL"),
+        ("Me", "Uncle", "Uncle"), ("Me", "Aunt", "Aunt"), ("Me", "Cousin", "Cousin"),
+        ("Me", "Spouse", "Wife"), ("Me", "Father-in-law", "FIL"), ("Me", "Mother-in-law", "MIL"),
+        ("Me", "Son", "Son"), ("Me", "Daughter", "Daughter"), ("Me", "Son-in-law", "SonIL"),
+        ("Me", "Nephew", "Nephew"), ("Me", "Niece", "Niece"), ("Me", "Grandson", "Grandson"),
+        ("Me", "Other", "Friend"),
+        # No parents known: plain sibling link, grandparent links straight to the member
+        ("Loner", "Brother", "LonerBro"), ("Loner", "Grandmother", "LonerGran"),
+        # Uncle without a grandparent relationship falls back to father's M2M parent
+        ("Kid2", "Father", "Dad2"), ("Kid2", "Uncle", "Uncle2"),
+    ]
+
+    EXPECTED_LINKS = [
+            ('Dad', 'Me', 'parent'),
+            ('Mom', 'Me', 'parent'),
+            ('GP2', 'Dad2', 'parent'),
+            ('PGF', 'Dad', 'parent'),
+            ('MGM', 'Mom', 'parent'),
+            ('Dad', 'Bro', 'parent'),
+            ('Dad', 'Sis', 'parent'),
+            ('Bro', 'SIL', 'spouse'),
+            ('Sis', 'BIL', 'spouse'),
+            ('PGF', 'Uncle', 'parent'),
+            ('PGF', 'Aunt', 'parent'),
+            ('Uncle', 'Cousin', 'parent'),
+            ('Me', 'Wife', 'spouse'),
+            ('FIL', 'Wife', 'parent'),
+            ('MIL', 'Wife', 'parent'),
+            ('Me', 'Son', 'parent'),
+            ('Me', 'Daughter', 'parent'),
+            ('Son', 'SonIL', 'spouse'),
+            ('Bro', 'Nephew', 'parent'),
+            ('Bro', 'Niece', 'parent'),
+            ('Me', 'Grandson', 'grandson'),
+            ('Me', 'Friend', 'other'),
+            ('Loner', 'LonerBro', 'sibling'),
+            ('LonerGran', 'Loner', 'parent'),
+            ('Dad2', 'Kid2', 'parent'),
+            ('GP2', 'Uncle2', 'parent'),
+            ('Dad', 'Mom', 'spouse'),
+            ('FIL', 'MIL', 'spouse'),
+    ]
+
+    def setUp(self):
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-INFER-001")
+        names = ["Me"] + [rel[2] for rel in self.RELATIONSHIPS[:21]] + [
+            "Loner", "LonerBro", "LonerGran", "Kid2", "Dad2", "GP2", "Uncle2",
+        ]
+        self.members = {
+            name: FamilyMember.objects.create(family=self.family, name=name, relation="Other")
+            for name in names
+        }
+        self.members["Me"].parents.add(self.members["Dad"], self.members["Mom"])
+        self.members["Dad2"].parents.add(self.members["GP2"])
+        for from_name, rtype, to_name in self.RELATIONSHIPS:
+            Relationship.objects.create(
+                from_member=self.members[from_name], to_member=self.members[to_name],
+                relation_type=rtype
+            )
+
+    def test_links_match_original_algorithm(self):
+        res = APIClient().get('/api/families/tree/')
+        names = {m.id: name for name, m in self.members.items()}
+        links = [(names[l['source']], names[l['target']], l['type']) for l in res.data['links']]
+        self.assertEqual(links, self.EXPECTED_LINKS)
+        self.assertEqual(len(res.data['nodes']), len(self.members))
+
+
+class FamilyTreeCacheTests(TestCase):
+    """The tree payload is cached per version and invalidated by model signals."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-TREEC-001")
+        self.parent = FamilyMember.objects.create(family=self.family, name="Parent", relation="Head")
+        self.child = FamilyMember.objects.create(family=self.family, name="Child", relation="Son")
+
+    def get_tree(self):
+        res = self.client.get('/api/families/tree/')
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def test_cache_hit_is_a_single_query(self):
+        self.get_tree()
+        with self.assertNumQueries(1):
+            self.get_tree()
+
+    def test_member_save_invalidates(self):
+        self.get_tree()
+        self.child.name = "Renamed"
+        self.child.save()
+        names = [n['name'] for n in self.get_tree()['nodes']]
+        self.assertIn("Renamed", names)
+
+    def test_parents_m2m_invalidates(self):
+        self.get_tree()
+        self.child.parents.add(self.parent)
+        links = self.get_tree()['links']
+        self.assertIn({"source": self.parent.id, "target": self.child.id, "type": "parent"}, links)
+
+    def test_relationship_invalidates(self):
+        self.get_tree()
+        Relationship.objects.create(from_member=self.parent, to_member=self.child, relation_type="Son")
+        self.assertEqual(len(self.get_tree()['links']), 1)
+
+    def test_user_and_committee_invalidate(self):
+        from profiles.models import Committee
+        self.get_tree()
+        user = User.objects.create_user(
+            username="cached", email="cached@example.com", password="Pass123!", member=self.child
+        )
+        node = next(n for n in self.get_tree()['nodes'] if n['id'] == self.child.id)
+        self.assertEqual(node['username'], "cached")
+
+        Committee.objects.create(user=user, pic="committee/test.png", role="President")
+        node = next(n for n in self.get_tree()['nodes'] if n['id'] == self.child.id)
+        self.assertEqual(node['role'], "President")
+        self.assertTrue(node['is_committee'])
+
+    def test_login_does_not_invalidate(self):
+        from families.models import TreeSnapshot
+        User.objects.create_user(username="loginonly", email="lo@example.com", password="Pass123!")
+        self.get_tree()
+        version = TreeSnapshot.objects.get(pk=1).version
+        res = self.client.post('/api/auth/login/', {"identifier": "loginonly", "password": "Pass123!"}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(TreeSnapshot.objects.get(pk=1).version, version)
+
+
+class FamilyTreeFocusTests(TestCase):
+    """Test ?focus= neighbourhood mode of /api/families/tree/."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-FOCUS-001")
+        names = ["GP", "P", "Uncle", "Me", "Sib", "Wife", "Child", "GChild"]
+        self.m = {
+            n: FamilyMember.objects.create(family=self.family, name=n, relation="Other")
+            for n in names
+        }
+        for parent, child in [("GP", "P"), ("GP", "Uncle"), ("P", "Me"), ("P", "Sib"),
+                              ("Me", "Child"), ("Child", "GChild")]:
+            self.m[child].parents.add(self.m[parent])
+        Relationship.objects.create(from_member=self.m["Me"], to_member=self.m["Wife"], relation_type="Spouse")
+
+    def get_focus(self, **params):
+        query = "&".join(f"{k}={v}" for k, v in params.items())
+        return self.client.get(f'/api/families/tree/?{query}')
+
+    def test_bounded_neighbourhood(self):
+        res = self.get_focus(focus=self.m["Me"].id, up=1, down=1, lateral=1)
+        self.assertEqual(res.status_code, 200)
+        names = {n['id']: n['name'] for n in res.data['nodes']}
+        self.assertEqual(set(names.values()), {"P", "Me", "Sib", "Wife", "Child"})
+
+        nodes = {n['name']: n for n in res.data['nodes']}
+        self.assertTrue(nodes["P"]['has_more_up'])
+        self.assertFalse(nodes["P"]['has_more_down'])
+        self.assertTrue(nodes["Child"]['has_more_down'])
+        self.assertFalse(nodes["Me"]['has_more_lateral'])
+
+        links = {(names[l['source']], names[l['target']], l['type']) for l in res.data['links']}
+        self.assertEqual(links, {
+            ("P", "Me", "parent"), ("P", "Sib", "parent"),
+            ("Me", "Child", "parent"), ("Me", "Wife", "spouse"),
+        })
+
+    def test_zero_bounds_returns_focus_only(self):
+        res = self.get_focus(focus=self.m["Me"].id, up=0, down=0, lateral=0)
+        self.assertEqual([n['name'] for n in res.data['nodes']], ["Me"])
+        self.assertEqual(res.data['links'], [])
+
+    def test_index_reused_between_requests(self):
+        self.get_focus(focus=self.m["Me"].id)
+        with self.assertNumQueries(1):
+            self.get_focus(focus=self.m["Me"].id)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.get_focus(focus="abc").status_code, 400)
+        self.assertEqual(self.get_focus(focus=self.m["Me"].id, up=99).status_code, 400)
+        self.assertEqual(self.get_focus(focus=999999).status_code, 404)
+
+
+class NDJSONStreamingTests(TestCase):
+    """Test the NDJSON streaming variants of the tree and managed-member listing."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-NDJSON-001")
+        self.guardian_member = FamilyMember.objects.create(family=self.family, name="Guardian", relation="Head")
+        self.guardian = User.objects.create_user(
+            username="nd_guard", email="nd_guard@example.com", password="Pass123!", member=self.guardian_member
+        )
+        self.kids = [
+            FamilyMember.objects.create(
+                family=self.family, name=f"Kid {i}", relation="Son", created_by=self.guardian,
+                date_of_birth=datetime.date(2010, 1, i + 1)
+            )
+            for i in range(3)
+        ]
+        for kid in self.kids:
+            kid.parents.add(self.guardian_member)
+        Relationship.objects.create(from_member=self.kids[0], to_member=self.kids[1], relation_type="Brother")
+
+    def read_lines(self, res):
+        import json
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        body = b''.join(res.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_tree_stream_matches_json(self):
+        expected = self.client.get('/api/families/tree/').json()
+        records = self.read_lines(self.client.get('/api/families/tree/?format=ndjson'))
+        nodes = [r['node'] for r in records if 'node' in r]
+        links = [r['link'] for r in records if 'link' in r]
+        self.assertEqual(nodes, expected['nodes'])
+        self.assertEqual(links, expected['links'])
+        # All nodes come before the first link
+        self.assertEqual(records[:len(nodes)], [{"node": n} for n in nodes])
+
+    def test_tree_stream_via_accept_header(self):
+        res = self.client.get('/api/families/tree/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(len([r for r in self.read_lines(res) if 'node' in r]), 4)
+
+    @override_settings(ASGI=True)
+    async def test_tree_stream_under_asgi(self):
+        expected = (await self.async_client.get('/api/families/tree/')).json()
+        res = await self.async_client.get('/api/families/tree/?format=ndjson')
+        # An async body, pulled a batch at a time, rather than read whole by Django first
+        self.assertTrue(res.is_async)
+        body = b''.join([chunk async for chunk in res.streaming_content]).decode()
+        nodes = [record['node'] for record in map(json.loads, body.splitlines()) if 'node' in record]
+        self.assertEqual(nodes, expected['nodes'])
+
+    def test_managed_members_stream(self):
+        self.client.force_authenticate(user=self.guardian)
+        expected = self.client.get('/api/families/managed/').json()
+        records = self.read_lines(self.client.get('/api/families/managed/?format=ndjson'))
+        self.assertEqual(records, expected)
+
+
+class FamilyTreeChangesTests(TestCase):
+    """Test delta sync via /api/families/tree/changes/?since=<version>."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="F-DELTA-001")
+        self.parent = FamilyMember.objects.create(family=self.family, name="Parent", relation="Head")
+        self.child = FamilyMember.objects.create(family=self.family, name="Child", relation="Son")
+        self.other = FamilyMember.objects.create(family=self.family, name="Other", relation="Other")
+        self.child.parents.add(self.parent)
+
+    def current_version(self):
+        res = self.client.get('/api/families/tree/')
+        return int(res['X-Tree-Version'])
+
+    def changes(self, since):
+        res = self.client.get(f'/api/families/tree/changes/?since={since}')
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def test_no_changes(self):
+        version = self.current_version()
+        data = self.changes(version)
+        self.assertFalse(data['resync'])
+        self.assertEqual(data['version'], version)
+        self.assertEqual(data['nodes'], {"added": [], "updated": [], "removed": []})
+        self.assertEqual(data['links'], {"added": [], "removed": []})
+
+    def test_added_updated_removed(self):
+        version = self.current_version()
+        newcomer = FamilyMember.objects.create(family=self.family, name="Newcomer", relation="Son")
+        newcomer.parents.add(self.parent)
+        self.child.name = "Renamed Child"
+        self.child.save()
+        other_id = self.other.id
+        self.other.delete()
+        self.child.parents.remove(self.parent)
+
+        data = self.changes(version)
+        self.assertFalse(data['resync'])
+        self.assertEqual([n['name'] for n in data['nodes']['added']], ["Newcomer"])
+        self.assertEqual([n['name'] for n in data['nodes']['updated']], ["Renamed Child"])
+        self.assertEqual(data['nodes']['removed'], [other_id])
+        self.assertEqual(data['links']['added'], [
+            {"source": self.parent.id, "target": newcomer.id, "type": "parent"},
+        ])
+        self.assertEqual(data['links']['removed'], [
+            {"source": self.parent.id, "target": self.child.id, "type": "parent"},
+        ])
+
+    def test_changes_fold_across_versions(self):
+        version = self.current_version()
+        temp = FamilyMember.objects.create(family=self.family, name="Temp", relation="Other")
+        self.current_version()
+        temp.delete()
+        data = self.changes(version)
+        # Added and removed again since `version`: nothing for the client to do
+        self.assertEqual(data['nodes'], {"added": [], "updated": [], "removed": []})
+
+    def test_resync_after_compaction(self):
+        from django.utils import timezone
+        from families.tree_cache import compact_tree_changes
+        version = self.current_version()
+        self.child.name = "Changed"
+        self.child.save()
+        self.current_version()
+        compact_tree_changes(timezone.now() + datetime.timedelta(seconds=1))
+        self.assertTrue(self.changes(version)['resync'])
+
+    def test_invalid_since(self):
+        res = self.client.get('/api/families/tree/changes/?since=abc')
+        self.assertEqual(res.status_code, 400)
+        self.assertTrue(self.changes(0)['resync'])
+
+
+class LineageTests(TestCase):
+    """Closure table maintenance, cycle rejection and the lineage endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="North", member_no="F-LIN-001")
+        make = lambda name: FamilyMember.objects.create(family=self.family, name=name, relation="Other")
+        self.grandpa = make("Grandpa")
+        self.dad = make("Dad")
+        self.mum = make("Mum")
+        self.kid = make("Kid")
+        self.dad.parents.add(self.grandpa)
+        # Same edge declared twice: once through the M2M, once as a relationship
+        self.kid.parents.add(self.dad)
+        Relationship.objects.create(from_member=self.kid, to_member=self.dad, relation_type='Father')
+        Relationship.objects.create(from_member=self.mum, to_member=self.kid, relation_type='Son')
+
+    def closure(self):
+        from families.models import Lineage
+        return set(Lineage.objects.values_list('ancestor_id', 'descendant_id', 'depth', 'path_count'))
+
+    def assertMatchesRebuild(self):
+        from families.lineage import rebuild_lineage
+        incremental = self.closure()
+        rebuild_lineage()
+        self.assertEqual(incremental, self.closure())
+
+    def test_incremental_closure(self):
+        self.assertEqual(self.closure(), {
+            (self.grandpa.id, self.dad.id, 1, 1),
+            (self.dad.id, self.kid.id, 1, 1),
+            (self.mum.id, self.kid.id, 1, 1),
+            (self.grandpa.id, self.kid.id, 2, 1),
+        })
+        self.assertMatchesRebuild()
+
+    def test_edge_survives_while_any_source_declares_it(self):
+        self.kid.parents.remove(self.dad)
+        self.assertIn((self.grandpa.id, self.kid.id, 2, 1), self.closure())
+        Relationship.objects.filter(from_member=self.kid, to_member=self.dad).delete()
+        self.assertEqual(self.closure(), {
+            (self.grandpa.id, self.dad.id, 1, 1),
+            (self.mum.id, self.kid.id, 1, 1),
+        })
+        self.assertMatchesRebuild()
+
+    def test_multiple_paths_counted(self):
+        # Grandpa is also Mum's father: two depth-2 paths down to Kid
+        Relationship.objects.create(from_member=self.mum, to_member=self.grandpa, relation_type='Father')
+        self.assertIn((self.grandpa.id, self.kid.id, 2, 2), self.closure())
+        self.mum.parents.clear()  # no M2M rows: the relationship still declares the edge
+        self.assertIn((self.grandpa.id, self.kid.id, 2, 2), self.closure())
+        Relationship.objects.get(from_member=self.mum, relation_type='Father').delete()
+        self.assertIn((self.grandpa.id, self.kid.id, 2, 1), self.closure())
+        self.assertMatchesRebuild()
+
+    def test_relationship_update_moves_edge(self):
+        rel = Relationship.objects.get(from_member=self.mum, to_member=self.kid)
+        rel.relation_type = 'Spouse'
+        rel.save()
+        self.assertNotIn((self.mum.id, self.kid.id, 1, 1), self.closure())
+        self.assertMatchesRebuild()
+
+    def test_cycles_rejected(self):
+        from django.db import transaction
+        from families.lineage import LineageCycleError
+        # M2M writes run in their own atomic block; isolate each failure from the test transaction
+        with self.assertRaises(LineageCycleError), transaction.atomic():
+            self.grandpa.parents.add(self.kid)
+        with self.assertRaises(LineageCycleError), transaction.atomic():
+            Relationship.objects.create(from_member=self.kid, to_member=self.grandpa, relation_type='Son')
+        with self.assertRaises(LineageCycleError), transaction.atomic():
+            self.kid.parents.add(self.kid)
+        self.assertFalse(self.grandpa.parents.exists())
+        self.assertFalse(Relationship.objects.filter(to_member=self.grandpa).exists())
+
+    def test_deleting_member_cuts_paths(self):
+        self.dad.delete()
+        self.assertEqual(self.closure(), {(self.mum.id, self.kid.id, 1, 1)})
+
+    def test_descendant_counts_and_delete_subtree(self):
+        from families.lineage import delete_subtree, descendant_counts
+        self.assertEqual(descendant_counts([self.grandpa.id, self.kid.id]), {self.grandpa.id: 2, self.kid.id: 0})
+        delete_subtree(self.dad.id)
+        self.assertEqual(
+            set(FamilyMember.objects.values_list('name', flat=True)), {"Grandpa", "Mum"}
+        )
+
+    def test_rebuild_skips_cycles(self):
+        from families.lineage import compute_closure
+        closure, skipped = compute_closure({(1, 2), (2, 3), (3, 2), (4, 5)})
+        self.assertEqual(closure, {(4, 5, 1): 1})
+        self.assertEqual(skipped, {2, 3})
+
+    def test_lineage_endpoint(self):
+        res = self.client.get(f'/api/families/lineage/{self.kid.id}/?direction=ancestors')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(
+            [(r['name'], r['depth']) for r in res.data['results']],
+            [("Dad", 1), ("Mum", 1), ("Grandpa", 2)],
+        )
+        res = self.client.get(f'/api/families/lineage/{self.grandpa.id}/?max_depth=1')
+        self.assertEqual([r['name'] for r in res.data['results']], ["Dad"])
+
+    def test_lineage_endpoint_errors(self):
+        self.assertEqual(self.client.get('/api/families/lineage/999999/').status_code, 404)
+        res = self.client.get(f'/api/families/lineage/{self.kid.id}/?direction=sideways')
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get(f'/api/families/lineage/{self.kid.id}/?max_depth=0')
+        self.assertEqual(res.status_code, 400)
+
+
+class KinshipTests(TestCase):
+    """Relation naming and paths from /api/families/kinship/."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="North", member_no="F-KIN-001")
+        self.m = {}
+        # name: (gender, parent)
+        for name, gender, parent in [
+            ("Patriarch", "M", None),
+            ("Arun", "M", "Patriarch"), ("Anna", "F", "Patriarch"),
+            ("Ben", "M", "Arun"), ("Bina", "F", "Anna"),
+            ("Chris", "M", "Ben"), ("Cara", "F", "Bina"),
+            ("Dev", "M", "Cara"),
+            ("Walter", "M", None), ("Wendy", "F", "Walter"), ("Will", "M", "Walter"),
+            ("Stranger", "O", None),
+        ]:
+            member = FamilyMember.objects.create(family=self.family, name=name, gender=gender, relation="Other")
+            if parent:
+                member.parents.add(self.m[parent])
+            self.m[name] = member
+        Relationship.objects.create(from_member=self.m["Chris"], to_member=self.m["Wendy"], relation_type='Spouse')
+
+    def relate(self, a, b):
+        res = self.client.get(f'/api/families/kinship/?a={self.m[a].id}&b={self.m[b].id}')
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def test_blood_relations(self):
+        cases = [
+            ("Chris", "Chris", "self"),
+            ("Ben", "Arun", "father"),
+            ("Chris", "Patriarch", "great-grandfather"),
+            ("Patriarch", "Cara", "great-granddaughter"),
+            ("Arun", "Anna", "sister"),
+            ("Ben", "Anna", "aunt"),
+            ("Anna", "Chris", "great-nephew"),
+            ("Ben", "Bina", "first cousin"),
+            ("Chris", "Bina", "first cousin once removed"),
+            ("Chris", "Cara", "second cousin"),
+            ("Chris", "Dev", "second cousin once removed"),
+        ]
+        for a, b, expected in cases:
+            with self.subTest(a=a, b=b):
+                self.assertEqual(self.relate(a, b)['relation'], expected)
+
+    def test_path_runs_through_common_ancestor(self):
+        data = self.relate("Chris", "Dev")
+        self.assertEqual(data['common_ancestor'], self.m["Patriarch"].id)
+        self.assertEqual(
+            [step['name'] for step in data['path']],
+            ["Chris", "Ben", "Arun", "Patriarch", "Anna", "Bina", "Cara", "Dev"],
+        )
+
+    def test_in_laws(self):
+        self.assertEqual(self.relate("Chris", "Wendy")['relation'], "wife")
+        data = self.relate("Chris", "Will")
+        self.assertEqual(data['relation'], "wife's brother")
+        self.assertEqual([step['name'] for step in data['path']], ["Chris", "Wendy", "Walter", "Will"])
+        self.assertEqual(self.relate("Will", "Chris")['relation'], "sister's husband")
+
+    def test_unrelated(self):
+        data = self.relate("Chris", "Stranger")
+        self.assertIsNone(data['relation'])
+        self.assertEqual(data['path'], [])
+
+    def test_index_follows_writes(self):
+        self.relate("Dev", "Chris")  # warm the index
+        baby = FamilyMember.objects.create(family=self.family, name="Baby", gender="F", relation="Other")
+        baby.parents.add(self.m["Dev"])
+        self.m["Baby"] = baby
+        self.assertEqual(self.relate("Baby", "Cara")['relation'], "grandmother")
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get('/api/families/kinship/?a=x&b=1').status_code, 400)
+        res = self.client.get(f'/api/families/kinship/?a={self.m["Chris"].id}&b=999999')
+        self.assertEqual(res.status_code, 404)
+
 
 class PermissionsTests(TestCase):
     """Test IsGuardianOrSelf permission logic via managed member endpoints."""
@@ -0,0 +1,211 @@
+"""
+Family Tree Cache
+=================
+Versioned, cross-process cache of the /api/families/tree/ payload, persisted
+in the TreeSnapshot singleton row so all gunicorn workers share it.
+
+    - bump_tree_version(): called by signals (see signals.py) whenever a
+      member, relationship, parent link, user or committee entry changes.
+    - get_tree_payload(): returns the cached payload, rebuilding it when the
+      version has moved on. Rebuilds take a row lock and re-check the version
+      after acquiring it, so a burst of concurrent misses triggers a single
+      rebuild whose result every waiting requester then reuses.
+      aget_current_snapshot() is the same for async views.
+    - get_tree_changes(): delta since a client's version, from the TreeChange
+      log that every rebuild appends to (old payload diffed against the new
+      one), or a resync signal once the log has been compacted past it.
+    - get_tree_graph(): a TreeGraph adjacency index over the payload. It is
+      memoised per process but keyed by the shared snapshot (version and
+      build time), so a worker never serves an index older than the
+      current snapshot.
+    - get_kinship_index(): a KinshipIndex built from that same graph and
+      replaced together with it, so kinship answers follow every rebuild.
+"""
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from backapi.cache import invalidate
+from .models import TreeSnapshot, TreeChange
+from .tree_engine import build_tree
+from .tree_graph import TreeGraph
+from .kinship import KinshipIndex
+from .tree_loader import load_tree_data
+
+SNAPSHOT_PK = 1
+
+_graph_lock = threading.Lock()
+_graph_memo = {'key': None, 'graph': None}
+_kinship_memo = {'graph': None, 'index': None}
+
+
+def bump_tree_version():
+    """Invalidate the cached tree for every process."""
+    invalidate('tree')
+    updated = TreeSnapshot.objects.filter(pk=SNAPSHOT_PK).update(version=F('version') + 1)
+    if not updated:
+        TreeSnapshot.objects.get_or_create(pk=SNAPSHOT_PK)
+
+
+async def aget_current_snapshot():
+    """get_current_snapshot() for async views: one async read while the payload is current."""
+    snapshot = await TreeSnapshot.objects.filter(pk=SNAPSHOT_PK).afirst()
+    if snapshot is not None and snapshot.built_version == snapshot.version and snapshot.payload is not None:
+        return snapshot
+    return await sync_to_async(get_current_snapshot)()
+
+
+def get_current_snapshot():
+    """Return the TreeSnapshot row with a payload built for its version, rebuilding if needed."""
+    snapshot, _ = TreeSnapshot.objects.get_or_create(pk=SNAPSHOT_PK)
+    if snapshot.built_version == snapshot.version and snapshot.payload is not None:
+        return snapshot
+
+    with transaction.atomic():
+        snapshot = TreeSnapshot.objects.select_for_update().get(pk=SNAPSHOT_PK)
+        # Another process may have rebuilt this version while we waited for the lock
+        if snapshot.built_version == snapshot.version and snapshot.payload is not None:
+            return snapshot
+
+        # Normalise to JSON types so the payload diffs cleanly against the stored one
+        payload = json.loads(json.dumps(build_tree(load_tree_data()), cls=DjangoJSONEncoder))
+        if snapshot.payload is None:
+            snapshot.log_floor = snapshot.version
+        else:
+            TreeChange.objects.bulk_create(diff_payloads(snapshot.payload, payload, snapshot.version))
+
+        snapshot.payload = payload
+        snapshot.built_version = snapshot.version
+        snapshot.built_at = timezone.now()
+        snapshot.save(update_fields=['payload', 'built_version', 'built_at', 'log_floor'])
+    return snapshot
+
+
+def get_tree_payload():
+    """Return the { nodes, links } payload for the current tree version."""
+    return get_current_snapshot().payload
+
+
+def _link_key(link):
+    return link['source'], link['target'], link['type']
+
+
+def diff_payloads(old, new, version):
+    """Unsaved TreeChange rows turning payload `old` into `new`."""
+    changes = []
+    old_nodes = {n['id']: n for n in old['nodes']}
+    new_nodes = {n['id']: n for n in new['nodes']}
+    for node_id, node in new_nodes.items():
+        previous = old_nodes.get(node_id)
+        if previous is None:
+            changes.append(TreeChange(version=version, kind='node', op='add', node_id=node_id))
+        elif previous != node:
+            changes.append(TreeChange(version=version, kind='node', op='update', node_id=node_id))
+    for node_id in old_nodes.keys() - new_nodes.keys():
+        changes.append(TreeChange(version=version, kind='node', op='remove', node_id=node_id))
+
+    old_links = {_link_key(l) for l in old['links']}
+    new_links = {_link_key(l) for l in new['links']}
+    for op, keys in (('add', new_links - old_links), ('remove', old_links - new_links)):
+        for source, target, link_type in keys:
+            changes.append(TreeChange(
+                version=version, kind='link', op=op,
+                source=source, target=target, link_type=link_type,
+            ))
+    return changes
+
+
+def get_tree_changes(since):
+    """
+    Return the delta from tree version `since` to the current one.
+
+    Each node/link's first logged op after `since` says whether it existed
+    then; the current payload says whether it exists now. Together they
+    classify it as added, updated or removed.
+    """
+    snapshot = get_current_snapshot()
+    if since < snapshot.log_floor or since > snapshot.version:
+        return {"version": snapshot.version, "resync": True}
+
+    first_node_op, first_link_op = {}, {}
+    rows = (
+        TreeChange.objects.filter(version__gt=since)
+        .order_by('version', 'pk')
+        .values_list('kind', 'op', 'node_id', 'source', 'target', 'link_type')
+    )
+    for kind, op, node_id, source, target, link_type in rows:
+        if kind == 'node':
+            first_node_op.setdefault(node_id, op)
+        else:
+            first_link_op.setdefault((source, target, link_type), op)
+
+    current_nodes = {n['id']: n for n in snapshot.payload['nodes']}
+    nodes = {"added": [], "updated": [], "removed": []}
+    for node_id, op in first_node_op.items():
+        node = current_nodes.get(node_id)
+        if node is not None:
+            nodes["added" if op == 'add' else "updated"].append(node)
+        elif op != 'add':
+            nodes["removed"].append(node_id)
+
+    current_links = {_link_key(l): l for l in snapshot.payload['links']}
+    links = {"added": [], "removed": []}
+    for key, op in first_link_op.items():
+        link = current_links.get(key)
+        if link is not None and op == 'add':
+            links["added"].append(link)
+        elif link is None and op == 'remove':
+            links["removed"].append({"source": key[0], "target": key[1], "type": key[2]})
+
+    return {"version": snapshot.version, "resync": False, "nodes": nodes, "links": links}
+
+
+def compact_tree_changes(before):
+    """Delete change-log rows created before `before`; returns how many were deleted."""
+    with transaction.atomic():
+        stale = TreeChange.objects.filter(created_at__lt=before)
+        cutoff = stale.order_by('-version').values_list('version', flat=True).first()
+        if cutoff is None:
+            return 0
+        # Drop whole versions so the log stays complete above the new floor
+        deleted, _ = TreeChange.objects.filter(version__lte=cutoff).delete()
+        TreeSnapshot.objects.filter(pk=SNAPSHOT_PK, log_floor__lt=cutoff).update(log_floor=cutoff)
+    return deleted
+
+
+def get_tree_graph():
+    """Return a TreeGraph for the current tree version, reusing this process' copy when current."""
+    state = (
+        TreeSnapshot.objects.filter(pk=SNAPSHOT_PK)
+        .values_list('version', 'built_version', 'built_at')
+        .first()
+    )
+    with _graph_lock:
+        if state and state[0] == state[1] and _graph_memo['key'] == (state[0], state[2]):
+            return _graph_memo['graph']
+
+    snapshot = get_current_snapshot()
+    graph = TreeGraph(snapshot.payload)
+    with _graph_lock:
+        _graph_memo['key'] = (snapshot.built_version, snapshot.built_at)
+        _graph_memo['graph'] = graph
+    return graph
+
+
+def get_kinship_index():
+    """Return the KinshipIndex for the current tree graph, building it once per graph."""
+    graph = get_tree_graph()
+    with _graph_lock:
+        if _kinship_memo['graph'] is graph:
+            return _kinship_memo['index']
+
+    index = KinshipIndex(graph)
+    with _graph_lock:
+        _kinship_memo['graph'] = graph
+        _kinship_memo['index'] = index
+    return index
@@ -0,0 +1,307 @@
+"""
+Family Tree Inference Engine
+============================
+Turns preloaded tree data (see tree_loader) into the { nodes, links } graph
+rendered by the D3.js frontend, entirely in memory.
+
+Relationship rows are indexed once, per member and per relation type, so
+every chaining rule resolves with constant-time lookups and a whole build is
+linear in members + relationships:
+
+    - Father/Mother        → parent link (to_member is parent of from_member)
+    - Son/Daughter         → parent link (from_member is parent of to_member)
+    - Grandparent variants → chain through Father/Mother as intermediate
+    - Siblings             → share parent (both become children of Father)
+    - Uncle/Aunt           → child of grandparent (father's sibling)
+    - Cousin               → child of uncle/aunt
+    - In-laws              → spouse of sibling or parent of spouse
+    - Father/Mother-in-law → parent of the user's spouse
+    - Nephew/Niece         → child of sibling
+
+Finally co-parents (two parents sharing a child) get spouse links between them.
+Link order and de-duplication match the original view implementation exactly.
+
+build_tree() assembles the whole payload; iter_tree_records() is the
+streaming variant used for NDJSON responses.
+"""
+from array import array
+from collections import defaultdict
+
+
+DIRECT_PARENT_TYPES = {'Father', 'Mother'}
+DIRECT_CHILD_TYPES = {'Son', 'Daughter'}
+GRANDPARENT_TYPES = (
+    'Grandfather', 'Grandmother',
+    'Paternal Grandfather', 'Paternal Grandmother',
+    'Maternal Grandfather', 'Maternal Grandmother',
+)
+GRANDCHILD_TYPES = {'Grandson', 'Granddaughter'}
+SIBLING_TYPES = ('Brother', 'Sister')
+IN_LAW_SIBLING_SPOUSE = {
+    'Sister-in-law': 'Brother',   # Sister-in-law is brother's wife
+    'Brother-in-law': 'Sister',   # Brother-in-law is sister's husband
+}
+
+
+class LinkSet:
+    """
+    Append-only, de-duplicated link storage.
+
+    Endpoints live in parallel int64 arrays and link types are interned, so a
+    link costs a few machine words instead of a dict. Parent links are also
+    indexed by target as they are appended, which answers "first parent link
+    of X" and "all parents of X" without rescanning the list.
+    """
+    __slots__ = ('sources', 'targets', 'type_ids', 'type_names', '_type_index',
+                 '_keys', 'first_parent', 'parents_by_child')
+
+    def __init__(self):
+        self.sources = array('q')
+        self.targets = array('q')
+        self.type_ids = array('H')
+        self.type_names = []
+        self._type_index = {}
+        self._keys = set()
+        self.first_parent = {}                   # child_id -> source of its first parent link
+        self.parents_by_child = defaultdict(set)  # child_id -> {parent_id}
+
+    def __len__(self):
+        return len(self.sources)
+
+    def add(self, source, target, link_type, key):
+        """Append a link unless `key` has been seen before."""
+        if key in self._keys:
+            return
+        self._keys.add(key)
+
+        type_id = self._type_index.get(link_type)
+        if type_id is None:
+            type_id = self._type_index[link_type] = len(self.type_names)
+            self.type_names.append(link_type)
+
+        self.sources.append(source)
+        self.targets.append(target)
+        self.type_ids.append(type_id)
+
+        if link_type == 'parent':
+            self.first_parent.setdefault(target, source)
+            self.parents_by_child[target].add(source)
+
+    def add_parent(self, parent_id, child_id):
+        self.add(parent_id, child_id, 'parent', (parent_id, child_id, 'parent'))
+
+    def add_pair(self, source, target, link_type):
+        """Undirected link (spouse/sibling): de-duplicated on the sorted pair."""
+        low, high = sorted((source, target))
+        self.add(source, target, link_type, (low, high, link_type))
+
+    def iter_dicts(self):
+        names = self.type_names
+        for s, t, type_id in zip(self.sources, self.targets, self.type_ids):
+            yield {"source": s, "target": t, "type": names[type_id]}
+
+    def as_dicts(self):
+        return list(self.iter_dicts())
+
+
+class RelationshipIndex:
+    """Per-member, per-type lookups over Relationship rows, built in one pass."""
+    __slots__ = ('father_of', 'mother_of', '_first', '_parent_typed_by_to')
+
+    def __init__(self, relationships):
+        self.father_of = {}   # member_id -> father_id (last declaration wins)
+        self.mother_of = {}   # member_id -> mother_id (last declaration wins)
+        self._first = {}      # (from_id, relation_type) -> (position, to_id)
+        self._parent_typed_by_to = defaultdict(list)  # to_id -> [from_id] for type 'parent'
+
+        for position, (from_id, to_id, rtype) in enumerate(relationships):
+            if rtype == 'Father':
+                self.father_of[from_id] = to_id
+            elif rtype == 'Mother':
+                self.mother_of[from_id] = to_id
+            elif rtype == 'parent':
+                self._parent_typed_by_to[to_id].append(from_id)
+            self._first.setdefault((from_id, rtype), (position, to_id))
+
+    def first_to(self, from_id, relation_types):
+        """to_member of the earliest relationship from `from_id` with any of the given types."""
+        best = None
+        for rtype in relation_types:
+            hit = self._first.get((from_id, rtype))
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        return best[1] if best else None
+
+    def parent_typed_source(self, to_id, exclude_id):
+        """from_member of the earliest 'parent'-typed relationship pointing at `to_id`."""
+        for from_id in self._parent_typed_by_to.get(to_id, ()):
+            if from_id != exclude_id:
+                return from_id
+        return None
+
+
+def node_dict(m, role, is_committee, username):
+    """Tree node for one member; role/committee/username come from the caller's bulk data."""
+    return {
+        "id": m.id,
+        "name": m.name,
+        "photo": m.photo.url if m.photo else None,
+        "role": role,
+        "is_committee": is_committee,
+        # Username for centering focus
+        "username": username,
+        "gender": m.gender,
+        "age": m.age,
+        "occupation": m.occupation,
+        "date_of_birth": m.date_of_birth,
+        "blood_group": m.blood_group,
+        "education": m.education,
+        "location": m.address_if_different,
+        "place_of_work": m.place_of_work,
+    }
+
+
+def build_nodes(data):
+    """Node dicts for every preloaded member, in pk order."""
+    return [
+        node_dict(m, data.role(m), data.is_committee(m), data.username(m))
+        for m in data.members
+    ]
+
+
+def build_links(parent_pairs, relationships):
+    """
+    Infer every tree link; returns a LinkSet.
+
+    `parent_pairs` yields (parent_id, child_id) from the M2M parents field,
+    ordered by child then M2M row; `relationships` is a list of
+    (from_id, to_id, relation_type) tuples ordered by pk.
+    """
+    links = LinkSet()
+
+    # Parent-child links from M2M parents field
+    for parent_id, child_id in parent_pairs:
+        links.add_parent(parent_id, child_id)
+
+    index = RelationshipIndex(relationships)
+    father_of, mother_of = index.father_of, index.mother_of
+
+    for from_id, to_id, rtype in relationships:
+        if rtype in DIRECT_PARENT_TYPES:
+            # "Alex is my Father" -> Alex is parent of me
+            links.add_parent(to_id, from_id)
+
+        elif rtype in DIRECT_CHILD_TYPES:
+            # "Bob is my Son" -> I am parent of Bob
+            links.add_parent(from_id, to_id)
+
+        elif rtype in GRANDPARENT_TYPES:
+            # Paternal -> Father, Maternal -> Mother, generic -> first available
+            if 'Paternal' in rtype:
+                parent_id = father_of.get(from_id)
+            elif 'Maternal' in rtype:
+                parent_id = mother_of.get(from_id)
+            else:
+                parent_id = father_of.get(from_id) or mother_of.get(from_id)
+            links.add_parent(to_id, parent_id if parent_id else from_id)
+
+        elif rtype in GRANDCHILD_TYPES:
+            link_type = rtype.lower()
+            links.add(from_id, to_id, link_type, (from_id, to_id, link_type))
+
+        elif rtype == 'Spouse':
+            links.add_pair(from_id, to_id, 'spouse')
+
+        elif rtype in SIBLING_TYPES:
+            # Siblings share parents: make the sibling a child of my Father (or Mother)
+            shared_parent = father_of.get(from_id) or mother_of.get(from_id)
+            if shared_parent:
+                links.add_parent(shared_parent, to_id)
+            else:
+                links.add_pair(from_id, to_id, 'sibling')
+
+        elif rtype in IN_LAW_SIBLING_SPOUSE:
+            # Spouse link between the sibling and the in-law: Brother <-> Sister-in-law
+            sibling_id = index.first_to(from_id, (IN_LAW_SIBLING_SPOUSE[rtype],))
+            if sibling_id is not None:
+                links.add_pair(sibling_id, to_id, 'spouse')
+
+        elif rtype in ('Uncle', 'Aunt'):
+            # Uncle/Aunt = father's/mother's sibling -> child of grandparent
+            father_id = father_of.get(from_id)
+            gf_id = index.first_to(from_id, GRANDPARENT_TYPES)
+            if not gf_id and father_id:
+                gf_id = index.parent_typed_source(father_id, exclude_id=from_id)
+
+            if gf_id:
+                links.add_parent(gf_id, to_id)
+            elif father_id:
+                # Fallback: make uncle a sibling of father via father's first parent link
+                gp_id = links.first_parent.get(father_id)
+                if gp_id is not None:
+                    links.add_parent(gp_id, to_id)
+
+        elif rtype == 'Cousin':
+            # Cousin = uncle/aunt's child
+            uncle_id = index.first_to(from_id, ('Uncle', 'Aunt'))
+            if uncle_id is not None:
+                links.add_parent(uncle_id, to_id)
+
+        elif rtype in ('Father-in-law', 'Mother-in-law'):
+            # Father-in-law/Mother-in-law = spouse's parent
+            spouse_id = index.first_to(from_id, ('Spouse',))
+            if spouse_id is not None:
+                links.add_parent(to_id, spouse_id)
+
+        elif rtype in ('Son-in-law', 'Daughter-in-law'):
+            # Son/Daughter-in-law = child's spouse
+            child_id = index.first_to(from_id, ('Son', 'Daughter'))
+            if child_id is not None:
+                links.add_pair(child_id, to_id, 'spouse')
+
+        elif rtype in ('Nephew', 'Niece'):
+            # Nephew/Niece = sibling's child
+            sibling_id = index.first_to(from_id, SIBLING_TYPES)
+            if sibling_id is not None:
+                links.add_parent(sibling_id, to_id)
+
+        else:
+            # Truly unknown types - add generic link
+            links.add(from_id, to_id, rtype.lower(), (from_id, to_id, rtype))
+
+    # Auto-detect co-parents (share same child) and add spouse links
+    for parent_ids in list(links.parents_by_child.values()):
+        if len(parent_ids) > 1:
+            parent_list = list(parent_ids)
+            for i in range(len(parent_list)):
+                for j in range(i + 1, len(parent_list)):
+                    links.add_pair(parent_list[i], parent_list[j], 'spouse')
+
+    return links
+
+
+def build_tree(data):
+    """Return the { nodes, links } payload served by FamilyTreeView."""
+    links = build_links(data.parent_pairs(), data.relationships)
+    return {"nodes": build_nodes(data), "links": links.as_dicts()}
+
+
+def iter_tree_records(member_rows, parent_pairs, relationships):
+    """
+    Streaming counterpart of build_tree: yield {"node": ...} records, then {"link": ...}.
+
+    `member_rows` yields (member, role, is_committee, username) and is consumed
+    one row at a time; links are inferred only after every node has been emitted.
+    """
+    for m, role, is_committee, username in member_rows:
+        yield {"node": node_dict(m, role, is_committee, username)}
+    for link in build_links(parent_pairs, relationships).iter_dicts():
+        yield {"link": link}
+
+
+def iter_payload_records(payload):
+    """Yield node/link records for an already assembled { nodes, links } payload."""
+    for node in payload['nodes']:
+        yield {"node": node}
+    for link in payload['links']:
+        yield {"link": link}
@@ -0,0 +1,96 @@
+"""
+Family Tree Graph
+=================
+Adjacency index over an assembled { nodes, links } payload, used to answer
+neighbourhood queries without walking the whole clan.
+
+    - parent links  → vertical edges (up to parents, down to children)
+    - spouse/sibling links → lateral edges
+
+`TreeGraph.neighbourhood()` runs the bounded, ego-centric BFS behind
+`/api/families/tree/?focus=<id>&up=N&down=M&lateral=K`. Its cost depends
+only on the size of the neighbourhood it returns.
+"""
+from collections import defaultdict, deque
+
+LATERAL_LINK_TYPES = ('spouse', 'sibling')
+
+
+class TreeGraph:
+    """Per-node adjacency and incident-link index built once per tree version."""
+    __slots__ = ('nodes', 'links', 'position', 'parents', 'children', 'lateral', 'incident')
+
+    def __init__(self, payload):
+        self.nodes = payload['nodes']
+        self.links = payload['links']
+        self.position = {node['id']: i for i, node in enumerate(self.nodes)}
+        self.parents = defaultdict(list)
+        self.children = defaultdict(list)
+        self.lateral = defaultdict(list)
+        self.incident = defaultdict(list)   # node_id -> [link index]
+
+        for i, link in enumerate(self.links):
+            source, target, link_type = link['source'], link['target'], link['type']
+            self.incident[source].append(i)
+            if target != source:
+                self.incident[target].append(i)
+            if link_type == 'parent':
+                self.parents[target].append(source)
+                self.children[source].append(target)
+            elif link_type in LATERAL_LINK_TYPES:
+                self.lateral[source].append(target)
+                self.lateral[target].append(source)
+
+    def __contains__(self, node_id):
+        return node_id in self.position
+
+    def neighbourhood(self, focus_id, up, down, lateral):
+        """
+        Return the { nodes, links } subgraph around `focus_id`.
+
+        Walks at most `up` generations to ancestors and `down` generations to
+        descendants, plus up to `lateral` spouse/sibling hops. Once a path has
+        gone down it cannot climb again, so the walk covers the focus' own
+        ancestors and their descendants rather than drifting into other
+        families. Nodes with neighbours left outside the result are flagged
+        with has_more_up / has_more_down / has_more_lateral.
+        """
+        # State: (node, generation relative to focus, lateral hops used, descending)
+        start = (focus_id, 0, 0, False)
+        seen_states = {start}
+        selected = {focus_id}
+        queue = deque([start])
+
+        while queue:
+            node_id, generation, hops, descending = queue.popleft()
+            moves = []
+            if not descending and generation < up:
+                moves.extend((p, generation + 1, hops, False) for p in self.parents.get(node_id, ()))
+            if generation > -down:
+                moves.extend((c, generation - 1, hops, True) for c in self.children.get(node_id, ()))
+            if hops < lateral:
+                moves.extend((n, generation, hops + 1, descending) for n in self.lateral.get(node_id, ()))
+
+            for state in moves:
+                if state not in seen_states:
+                    seen_states.add(state)
+                    selected.add(state[0])
+                    queue.append(state)
+
+        nodes = []
+        for node_id in sorted(selected, key=self.position.__getitem__):
+            node = dict(self.nodes[self.position[node_id]])
+            node['has_more_up'] = any(p not in selected for p in self.parents.get(node_id, ()))
+            node['has_more_down'] = any(c not in selected for c in self.children.get(node_id, ()))
+            node['has_more_lateral'] = any(n not in selected for n in self.lateral.get(node_id, ()))
+            nodes.append(node)
+
+        link_indexes = {
+            i
+            for node_id in selected
+            for i in self.incident.get(node_id, ())
+            if self.links[i]['source'] in selected and self.links[i]['target'] in selected
+        }
+        links = [self.links[i] for i in sorted(link_indexes)]
+
+        return {"focus": focus_id, "nodes": nodes, "links": links}
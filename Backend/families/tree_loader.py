@@ -0,0 +1,116 @@
+"""
+Family Tree Data Loader
+=======================
+Bulk-loads everything FamilyTreeView needs in a fixed number of queries,
+whatever the size of the tree:
+
+    1. FamilyMember rows, joined with their linked User account.
+    2. Rows of the self-referential `parents` M2M through table.
+    3. Committee entries of every user that is linked to a member.
+    4. Relationship rows, as plain (from_id, to_id, relation_type) tuples.
+
+FamilyMember.role / FamilyMember.is_committee query committee entries per
+member; TreeData.role() / TreeData.is_committee() answer the same questions
+from the preloaded committee map instead.
+
+The iter_* helpers feed the streaming (NDJSON) tree instead: members are
+read with a chunked iterator and carry their committee role and username as
+annotations, so no per-member object outlives its chunk.
+"""
+from collections import defaultdict
+
+from django.db.models import Exists, F, OuterRef, Subquery
+
+from profiles.models import Committee
+from .models import FamilyMember, Relationship
+
+
+class TreeData:
+    """Preloaded members, parent M2M pairs, committee roles and relationships."""
+    __slots__ = ('members', 'parents_of', 'committee_roles', 'relationships')
+
+    def __init__(self, members, parents_of, committee_roles, relationships):
+        self.members = members                  # [FamilyMember] ordered by pk
+        self.parents_of = parents_of            # child_id -> [parent_id] in M2M row order
+        self.committee_roles = committee_roles  # member_id -> role of first committee entry
+        self.relationships = relationships      # [(from_id, to_id, relation_type)] ordered by pk
+
+    def parent_pairs(self):
+        """Yield (parent_id, child_id) M2M pairs in member order."""
+        for m in self.members:
+            for parent_id in self.parents_of.get(m.id, ()):
+                yield parent_id, m.id
+
+    def username(self, member):
+        """Username of the member's linked account, or None."""
+        if hasattr(member, 'user_account'):
+            return member.user_account.username
+        return None
+
+    def role(self, member):
+        """Mirror of FamilyMember.role without the per-member query."""
+        return self.committee_roles.get(member.id) or member.relation
+
+    def is_committee(self, member):
+        """Mirror of FamilyMember.is_committee without the per-member query."""
+        return member.id in self.committee_roles
+
+
+def load_tree_data():
+    """Load the whole tree in four queries and return a TreeData."""
+    members = list(FamilyMember.objects.select_related('user_account').order_by('pk'))
+
+    parents_of = defaultdict(list)
+    pairs = (
+        FamilyMember.parents.through.objects
+        .order_by('pk')
+        .values_list('from_familymember_id', 'to_familymember_id')
+    )
+    for child_id, parent_id in pairs:
+        parents_of[child_id].append(parent_id)
+
+    # `committee_entries.first()` orders by pk, so only the first entry per member counts
+    committee_roles = {}
+    entries = (
+        Committee.objects.filter(user__member__isnull=False)
+        .order_by('pk')
+        .values_list('user__member_id', 'role')
+    )
+    for member_id, role in entries:
+        committee_roles.setdefault(member_id, role)
+
+    relationships = load_relationships()
+
+    return TreeData(members, parents_of, committee_roles, relationships)
+
+
+STREAM_CHUNK_SIZE = 500
+
+
+def iter_member_rows(chunk_size=STREAM_CHUNK_SIZE):
+    """Yield (member, role, is_committee, username) for every member in pk order, chunk by chunk."""
+    first_entry = Committee.objects.filter(user__member=OuterRef('pk')).order_by('pk')
+    members = FamilyMember.objects.annotate(
+        committee_role=Subquery(first_entry.values('role')[:1]),
+        on_committee=Exists(first_entry),
+        account_username=F('user_account__username'),
+    ).order_by('pk')
+    for m in members.iterator(chunk_size=chunk_size):
+        yield m, m.committee_role or m.relation, m.on_committee, m.account_username
+
+
+def iter_parent_pairs(chunk_size=STREAM_CHUNK_SIZE):
+    """Yield (parent_id, child_id) M2M pairs in the same order as TreeData.parent_pairs()."""
+    pairs = (
+        FamilyMember.parents.through.objects
+        .order_by('from_familymember_id', 'pk')
+        .values_list('to_familymember_id', 'from_familymember_id')
+    )
+    return pairs.iterator(chunk_size=chunk_size)
+
+
+def load_relationships():
+    """Relationship rows as (from_id, to_id, relation_type) tuples ordered by pk."""
+    return list(
+        Relationship.objects.order_by('pk').values_list('from_member_id', 'to_member_id', 'relation_type')
+    )
@@ -1,12 +1,19 @@
 from django.urls import path
+from backapi.asyncviews import read_view
 from .views import (
-    UserProfileView, FamilyTreeView, FamilyMediaList, FamilyMediaDetail,
-    ManagedMembersView, ManagedMemberDetailView
+    UserProfileView, FamilyTreeView, FamilyTreeChangesView, FamilyMediaList, FamilyMediaDetail,
+    ManagedMembersView, ManagedMemberDetailView, LineageView, KinshipView,
+    GenealogyImportView, GenealogyExportView,
 )
 
 urlpatterns = [
     path('profile/', UserProfileView.as_view(), name='user-profile'),
-    path('tree/', FamilyTreeView.as_view(), name='family-tree'),
+    path('tree/', read_view(FamilyTreeView), name='family-tree'),
+    path('tree/changes/', FamilyTreeChangesView.as_view(), name='family-tree-changes'),
+    path('lineage/<int:pk>/', LineageView.as_view(), name='family-lineage'),
+    path('kinship/', KinshipView.as_view(), name='family-kinship'),
+    path('import/', GenealogyImportView.as_view(), name='family-import'),
+    path('export/<str:kind>/', GenealogyExportView.as_view(), name='family-export'),
     path('media/', FamilyMediaList.as_view(), name='family-media-list'),
     path('media/<int:pk>/', FamilyMediaDetail.as_view(), name='family-media-detail'),
     path('managed/', ManagedMembersView.as_view(), name='managed-members'),
@@ -9,6 +9,11 @@ Key Views:
     - FamilyTreeView: Builds hierarchical tree data (nodes + links) from
       Relationship records, chaining all relation types into a renderable
       parent/spouse graph for the D3.js frontend.
+    - FamilyTreeChangesView: Delta sync of the tree since a known version.
+    - LineageView: Ancestors/descendants of a member from the closure table.
+    - KinshipView: Names how two members are related, with the path between them.
+    - GenealogyImportView: Admin-only CSV/GEDCOM bulk import.
+    - GenealogyExportView: Staff-only streaming GEDCOM/JSON export.
     - ManagedMembersView: List/create members managed by the current user.
     - FamilyMembersCRUD: Generic detail view for a single member.
     - FamilyMediaCRUD: Gallery list/create and detail endpoints.
@@ -17,12 +22,36 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from .models import FamilyMember, FamilyMedia, Family, Relationship
-from .serializers import FamilyMemberSerializer, FamilyTreeSerializer, FamilyMediaSerializer
+from .serializers import FamilyMemberSerializer, FamilyMemberRowSerializer, FamilyTreeSerializer, FamilyMediaSerializer
 from .permissions import IsGuardianOrSelf
+from .tree_cache import aget_current_snapshot, get_current_snapshot, get_tree_graph, get_tree_changes, get_kinship_index
+from .tree_engine import iter_tree_records, iter_payload_records
+from .tree_loader import iter_member_rows, iter_parent_pairs, load_relationships, STREAM_CHUNK_SIZE
+from .lineage import ancestors_of, descendants_of
+from .relationship_writes import PROFILE_PARENT_TYPES, parse_relationship_items, sync_relationships
+from .importers import detect_format, import_genealogy
+from .exporters import EXPORTERS
+from .tasks import schedule_tree_warmup
+from backapi.asyncviews import stream_body
+from backapi.cache import CachedResponseMixin, CachePolicy
+from backapi.ndjson import with_ndjson, wants_ndjson, stream_ndjson
 from rest_framework import generics
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
 from datetime import date
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def serialize_member(pk):
+    """FamilyMemberSerializer data for a member re-read with its annotations and prefetches."""
+    return FamilyMemberSerializer(FamilyMember.objects.with_profile_data().get(pk=pk)).data
+
 
 class UserProfileView(APIView):
     """
@@ -33,7 +62,7 @@ class UserProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        member = FamilyMember.objects.filter(user_account=request.user).first()
+        member = FamilyMember.objects.with_profile_data().filter(user_account=request.user).first()
         if member:
             serializer = FamilyMemberSerializer(member)
             return Response(serializer.data)
@@ -41,460 +70,317 @@ class UserProfileView(APIView):
 
     def post(self, request):
         try:
-            data = request.data
-            user = request.user
+            # One transaction: a lineage cycle rolls back every write of the request
+            with transaction.atomic():
+                data = request.data
+                user = request.user
             
-            # Check if member exists via OneToOne relationship
-            member = getattr(user, 'member', None)
+                # From the database, locked: request.user (and its member) may come from the user cache
+                member = FamilyMember.objects.select_for_update().filter(user_account=user).first()
             
-            if not member:
-                 # Create new member if not exists - needs a family
-                 family = Family.objects.first()
-                 if not family:
-                     # Fallback: Create a default family if none exists
-                     family = Family.objects.create(
-                         sl_no="1",
-                         branch="Main Branch",
-                         member_no="KFA-0001"
-                     )
+                if not member:
+                     # Create new member if not exists - needs a family
+                     family = Family.objects.first()
+                     if not family:
+                         # Fallback: Create a default family if none exists
+                         family = Family.objects.create(
+                             sl_no="1",
+                             branch="Main Branch",
+                             member_no="KFA-0001"
+                         )
                  
-                 dob = data.get('date_of_birth')
-                 if not dob:
-                     return Response({"error": "Date of birth is required for new profile."}, status=400)
+                     dob = data.get('date_of_birth')
+                     if not dob:
+                         return Response({"error": "Date of birth is required for new profile."}, status=400)
                  
-                 # Calculate age
-                 try:
-                     dob_date = date.fromisoformat(dob)
-                     today = date.today()
-                     calculated_age = today.year - dob_date.year - ((today.month, today.day) < (dob_date.month, dob_date.day))
-                 except ValueError:
-                     return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
-
-                 member = FamilyMember.objects.create(
-                     family=family,
-                     name=f"{data.get('first_name', '')} {data.get('last_name', '')}".strip() or user.username,
-                     age=calculated_age,
-                     date_of_birth=dob_date,
-                     blood_group=data.get('blood_group', 'Unknown'),
-                     relation='Member'
-                 )
-                 # Link user to member (since User.member is the field)
-                 user.member = member
-                 user.save()
-
-            # Update Fields
-            if 'first_name' in data or 'last_name' in data:
-                f_name = data.get('first_name', '')
-                l_name = data.get('last_name', '')
-                member.name = f"{f_name} {l_name}".strip()
-            elif 'name' in data:
-                member.name = data['name']
+                     # Calculate age
+                     try:
+                         dob_date = date.fromisoformat(dob)
+                         today = date.today()
+                         calculated_age = today.year - dob_date.year - ((today.month, today.day) < (dob_date.month, dob_date.day))
+                     except ValueError:
+                         return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
+
+                     member = FamilyMember.objects.create(
+                         family=family,
+                         name=f"{data.get('first_name', '')} {data.get('last_name', '')}".strip() or user.username,
+                         age=calculated_age,
+                         date_of_birth=dob_date,
+                         blood_group=data.get('blood_group', 'Unknown'),
+                         relation='Member'
+                     )
+                     # Link user to member (since User.member is the field)
+                     user.member = member
+                     user.save()
+
+                # Update Fields
+                if 'first_name' in data or 'last_name' in data:
+                    f_name = data.get('first_name', '')
+                    l_name = data.get('last_name', '')
+                    member.name = f"{f_name} {l_name}".strip()
+                elif 'name' in data:
+                    member.name = data['name']
             
-            if 'nickname' in data: member.nickname = data['nickname']
-            if 'gender' in data: member.gender = data['gender']
-            if 'bio' in data: member.bio = data['bio']
-            if 'phone_no' in data: member.phone_no = data['phone_no']
-            if 'email_id' in data: member.email_id = data['email_id']
-            if 'church_parish' in data: member.church_parish = data['church_parish']
+                if 'nickname' in data: member.nickname = data['nickname']
+                if 'gender' in data: member.gender = data['gender']
+                if 'bio' in data: member.bio = data['bio']
+                if 'phone_no' in data: member.phone_no = data['phone_no']
+                if 'email_id' in data: member.email_id = data['email_id']
+                if 'church_parish' in data: member.church_parish = data['church_parish']
             
-            if 'date_of_birth' in data and data['date_of_birth']: 
-                dob = data['date_of_birth']
-                member.date_of_birth = dob
-                # Recalculate age if DOB changed
-                try:
-                    dob_date = date.fromisoformat(dob)
-                    today = date.today()
-                    member.age = today.year - dob_date.year - ((today.month, today.day) < (dob_date.month, dob_date.day))
-                except (ValueError, TypeError):
-                    pass
-
-            if 'education' in data: member.education = data['education']
-            if 'occupation' in data: member.occupation = data['occupation']
-            if 'place_of_work' in data: member.place_of_work = data['place_of_work']
-            if 'blood_group' in data: member.blood_group = data['blood_group']
-            if 'is_deceased' in data: member.is_deceased = data['is_deceased'] == 'true' or data['is_deceased'] == True
-            if 'address' in data: member.address_if_different = data['address']
-            elif 'address_if_different' in data: member.address_if_different = data['address_if_different']
+                if 'date_of_birth' in data and data['date_of_birth']: 
+                    dob = data['date_of_birth']
+                    member.date_of_birth = dob
+                    # Recalculate age if DOB changed
+                    try:
+                        dob_date = date.fromisoformat(dob)
+                        today = date.today()
+                        member.age = today.year - dob_date.year - ((today.month, today.day) < (dob_date.month, dob_date.day))
+                    except (ValueError, TypeError):
+                        pass
+
+                if 'education' in data: member.education = data['education']
+                if 'occupation' in data: member.occupation = data['occupation']
+                if 'place_of_work' in data: member.place_of_work = data['place_of_work']
+                if 'blood_group' in data: member.blood_group = data['blood_group']
+                if 'is_deceased' in data: member.is_deceased = data['is_deceased'] == 'true' or data['is_deceased'] == True
+                if 'address' in data: member.address_if_different = data['address']
+                elif 'address_if_different' in data: member.address_if_different = data['address_if_different']
             
-            # Update Parents (ManyToMany)
-            if 'parents' in data:
-                # Handle FormData getlist or JSON list
-                if hasattr(data, 'getlist'):
-                    parent_ids = data.getlist('parents')
-                else:
-                    parent_ids = data['parents']
+                # Update Parents (ManyToMany)
+                if 'parents' in data:
+                    # Handle FormData getlist or JSON list
+                    if hasattr(data, 'getlist'):
+                        parent_ids = data.getlist('parents')
+                    else:
+                        parent_ids = data['parents']
                 
-                if isinstance(parent_ids, str):
-                    parent_ids = [p.strip() for p in parent_ids.split(',')]
+                    if isinstance(parent_ids, str):
+                        parent_ids = [p.strip() for p in parent_ids.split(',')]
                 
-                member.parents.set(parent_ids)
+                    member.parents.set(parent_ids)
             
-            # Update Relationships
-            if 'relationships' in data:
-                import json
-                try:
-                    rel_data = data['relationships']
-                    if isinstance(rel_data, str):
-                        rel_data = json.loads(rel_data)
-                    
-                    # Clear existing and re-add? Or just add new ones?
-                    # For onboarding, clearing might be cleaner
-                    Relationship.objects.filter(from_member=member).delete()
-                    for item in rel_data:
-                        to_id = item.get('to_member') or item.get('to_member_id')
-                        rel_type = item.get('relation_type')
-                        name = item.get('name') or item.get('to_member_name')
-                        
-                        if not to_id and name:
-                            # Auto-create member if not found
-                            auto_gender = Relationship.GENDER_MAP.get(rel_type, 'M')
-                            new_member = FamilyMember.objects.create(
-                                name=name,
-                                relation=rel_type,
-                                gender=auto_gender,
-                                age=0, 
-                                created_by=request.user,
-                                family=member.family
-                            )
-                            to_id = new_member.id
-                        elif to_id and rel_type:
-                            # Auto-assign gender to existing member if not already set properly
-                            auto_gender = Relationship.GENDER_MAP.get(rel_type)
-                            if auto_gender:
-                                try:
-                                    target = FamilyMember.objects.get(id=to_id)
-                                    if target.gender != auto_gender:
-                                        target.gender = auto_gender
-                                        target.save(update_fields=['gender'])
-                                except FamilyMember.DoesNotExist:
-                                    pass
-
-                        if to_id and rel_type:
-                            Relationship.objects.create(
-                                from_member=member,
-                                to_member_id=to_id,
-                                relation_type=rel_type
-                            )
-                            # Also add to parents M2M for tree compatibility
-                            if rel_type in ('Father', 'Mother', 'Grandfather', 'Grandmother',
-                                            'Paternal Grandfather', 'Paternal Grandmother',
-                                            'Maternal Grandfather', 'Maternal Grandmother'):
-                                member.parents.add(to_id)
-                            
-                            # Handle in-law married_to: create spouse link
-                            married_to = item.get('married_to')
-                            if married_to and rel_type in ('Sister-in-law', 'Brother-in-law', 'Son-in-law', 'Daughter-in-law'):
-                                # Create Spouse relationship between the in-law and the family member
-                                Relationship.objects.get_or_create(
-                                    from_member_id=married_to,
-                                    to_member_id=to_id,
-                                    relation_type='Spouse'
-                                )
-                except Exception as e:
-                    print(f"Error saving relationships: {e}")
-
-            # Update Profile Pic
-            if 'profile_pic' in request.FILES:
-                member.photo = request.FILES['profile_pic']
-            elif 'photo' in request.FILES:
-                member.photo = request.FILES['photo']
+                # Update Relationships: only the difference is written, in one transaction
+                if 'relationships' in data:
+                    sync_relationships(
+                        member, parse_relationship_items(data['relationships']), request.user,
+                        parent_types=PROFILE_PARENT_TYPES, assign_gender=True,
+                    )
+
+                # Update Profile Pic
+                if 'profile_pic' in request.FILES:
+                    member.photo = request.FILES['profile_pic']
+                elif 'photo' in request.FILES:
+                    member.photo = request.FILES['photo']
             
-            member.save()
+                member.save()
+                # Profile writes usually change the tree; rebuild it in the background
+                schedule_tree_warmup()
             
-            return Response(FamilyMemberSerializer(member).data)
+                return Response(serialize_member(member.pk))
+        except ValidationError as e:
+            # Includes LineageCycleError; the transaction above is rolled back
+            return Response({"error": e.messages[0]}, status=400)
         except Exception as e:
-            import traceback
-            traceback.print_exc() # Print to server logs for debugging
+            logger.exception("Saving profile failed")
             return Response({"error": str(e)}, status=500)
 
 
-class FamilyTreeView(APIView):
+class FamilyTreeView(CachedResponseMixin, APIView):
     """
     GET /api/families/tree/  → Return { nodes, links } for the D3 tree.
+    GET /api/families/tree/?focus=<id>&up=N&down=M&lateral=K
+         → Only the neighbourhood around one member (see TreeGraph.neighbourhood),
+           with has_more_* flags on nodes that can be expanded further.
+    GET /api/families/tree/?format=ndjson (or Accept: application/x-ndjson)
+         → Streamed {"node": ...} lines followed by {"link": ...} lines.
+
+    Data is bulk-loaded by tree_loader in a fixed number of queries and the
+    links are inferred in memory by tree_engine (see its module docstring
+    for the relationship chaining rules). The assembled payload is cached
+    per tree version by tree_cache and shared across worker processes;
+    rendered JSON responses are cached on top of that (backapi/cache.py).
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    renderer_classes = with_ndjson()
+    cache_policy = CachePolicy('tree', groups=('tree',), timeout=300)
+
+    FOCUS_DEFAULTS = {'up': 2, 'down': 2, 'lateral': 1}
+    FOCUS_MAX_DEPTH = 10
 
-    Link generation algorithm:
-        1. Collect all FamilyMembers as nodes.
-        2. Convert each Relationship into the correct link type:
-           - Father/Mother       → parent link (to_member is parent of from_member)
-           - Son/Daughter         → parent link (from_member is parent of to_member)
-           - Grandparent variants → chain through Father/Mother as intermediate
-           - Siblings             → share parent (both become children of Father)
-           - Uncle/Aunt           → child of grandparent (father's sibling)
-           - Cousin               → child of uncle/aunt
-           - In-laws              → spouse of sibling or parent of spouse
-           - Father/Mother-in-law → parent of the user's spouse
-           - Nephew/Niece         → child of sibling
-        3. Auto-detect co-parents (two parents sharing a child) and add
-           spouse links between them.
+    def get(self, request):
+        return self.cached_response(request, self.tree_response)
+
+    async def aread(self, request):
+        """The whole tree for the async read view; focus queries go through get()."""
+        if request.GET:
+            return None
+        snapshot = await aget_current_snapshot()
+        return snapshot.payload, {'X-Tree-Version': str(snapshot.version)}
+
+    def tree_response(self, request):
+        if 'focus' not in request.query_params:
+            if wants_ndjson(request):
+                # Read straight from the database chunk by chunk rather than the cached payload
+                return stream_ndjson(iter_tree_records(
+                    iter_member_rows(), iter_parent_pairs(), load_relationships()
+                ))
+            snapshot = get_current_snapshot()
+            # Clients pass this back as ?since= to /tree/changes/
+            return Response(snapshot.payload, headers={'X-Tree-Version': str(snapshot.version)})
+
+        params = {}
+        for name, default in [('focus', None), *self.FOCUS_DEFAULTS.items()]:
+            raw = request.query_params.get(name, default)
+            try:
+                value = int(raw)
+            except (TypeError, ValueError):
+                return Response({"error": f"'{name}' must be an integer."}, status=400)
+            if name != 'focus' and not 0 <= value <= self.FOCUS_MAX_DEPTH:
+                return Response({"error": f"'{name}' must be between 0 and {self.FOCUS_MAX_DEPTH}."}, status=400)
+            params[name] = value
+
+        graph = get_tree_graph()
+        if params['focus'] not in graph:
+            return Response({"error": "Member not found"}, status=404)
+        neighbourhood = graph.neighbourhood(
+            params['focus'], up=params['up'], down=params['down'], lateral=params['lateral']
+        )
+        if wants_ndjson(request):
+            return stream_ndjson(iter_payload_records(neighbourhood))
+        return Response(neighbourhood)
+
+
+class FamilyTreeChangesView(APIView):
+    """
+    GET /api/families/tree/changes/?since=<version>
+         → { version, resync: false, nodes: {added, updated, removed}, links: {added, removed} }
+           with everything that changed after `since`, or { version, resync: true }
+           when the change log no longer reaches back that far.
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request):
-        members = FamilyMember.objects.all()
-        relationships = Relationship.objects.all()
-        
-        nodes = []
-        links = []
-        
-        # Track added link pairs to avoid duplicates
-        added_links = set()
-        
-        for m in members:
-            # Username for centering focus
-            username = None
-            if hasattr(m, 'user_account'):
-                username = m.user_account.username
-
-            nodes.append({
-                "id": m.id,
-                "name": m.name,
-                "photo": m.photo.url if m.photo else None,
-                "role": m.role,
-                "is_committee": m.is_committee,
-                "username": username,
-                "gender": m.gender,
-                "age": m.age,
-                "occupation": m.occupation,
-                "date_of_birth": m.date_of_birth,
-                "blood_group": m.blood_group,
-                "education": m.education,
-                "location": m.address_if_different,
-                "place_of_work": m.place_of_work,
-            })
-            
-            # Parent-child links from M2M parents field
-            for p in m.parents.all():
-                link_key = (p.id, m.id, 'parent')
-                if link_key not in added_links:
-                    links.append({"source": p.id, "target": m.id, "type": "parent"})
-                    added_links.add(link_key)
-
-        # Add all Relationship model links
-        # Only Father/Mother create direct "parent" hierarchy links
-        # Grandparents chain through Father/Mother when possible
-        DIRECT_PARENT_TYPES = {'Father', 'Mother'}
-        DIRECT_CHILD_TYPES = {'Son', 'Daughter'}
-        GRANDPARENT_TYPES = {'Grandfather', 'Grandmother', 'Paternal Grandfather', 'Paternal Grandmother', 'Maternal Grandfather', 'Maternal Grandmother'}
-        GRANDCHILD_TYPES = {'Grandson', 'Granddaughter'}
-        SPOUSE_TYPE = {'Spouse'}
-        SIBLING_TYPES = {'Brother', 'Sister'}
-        IN_LAW_SIBLING_SPOUSE = {
-            'Sister-in-law': 'Brother',   # Sister-in-law is brother's wife
-            'Brother-in-law': 'Sister',   # Brother-in-law is sister's husband
-        }
-        
-        # First pass: collect who set Father/Mother for whom
-        father_of = {}  # member_id -> father_member_id
-        mother_of = {}  # member_id -> mother_member_id
-        
-        for rel in relationships:
-            if rel.relation_type == 'Father':
-                father_of[rel.from_member_id] = rel.to_member_id
-            elif rel.relation_type == 'Mother':
-                mother_of[rel.from_member_id] = rel.to_member_id
-        
-        for rel in relationships:
-            from_id = rel.from_member_id
-            to_id = rel.to_member_id
-            rtype = rel.relation_type
-            
-            if rtype in DIRECT_PARENT_TYPES:
-                # "Alex is my Father" -> Alex is parent of me
-                link_key = (to_id, from_id, 'parent')
-                if link_key not in added_links:
-                    links.append({"source": to_id, "target": from_id, "type": "parent"})
-                    added_links.add(link_key)
-                    
-            elif rtype in DIRECT_CHILD_TYPES:
-                # "Bob is my Son" -> I am parent of Bob
-                link_key = (from_id, to_id, 'parent')
-                if link_key not in added_links:
-                    links.append({"source": from_id, "target": to_id, "type": "parent"})
-                    added_links.add(link_key)
-                    
-            elif rtype in GRANDPARENT_TYPES:
-                # Chain through correct parent based on side
-                # Paternal -> Father, Maternal -> Mother, generic -> first available
-                if 'Paternal' in rtype:
-                    parent_id = father_of.get(from_id)
-                elif 'Maternal' in rtype:
-                    parent_id = mother_of.get(from_id)
-                else:
-                    parent_id = father_of.get(from_id) or mother_of.get(from_id)
-                
-                if parent_id:
-                    link_key = (to_id, parent_id, 'parent')
-                    if link_key not in added_links:
-                        links.append({"source": to_id, "target": parent_id, "type": "parent"})
-                        added_links.add(link_key)
-                else:
-                    link_key = (to_id, from_id, 'parent')
-                    if link_key not in added_links:
-                        links.append({"source": to_id, "target": from_id, "type": "parent"})
-                        added_links.add(link_key)
-
-            elif rtype in GRANDCHILD_TYPES:
-                # "X is my Grandchild" -> I am grandparent, chain through child if known
-                link_key = (from_id, to_id, rtype.lower())
-                if link_key not in added_links:
-                    links.append({"source": from_id, "target": to_id, "type": rtype.lower()})
-                    added_links.add(link_key)
-
-            elif rtype in SPOUSE_TYPE:
-                pair = tuple(sorted([from_id, to_id]))
-                link_key = (pair[0], pair[1], 'spouse')
-                if link_key not in added_links:
-                    links.append({"source": from_id, "target": to_id, "type": "spouse"})
-                    added_links.add(link_key)
-                    
-            elif rtype in SIBLING_TYPES:
-                # Siblings share parents — make them children of the same parent
-                # If I have a Father, make Brother also a child of Father
-                father_id = father_of.get(from_id)
-                mother_id = mother_of.get(from_id)
-                
-                if father_id:
-                    link_key = (father_id, to_id, 'parent')
-                    if link_key not in added_links:
-                        links.append({"source": father_id, "target": to_id, "type": "parent"})
-                        added_links.add(link_key)
-                elif mother_id:
-                    link_key = (mother_id, to_id, 'parent')
-                    if link_key not in added_links:
-                        links.append({"source": mother_id, "target": to_id, "type": "parent"})
-                        added_links.add(link_key)
-                else:
-                    # No parent to share, just add sibling link
-                    pair = tuple(sorted([from_id, to_id]))
-                    link_key = (pair[0], pair[1], 'sibling')
-                    if link_key not in added_links:
-                        links.append({"source": from_id, "target": to_id, "type": "sibling"})
-                        added_links.add(link_key)
-            else:
-                # Handle in-law types by creating spouse links with siblings
-                sibling_match = IN_LAW_SIBLING_SPOUSE.get(rtype)
-                if sibling_match:
-                    # Find the sibling this in-law is connected to
-                    sibling_rel = relationships.filter(
-                        from_member_id=from_id, relation_type=sibling_match
-                    ).first()
-                    if sibling_rel:
-                        # Add spouse link: Brother <-> Sister-in-law
-                        pair = tuple(sorted([sibling_rel.to_member_id, to_id]))
-                        link_key = (pair[0], pair[1], 'spouse')
-                        if link_key not in added_links:
-                            links.append({"source": sibling_rel.to_member_id, "target": to_id, "type": "spouse"})
-                            added_links.add(link_key)
-
-                elif rtype in ('Uncle', 'Aunt'):
-                    # Uncle/Aunt = father's/mother's sibling → child of grandparent
-                    # Find grandparent (father's father or mother's father)
-                    father_id = father_of.get(from_id)
-                    mother_id = mother_of.get(from_id)
-                    # Check if grandfather/grandmother exists for this person
-                    gf_id = None
-                    for r in relationships:
-                        if r.from_member_id == from_id and r.relation_type in GRANDPARENT_TYPES:
-                            gf_id = r.to_member_id
-                            break
-                    # If no grandparent, try to chain through father's parent
-                    if not gf_id and father_id:
-                        for r in relationships:
-                            if r.to_member_id == father_id and r.relation_type == 'parent':
-                                gf_id = r.from_member_id if r.from_member_id != from_id else None
-                                if gf_id:
-                                    break
-                    
-                    if gf_id:
-                        link_key = (gf_id, to_id, 'parent')
-                        if link_key not in added_links:
-                            links.append({"source": gf_id, "target": to_id, "type": "parent"})
-                            added_links.add(link_key)
-                    elif father_id:
-                        # Fallback: make uncle sibling of father (child of same parent)
-                        # Find any parent link for father
-                        for link in links:
-                            if link['type'] == 'parent' and link['target'] == father_id:
-                                gp_id = link['source']
-                                lk = (gp_id, to_id, 'parent')
-                                if lk not in added_links:
-                                    links.append({"source": gp_id, "target": to_id, "type": "parent"})
-                                    added_links.add(lk)
-                                break
-
-                elif rtype == 'Cousin':
-                    # Cousin = uncle/aunt's child → find uncle/aunt and make cousin their child
-                    uncle_rel = relationships.filter(
-                        from_member_id=from_id, relation_type__in=['Uncle', 'Aunt']
-                    ).first()
-                    if uncle_rel:
-                        link_key = (uncle_rel.to_member_id, to_id, 'parent')
-                        if link_key not in added_links:
-                            links.append({"source": uncle_rel.to_member_id, "target": to_id, "type": "parent"})
-                            added_links.add(link_key)
-
-                elif rtype in ('Father-in-law', 'Mother-in-law'):
-                    # Father-in-law/Mother-in-law = spouse's parent
-                    # Find the user's spouse
-                    spouse_rel = relationships.filter(
-                        from_member_id=from_id, relation_type='Spouse'
-                    ).first()
-                    if spouse_rel:
-                        link_key = (to_id, spouse_rel.to_member_id, 'parent')
-                        if link_key not in added_links:
-                            links.append({"source": to_id, "target": spouse_rel.to_member_id, "type": "parent"})
-                            added_links.add(link_key)
-
-                elif rtype in ('Son-in-law', 'Daughter-in-law'):
-                    # Son/Daughter-in-law = child's spouse
-                    # Find the child (Son/Daughter) this in-law is married to
-                    child_rel = relationships.filter(
-                        from_member_id=from_id, relation_type__in=['Son', 'Daughter']
-                    ).first()
-                    if child_rel:
-                        pair = tuple(sorted([child_rel.to_member_id, to_id]))
-                        link_key = (pair[0], pair[1], 'spouse')
-                        if link_key not in added_links:
-                            links.append({"source": child_rel.to_member_id, "target": to_id, "type": "spouse"})
-                            added_links.add(link_key)
-
-                elif rtype in ('Nephew', 'Niece'):
-                    # Nephew/Niece = sibling's child
-                    sibling_rel = relationships.filter(
-                        from_member_id=from_id, relation_type__in=['Brother', 'Sister']
-                    ).first()
-                    if sibling_rel:
-                        link_key = (sibling_rel.to_member_id, to_id, 'parent')
-                        if link_key not in added_links:
-                            links.append({"source": sibling_rel.to_member_id, "target": to_id, "type": "parent"})
-                            added_links.add(link_key)
-
-                else:
-                    # Truly unknown types - add generic link
-                    link_key = (from_id, to_id, rtype)
-                    if link_key not in added_links:
-                        links.append({"source": from_id, "target": to_id, "type": rtype.lower()})
-                        added_links.add(link_key)
-
-        # Auto-detect co-parents (share same child) and add spouse links
-        from collections import defaultdict
-        children_parents = defaultdict(set)
-        for link in links:
-            if link['type'] == 'parent':
-                children_parents[link['target']].add(link['source'])
-        
-        for child_id, parent_ids in children_parents.items():
-            if len(parent_ids) > 1:
-                parent_list = list(parent_ids)
-                for i in range(len(parent_list)):
-                    for j in range(i + 1, len(parent_list)):
-                        pair = tuple(sorted([parent_list[i], parent_list[j]]))
-                        link_key = (pair[0], pair[1], 'spouse')
-                        if link_key not in added_links:
-                            links.append({"source": parent_list[i], "target": parent_list[j], "type": "spouse"})
-                            added_links.add(link_key)
-
-        return Response({"nodes": nodes, "links": links})
+        try:
+            since = int(request.query_params.get('since', ''))
+        except ValueError:
+            return Response({"error": "'since' must be an integer tree version."}, status=400)
+        return Response(get_tree_changes(since))
+
+
+class LineageView(APIView):
+    """
+    GET /api/families/lineage/<id>/?direction=ancestors|descendants&max_depth=N
+         → { member, direction, count, results: [{id, name, depth}] }
+
+    Answered from the Lineage closure table in one query, closest relatives
+    first; `depth` is the nearest number of generations between the two.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    DIRECTIONS = {
+        'ancestors': (ancestors_of, 'ancestor'),
+        'descendants': (descendants_of, 'descendant'),
+    }
+
+    def get(self, request, pk):
+        member = get_object_or_404(FamilyMember.objects.only('pk'), pk=pk)
+        direction = request.query_params.get('direction', 'descendants')
+        if direction not in self.DIRECTIONS:
+            return Response({"error": "'direction' must be 'ancestors' or 'descendants'."}, status=400)
+
+        max_depth = request.query_params.get('max_depth')
+        if max_depth is not None:
+            try:
+                max_depth = int(max_depth)
+            except ValueError:
+                return Response({"error": "'max_depth' must be a positive integer."}, status=400)
+            if max_depth < 1:
+                return Response({"error": "'max_depth' must be a positive integer."}, status=400)
+
+        query, prefix = self.DIRECTIONS[direction]
+        results = [
+            {"id": row[f'{prefix}_id'], "name": row[f'{prefix}__name'], "depth": row['depth']}
+            for row in query(member.pk, max_depth)
+        ]
+        return Response({"member": member.pk, "direction": direction, "count": len(results), "results": results})
+
+
+class KinshipView(APIView):
+    """
+    GET /api/families/kinship/?a=<id>&b=<id>
+         → { a, b, relation, common_ancestor, path: [{id, name}] }
+
+    `relation` names b as seen from a ("second cousin once removed",
+    "wife's brother"), or is null when the tree does not connect them.
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        try:
+            a = int(request.query_params.get('a', ''))
+            b = int(request.query_params.get('b', ''))
+        except ValueError:
+            return Response({"error": "'a' and 'b' must be member ids."}, status=400)
+
+        index = get_kinship_index()
+        missing = [member_id for member_id in (a, b) if member_id not in index]
+        if missing:
+            return Response({"error": f"Member {missing[0]} not found."}, status=404)
+        return Response({"a": a, "b": b, **index.relate(a, b)})
+
+
+class GenealogyImportView(APIView):
+    """
+    POST /api/families/import/   (admin only, multipart)
+         file=<.csv|.ged>, family=<member_no>, [format=csv|gedcom], [dry_run=true]
+         → { members, parent_links, relationships, cyclic_members, errors, dry_run }
+
+    Rows that fail validation are listed in `errors` with their line number;
+    the rest of the file is still imported.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"error": "Upload a CSV or GEDCOM file as 'file'."}, status=400)
+        file_format = request.data.get('format') or detect_format(upload.name)
+        if file_format not in ('csv', 'gedcom'):
+            return Response({"error": "'format' must be 'csv' or 'gedcom'."}, status=400)
+        member_no = request.data.get('family')
+        if not member_no:
+            return Response({"error": "'family' (member number) is required."}, status=400)
+
+        family, _ = Family.objects.get_or_create(
+            member_no=member_no, defaults={'sl_no': "1", 'branch': request.data.get('branch', "Main Branch")}
+        )
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = import_genealogy(lines, file_format, family, created_by=request.user, dry_run=dry_run)
+        except UnicodeDecodeError:
+            return Response({"error": "Files must be UTF-8 encoded."}, status=400)
+        return Response(report)
+
+
+class GenealogyExportView(APIView):
+    """
+    GET /api/families/export/gedcom/  → GEDCOM 5.5.1 file   (staff only)
+    GET /api/families/export/json/    → compact JSON dump
+
+    The file is streamed as it is generated, so large exports start
+    downloading immediately and never sit in memory.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, kind):
+        if kind not in EXPORTERS:
+            return Response({"error": "Export format must be 'gedcom' or 'json'."}, status=404)
+        exporter, content_type, extension = EXPORTERS[kind]
+        response = StreamingHttpResponse(stream_body(exporter()), content_type=content_type)
+        stamp = date.today().isoformat()
+        response['Content-Disposition'] = f'attachment; filename="genealogy-{stamp}.{extension}"'
+        return response
 
 
 class FamilyMediaList(generics.ListCreateAPIView):
@@ -512,102 +398,82 @@ class FamilyMediaDetail(generics.RetrieveUpdateDestroyAPIView):
 
 class ManagedMembersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = with_ndjson()
 
     def get(self, request):
         # List all members created by this user that are NOT independent
-        members = FamilyMember.objects.filter(created_by=request.user, is_independent=False)
-        serializer = FamilyMemberSerializer(members, many=True)
-        return Response(serializer.data)
+        members = FamilyMember.objects.with_profile_data().filter(created_by=request.user, is_independent=False)
+        # Read-only row serializer; same JSON as FamilyMemberSerializer (no request context)
+        rows = FamilyMemberRowSerializer()
+        if wants_ndjson(request):
+            # One serialized member per line, read in chunks
+            return stream_ndjson(rows.iter_serialized(members.order_by('pk'), STREAM_CHUNK_SIZE))
+        return Response(rows.serialize(members))
 
     def post(self, request):
         # Create a new member managed by this user
         try:
-            data = request.data
-            from .models import Family
-            family = Family.objects.first()
-            if not family:
-                return Response({"error": "No family found"}, status=400)
-
-            # Extract fields
-            f_name = data.get('first_name', '')
-            l_name = data.get('last_name', '')
-            full_name = data.get('name', f"{f_name} {l_name}".strip())
-
-            member = FamilyMember.objects.create(
-                family=family,
-                name=full_name,
-                age=data.get('age', 0),
-                gender=data.get('gender', 'M'),
-                relation=data.get('relation', 'Child'),
-                date_of_birth=data.get('date_of_birth', '2000-01-01'),
-                blood_group=data.get('blood_group', 'Unknown'),
-                occupation=data.get('occupation', ''),
-                education=data.get('education', ''),
-                is_deceased=data.get('is_deceased', 'false') == 'true' or data.get('is_deceased') == True,
-                phone_no=data.get('phone_no', ''),
-                email_id=data.get('email_id', ''),
-                address_if_different=data.get('address', ''),
-                bio=data.get('bio', ''),
-                church_parish=data.get('church_parish', ''),
-                nickname=data.get('nickname', ''),
-                created_by=request.user
-            )
-
-            # Link parents if provided
-            if 'parents' in data:
-                if hasattr(data, 'getlist'):
-                    parent_ids = data.getlist('parents')
-                else:
-                    parent_ids = data['parents']
+            # One transaction: a lineage cycle rolls back every write of the request
+            with transaction.atomic():
+                data = request.data
+                from .models import Family
+                family = Family.objects.first()
+                if not family:
+                    return Response({"error": "No family found"}, status=400)
+
+                # Extract fields
+                f_name = data.get('first_name', '')
+                l_name = data.get('last_name', '')
+                full_name = data.get('name', f"{f_name} {l_name}".strip())
+
+                member = FamilyMember.objects.create(
+                    family=family,
+                    name=full_name,
+                    age=data.get('age', 0),
+                    gender=data.get('gender', 'M'),
+                    relation=data.get('relation', 'Child'),
+                    date_of_birth=data.get('date_of_birth', '2000-01-01'),
+                    blood_group=data.get('blood_group', 'Unknown'),
+                    occupation=data.get('occupation', ''),
+                    education=data.get('education', ''),
+                    is_deceased=data.get('is_deceased', 'false') == 'true' or data.get('is_deceased') == True,
+                    phone_no=data.get('phone_no', ''),
+                    email_id=data.get('email_id', ''),
+                    address_if_different=data.get('address', ''),
+                    bio=data.get('bio', ''),
+                    church_parish=data.get('church_parish', ''),
+                    nickname=data.get('nickname', ''),
+                    created_by=request.user
+                )
+
+                # Link parents if provided
+                if 'parents' in data:
+                    if hasattr(data, 'getlist'):
+                        parent_ids = data.getlist('parents')
+                    else:
+                        parent_ids = data['parents']
                 
-                if isinstance(parent_ids, str):
-                    parent_ids = [p.strip() for p in parent_ids.split(',')]
-                member.parents.set(parent_ids)
-
-            # Relationships
-            if 'relationships' in data:
-                import json
-                try:
-                    rel_data = data['relationships']
-                    if isinstance(rel_data, str):
-                        rel_data = json.loads(rel_data)
-                    for item in rel_data:
-                        to_id = item.get('to_member') or item.get('to_member_id')
-                        rel_type = item.get('relation_type')
-                        name = item.get('name') or item.get('to_member_name')
-
-                        if not to_id and name:
-                            # Auto-create member if not found
-                            new_member = FamilyMember.objects.create(
-                                name=name,
-                                relation=rel_type, # Temporary
-                                age=0, 
-                                created_by=request.user,
-                                family=member.family
-                            )
-                            to_id = new_member.id
-
-                        if to_id and rel_type:
-                            Relationship.objects.create(
-                                from_member=member,
-                                to_member_id=to_id,
-                                relation_type=rel_type
-                            )
-                            if rel_type in ['Father', 'Mother']:
-                                member.parents.add(to_id)
-                except Exception as e:
-                    print(f"Error saving relationships: {e}")
-
-            # Profile Pic
-            if 'profile_pic' in request.FILES:
-                member.photo = request.FILES['profile_pic']
-            elif 'photo' in request.FILES:
-                member.photo = request.FILES['photo']
+                    if isinstance(parent_ids, str):
+                        parent_ids = [p.strip() for p in parent_ids.split(',')]
+                    member.parents.set(parent_ids)
+
+                # Relationships
+                if 'relationships' in data:
+                    sync_relationships(member, parse_relationship_items(data['relationships']), request.user)
+
+                # Profile Pic
+                if 'profile_pic' in request.FILES:
+                    member.photo = request.FILES['profile_pic']
+                elif 'photo' in request.FILES:
+                    member.photo = request.FILES['photo']
             
-            member.save()
+                member.save()
 
-            return Response(FamilyMemberSerializer(member).data, status=status.HTTP_201_CREATED)
+                return Response(serialize_member(member.pk), status=status.HTTP_201_CREATED)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=400)
         except Exception as e:
+            logger.exception("Saving managed member failed")
             return Response({"error": str(e)}, status=500)
 
 class ManagedMemberDetailView(APIView):
@@ -621,7 +487,7 @@ class ManagedMemberDetailView(APIView):
         return member
 
     def get(self, request, pk):
-        member = get_object_or_404(FamilyMember, pk=pk, created_by=request.user)
+        member = get_object_or_404(FamilyMember.objects.with_profile_data(), pk=pk, created_by=request.user)
         return Response(FamilyMemberSerializer(member).data)
 
     def put(self, request, pk):
@@ -634,84 +500,60 @@ class ManagedMemberDetailView(APIView):
              return Response({"error": "Member has their own account and cannot be managed by others."}, status=403)
 
         try:
-            data = request.data
+            # One transaction: a lineage cycle rolls back every write of the request
+            with transaction.atomic():
+                # Locked and current: concurrent writes (and bulk ones, which send no signals) are not lost
+                member = FamilyMember.objects.select_for_update().get(pk=member.pk)
+                data = request.data
             
-            f_name = data.get('first_name')
-            l_name = data.get('last_name')
-            if f_name is not None or l_name is not None:
-                member.name = f"{f_name or ''} {l_name or ''}".strip()
-            elif 'name' in data:
-                member.name = data['name']
-
-            if 'age' in data: member.age = data['age']
-            if 'gender' in data: member.gender = data['gender']
-            if 'relation' in data: member.relation = data['relation']
-            if 'date_of_birth' in data: member.date_of_birth = data['date_of_birth']
-            if 'blood_group' in data: member.blood_group = data['blood_group']
-            if 'occupation' in data: member.occupation = data['occupation']
-            if 'education' in data: member.education = data['education']
-            if 'phone_no' in data: member.phone_no = data['phone_no']
-            if 'email_id' in data: member.email_id = data['email_id']
-            if 'is_deceased' in data: member.is_deceased = data['is_deceased'] == 'true' or data['is_deceased'] == True
-            if 'address' in data: member.address_if_different = data['address']
-            if 'bio' in data: member.bio = data['bio']
-            if 'nickname' in data: member.nickname = data['nickname']
-            if 'church_parish' in data: member.church_parish = data['church_parish']
-
-            # Relationships
-            if 'relationships' in data:
-                import json
-                try:
-                    rel_data = data['relationships']
-                    if isinstance(rel_data, str):
-                        rel_data = json.loads(rel_data)
-                    
-                    Relationship.objects.filter(from_member=member).delete()
-                    for item in rel_data:
-                        to_id = item.get('to_member') or item.get('to_member_id')
-                        rel_type = item.get('relation_type')
-                        name = item.get('name') or item.get('to_member_name')
-
-                        if not to_id and name:
-                            # Auto-create member if not found
-                            new_member = FamilyMember.objects.create(
-                                name=name,
-                                relation=rel_type, # Temporary
-                                age=0, 
-                                created_by=request.user,
-                                family=member.family
-                            )
-                            to_id = new_member.id
-
-                        if to_id and rel_type:
-                            Relationship.objects.create(
-                                from_member=member,
-                                to_member_id=to_id,
-                                relation_type=rel_type
-                            )
-                            if rel_type in ['Father', 'Mother']:
-                                member.parents.add(to_id)
-                except Exception as e:
-                    print(f"Error saving relationships: {e}")
-
-            if 'parents' in data:
-                if hasattr(data, 'getlist'):
-                    parent_ids = data.getlist('parents')
-                else:
-                    parent_ids = data['parents']
+                f_name = data.get('first_name')
+                l_name = data.get('last_name')
+                if f_name is not None or l_name is not None:
+                    member.name = f"{f_name or ''} {l_name or ''}".strip()
+                elif 'name' in data:
+                    member.name = data['name']
+
+                if 'age' in data: member.age = data['age']
+                if 'gender' in data: member.gender = data['gender']
+                if 'relation' in data: member.relation = data['relation']
+                if 'date_of_birth' in data: member.date_of_birth = data['date_of_birth']
+                if 'blood_group' in data: member.blood_group = data['blood_group']
+                if 'occupation' in data: member.occupation = data['occupation']
+                if 'education' in data: member.education = data['education']
+                if 'phone_no' in data: member.phone_no = data['phone_no']
+                if 'email_id' in data: member.email_id = data['email_id']
+                if 'is_deceased' in data: member.is_deceased = data['is_deceased'] == 'true' or data['is_deceased'] == True
+                if 'address' in data: member.address_if_different = data['address']
+                if 'bio' in data: member.bio = data['bio']
+                if 'nickname' in data: member.nickname = data['nickname']
+                if 'church_parish' in data: member.church_parish = data['church_parish']
+
+                # Relationships
+                if 'relationships' in data:
+                    sync_relationships(member, parse_relationship_items(data['relationships']), request.user)
+
+                if 'parents' in data:
+                    if hasattr(data, 'getlist'):
+                        parent_ids = data.getlist('parents')
+                    else:
+                        parent_ids = data['parents']
                 
-                if isinstance(parent_ids, str):
-                    parent_ids = [p.strip() for p in parent_ids.split(',')]
-                member.parents.set(parent_ids)
-
-            if 'profile_pic' in request.FILES:
-                member.photo = request.FILES['profile_pic']
-            elif 'photo' in request.FILES:
-                member.photo = request.FILES['photo']
-
-            member.save()
-            return Response(FamilyMemberSerializer(member).data)
+                    if isinstance(parent_ids, str):
+                        parent_ids = [p.strip() for p in parent_ids.split(',')]
+                    member.parents.set(parent_ids)
+
+                if 'profile_pic' in request.FILES:
+                    member.photo = request.FILES['profile_pic']
+                elif 'photo' in request.FILES:
+                    member.photo = request.FILES['photo']
+
+                member.save()
+                schedule_tree_warmup()
+                return Response(serialize_member(member.pk))
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=400)
         except Exception as e:
+            logger.exception("Saving managed member failed")
             return Response({"error": str(e)}, status=500)
 
     def delete(self, request, pk):
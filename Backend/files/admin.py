@@ -0,0 +1,12 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+from .models import StoredFile
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'released_at', 'created_at')
+    list_filter = ('refcount',)
+    search_fields = ('name',)
+    ordering = ('-created_at',)
+    readonly_fields = ('name', 'size', 'refcount', 'released_at', 'created_at')
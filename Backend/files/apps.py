@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FilesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'files'
+
+    def ready(self):
+        from . import refs
+        refs.connect()
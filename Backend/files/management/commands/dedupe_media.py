@@ -0,0 +1,82 @@
+from django.apps import apps
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.user_cache import invalidate_member_users
+from backapi.imaging import IMAGE_SOURCES, queue_variants
+from families.models import FamilyMember
+from files.refs import recount, tracked_fields
+from files.storage import HASH_DIR, content_storage
+from files.tasks import delete_stored
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files still stored under their upload names into content-addressed storage, "
+        "delete the duplicates and recount file references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        moved, missing = {}, set()
+        legacy_bytes = new_bytes = 0
+
+        with transaction.atomic():
+            for model, fields in tracked_fields().items():
+                for field in fields:
+                    storage = field.storage
+                    names = (
+                        model._base_manager.exclude(**{f'{field.attname}__startswith': f'{HASH_DIR}/'})
+                        .exclude(**{field.attname: ''}).exclude(**{f'{field.attname}__isnull': True})
+                        .values_list(field.attname, flat=True).distinct()
+                    )
+                    for name in list(names):
+                        if name not in moved:
+                            if not storage.exists(name):
+                                missing.add(name)
+                                continue
+                            with storage.open(name, 'rb') as source:
+                                content = File(source, name)
+                                target = storage.hashed_name(content, name)
+                                if not storage.exists(target) and target not in moved.values():
+                                    new_bytes += content.size
+                                legacy_bytes += content.size
+                                if not dry_run:
+                                    storage.save(name, content)
+                            moved[name] = target
+                        if not dry_run:
+                            rows = model._base_manager.filter(**{field.attname: name})
+                            if model is FamilyMember:
+                                # update() sends no signals: drop cached users showing this photo
+                                invalidate_member_users(rows.values_list('pk', flat=True))
+                            rows.update(**{field.attname: moved[name]})
+
+            if not dry_run:
+                for label, field_name, filters in IMAGE_SOURCES:
+                    model = apps.get_model(label)
+                    storage = model._meta.get_field(field_name).storage
+                    names = (
+                        model._base_manager.filter(**filters, **{f'{field_name}__in': set(moved.values())})
+                        .values_list(field_name, flat=True).distinct()
+                    )
+                    for name in names:
+                        queue_variants(name, storage)
+                # The upload-named copies (and their variants) go once the rows point at the hashed ones
+                for name in moved:
+                    transaction.on_commit(lambda name=name: delete_stored(name, content_storage()))
+
+        distinct = len(set(moved.values()))
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(
+            f"{verb} {len(moved)} files into {distinct} content-addressed files, "
+            f"freeing {legacy_bytes - new_bytes} bytes."
+        )
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{len(missing)} referenced files are missing from storage."))
+        if not dry_run:
+            files, references = recount()
+            self.stdout.write(self.style.SUCCESS(f"Counted {references} references to {files} stored files."))
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """
+    A file in the content-addressed storage and how many model fields
+    reference it. Kept up to date by files.refs; `manage.py dedupe_media`
+    recounts it from the tables.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    # When the count last dropped to zero; the file is purged after a grace period
+    released_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'released_at'], name='files_unreferenced_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
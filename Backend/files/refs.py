@@ -0,0 +1,138 @@
+"""
+Reference counting for content-addressed files.
+
+Every FileField/ImageField on ContentAddressedStorage is tracked: saving a
+row that points a field at a file counts a reference, pointing it elsewhere
+or deleting the row releases one. A file whose count reaches zero is not
+deleted at once; files.tasks.purge_unreferenced_files removes it after
+FILES_PURGE_GRACE seconds, so a row saved a moment later can still claim it.
+
+queryset.update() and bulk_create() send no signals; run
+`manage.py dedupe_media` after such writes to recount.
+"""
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FileField
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import StoredFile
+from .storage import HASH_DIR, ContentAddressedStorage, content_storage
+
+
+def tracked_fields():
+    """{model: [file field, ...]} for every field stored content-addressed."""
+    fields = defaultdict(list)
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage):
+                fields[model].append(field)
+    return dict(fields)
+
+
+def acquire(name, storage):
+    if StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1, released_at=None):
+        return
+    try:
+        with transaction.atomic():
+            StoredFile.objects.create(name=name, size=storage.size(name) if storage.exists(name) else 0, refcount=1)
+    except IntegrityError:
+        StoredFile.objects.filter(name=name).update(refcount=F('refcount') + 1, released_at=None)
+
+
+def release(name):
+    from .tasks import schedule_purge
+
+    StoredFile.objects.filter(name=name, refcount__gt=0).update(refcount=F('refcount') - 1)
+    if StoredFile.objects.filter(name=name, refcount=0, released_at=None).update(released_at=timezone.now()):
+        schedule_purge()
+
+
+def _names(instance, fields):
+    return {field.attname: getattr(instance, field.attname).name or '' for field in fields}
+
+
+def connect():
+    """Attach the counting receivers to every tracked model (called from FilesConfig.ready)."""
+    for model, fields in tracked_fields().items():
+        by_attname = {field.attname: field for field in fields}
+
+        def remember_names(sender, instance, update_fields=None, _fields=fields, **kwargs):
+            instance._stored_file_names = {}
+            if instance._state.adding or instance.pk is None:
+                return
+            if update_fields is not None and not {f.attname for f in _fields} & set(update_fields):
+                return
+            before = sender._base_manager.filter(pk=instance.pk).values(*(f.attname for f in _fields)).first()
+            instance._stored_file_names = before or {}
+
+        def count_names(sender, instance, update_fields=None, _fields=fields, _by_attname=by_attname, **kwargs):
+            if update_fields is not None and not {f.attname for f in _fields} & set(update_fields):
+                return
+            before = getattr(instance, '_stored_file_names', {})
+            for attname, name in _names(instance, _fields).items():
+                field, old = _by_attname[attname], before.get(attname) or ''
+                if name == old:
+                    continue
+                if field.storage.is_hashed(name):
+                    acquire(name, field.storage)
+                if field.storage.is_hashed(old):
+                    release(old)
+            instance._stored_file_names = {}
+
+        def release_names(sender, instance, _fields=fields, _by_attname=by_attname, **kwargs):
+            for attname, name in _names(instance, _fields).items():
+                if _by_attname[attname].storage.is_hashed(name):
+                    release(name)
+
+        uid = f'files.refs:{model._meta.label}'
+        pre_save.connect(remember_names, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(count_names, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(release_names, sender=model, weak=False, dispatch_uid=uid)
+
+
+def _stored_names(storage):
+    """Every file under the hash directory, whether referenced or not."""
+    if not storage.exists(HASH_DIR):
+        return
+    for shard in storage.listdir(HASH_DIR)[0]:
+        for name in storage.listdir(f'{HASH_DIR}/{shard}')[1]:
+            yield f'{HASH_DIR}/{shard}/{name}'
+
+
+def recount():
+    """Rebuild StoredFile from the tables and the disk; returns (files, references)."""
+    from .tasks import schedule_purge
+
+    counts = Counter()
+    for model, fields in tracked_fields().items():
+        for field in fields:
+            rows = (
+                model._base_manager.filter(**{f'{field.attname}__startswith': f'{HASH_DIR}/'})
+                .values(field.attname).annotate(n=Count('pk')).order_by()
+            )
+            for row in rows:
+                counts[row[field.attname]] += row['n']
+
+    storage = content_storage()
+    now = timezone.now()
+    existing = {stored.name: stored for stored in StoredFile.objects.all()}
+    changed, created = [], []
+    for name in set(counts) | set(existing) | set(_stored_names(storage)):
+        refcount = counts.get(name, 0)
+        stored = existing.get(name)
+        if stored is None:
+            size = storage.size(name) if storage.exists(name) else 0
+            created.append(StoredFile(name=name, size=size, refcount=refcount, released_at=None if refcount else now))
+        elif stored.refcount != refcount or (refcount == 0) != (stored.released_at is not None):
+            stored.refcount = refcount
+            stored.released_at = None if refcount else (stored.released_at or now)
+            changed.append(stored)
+    with transaction.atomic():
+        StoredFile.objects.bulk_create(created, batch_size=500)
+        StoredFile.objects.bulk_update(changed, ['refcount', 'released_at'], batch_size=500)
+        if StoredFile.objects.filter(refcount=0).exists():
+            schedule_purge()
+    return len(existing) + len(created), sum(counts.values())
@@ -0,0 +1,76 @@
+"""
+Content-addressed media storage.
+
+Uploads are stored under the SHA-256 of their bytes rather than their
+upload name:
+
+    sha256/3f/3f9c…e1.jpg
+
+so the same file uploaded twice, through any model field, is kept once and
+a re-upload costs no disk. A name never changes content, which makes these
+URLs safe to cache forever. Which rows point at a file is counted in
+files.StoredFile (see files.refs); files nobody references any more are
+deleted by a background job.
+
+Model fields opt in with `storage=content_storage`; the backend is the
+'media' entry of settings.STORAGES and shares MEDIA_ROOT/MEDIA_URL with the
+default storage.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+
+from backapi.imaging import DERIVATIVES_DIR
+
+HASH_DIR = 'sha256'
+_EXTENSION = re.compile(r'\.[a-z0-9]{1,10}')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Derivatives are named after their (already hashed) source and written verbatim
+    verbatim_prefixes = (f'{DERIVATIVES_DIR}/',)
+
+    def is_hashed(self, name):
+        return bool(name) and name.startswith(f'{HASH_DIR}/')
+
+    def digest(self, name):
+        """The SHA-256 hex digest of a hashed name's content."""
+        return os.path.splitext(os.path.basename(name))[0]
+
+    def hashed_name(self, content, name):
+        """The storage name for `content`: its digest plus the upload's (lowercased) extension."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        extension = os.path.splitext(name or '')[1].lower()
+        if not _EXTENSION.fullmatch(extension):
+            extension = ''
+        hexdigest = digest.hexdigest()
+        return f'{HASH_DIR}/{hexdigest[:2]}/{hexdigest}{extension}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if name.startswith(self.verbatim_prefixes):
+            return super().save(name, content, max_length=max_length)
+
+        target = self.hashed_name(content, name)
+        if self.exists(target):
+            # Already stored; refresh its mtime so a pending purge leaves it alone
+            os.utime(self.path(target))
+            return target
+        written = self._save(target, content)
+        if written != target:
+            # A concurrent upload of the same bytes got there first; keep theirs
+            self.delete(written)
+        return target
+
+
+def content_storage():
+    """Storage callable for FileField/ImageField(storage=...)."""
+    return storages['media']
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from backapi.imaging import VARIANT_FORMATS, VARIANT_SIZES, variant_name
+from jobs.queue import task
+from .models import StoredFile
+from .storage import content_storage
+
+DEFAULT_PURGE_GRACE = 3600
+
+
+def purge_grace():
+    return timedelta(seconds=getattr(settings, 'FILES_PURGE_GRACE', DEFAULT_PURGE_GRACE))
+
+
+def schedule_purge(delay=None):
+    """Queue one purge run for when the oldest released file has been unused for the grace period."""
+    delay = purge_grace() if delay is None else delay
+    purge_unreferenced_files.enqueue(
+        job_options={'delay': max(delay.total_seconds(), 0), 'unique_key': 'files:purge_unreferenced'}
+    )
+
+
+def delete_stored(name, storage):
+    """Delete a stored file and its image variants."""
+    storage.delete(name)
+    for variant in VARIANT_SIZES:
+        for ext in VARIANT_FORMATS:
+            storage.delete(variant_name(name, variant, ext))
+
+
+@task(priority=-5)
+def purge_unreferenced_files():
+    """Delete files that have had no references for longer than FILES_PURGE_GRACE; returns how many."""
+    storage = content_storage()
+    cutoff = timezone.now() - purge_grace()
+    purged = 0
+    for stored in StoredFile.objects.filter(refcount=0, released_at__lt=cutoff).iterator():
+        with transaction.atomic():
+            if not StoredFile.objects.filter(pk=stored.pk, refcount=0).delete()[0]:
+                continue   # referenced again meanwhile
+            # A re-upload of the same bytes touches the file; leave it for the row that follows
+            if storage.exists(stored.name) and storage.get_modified_time(stored.name) >= cutoff:
+                StoredFile.objects.create(name=stored.name, size=stored.size, released_at=timezone.now())
+                continue
+            transaction.on_commit(lambda name=stored.name: delete_stored(name, storage))
+            purged += 1
+
+    pending = StoredFile.objects.filter(refcount=0, released_at__isnull=False).order_by('released_at').first()
+    if pending is not None:
+        schedule_purge(pending.released_at + purge_grace() - timezone.now())
+    return purged
@@ -0,0 +1,265 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from backapi.media import aserve_media
+from families.models import Family, FamilyMedia, FamilyMember
+from files.models import StoredFile
+from files.storage import content_storage
+from files.tasks import purge_unreferenced_files
+from jobs.models import Job
+from news.models import Media, Post
+from profiles.models import Gallery
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Uploads are stored once per distinct content and reference-counted across fields."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.storage = content_storage()
+
+    def upload(self, name='photo.JPG', data=b'same bytes'):
+        return SimpleUploadedFile(name, data)
+
+    def stored(self, name):
+        return StoredFile.objects.get(name=name)
+
+    def files_on_disk(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, f), self.media_root)
+            for root, _, files in os.walk(self.media_root) for f in files
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first = Gallery.objects.create(image=self.upload('a.JPG'))
+        second = Gallery.objects.create(image=self.upload('b.jpg'))
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="F1")
+        media = FamilyMedia.objects.create(family=family, image=self.upload('c.jpg'), category='family')
+
+        name = first.image.name
+        self.assertRegex(name, r'^sha256/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual({second.image.name, media.image.name}, {name})
+        self.assertEqual(self.files_on_disk(), [name])
+        self.assertEqual((self.stored(name).refcount, self.stored(name).size), (3, len(b'same bytes')))
+        self.assertEqual(first.image.url, f"/media/{name}")
+
+        other = Gallery.objects.create(image=self.upload('a.jpg', b'other bytes'))
+        self.assertNotEqual(other.image.name, name)
+
+    def test_replace_and_delete_release_references(self):
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="F1")
+        member = FamilyMember.objects.create(family=family, name="A", photo=self.upload('old.png', b'old'))
+        old = member.photo.name
+        Gallery.objects.create(image=self.upload('g.png', b'new'))
+
+        member.photo = self.upload('new.png', b'new')
+        member.save()
+        new = member.photo.name
+        self.assertEqual((self.stored(old).refcount, self.stored(new).refcount), (0, 2))
+        self.assertIsNotNone(self.stored(old).released_at)
+        self.assertTrue(Job.objects.filter(task='files.tasks.purge_unreferenced_files').exists())
+
+        # Saves that do not touch the photo leave the counts alone
+        member.name = "B"
+        member.save(update_fields=['name'])
+        member.save()
+        self.assertEqual(self.stored(new).refcount, 2)
+
+        member.delete()
+        self.assertEqual(self.stored(new).refcount, 1)
+
+    def test_purge_after_grace(self):
+        gallery = Gallery.objects.create(image=self.upload('p.jpg', b'purge me'))
+        name = gallery.image.name
+        self.storage.save(f"derivatives/{name[:-4]}/thumb.webp", ContentFile(b'variant'))
+        gallery.delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(purge_unreferenced_files(), 0)   # still within the grace period
+        self.assertTrue(self.storage.exists(name))
+
+        past = timezone.now() - timedelta(hours=2)
+        StoredFile.objects.filter(name=name).update(released_at=past)
+        os.utime(self.storage.path(name), (past.timestamp(), past.timestamp()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(purge_unreferenced_files(), 1)
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertEqual(self.files_on_disk(), [])
+
+    def test_reupload_during_grace_keeps_file(self):
+        first = Gallery.objects.create(image=self.upload('r.jpg', b'again'))
+        name = first.image.name
+        first.delete()
+        StoredFile.objects.filter(name=name).update(released_at=timezone.now() - timedelta(hours=2))
+        # Re-uploading the same bytes refreshes the file before the row that claims it is saved
+        self.assertEqual(self.storage.save('again.jpg', ContentFile(b'again')), name)
+        purge_unreferenced_files()
+        self.assertTrue(self.storage.exists(name))
+        Gallery.objects.create(image=name)
+        self.assertEqual(self.stored(name).refcount, 1)
+
+    def test_dedupe_command_moves_legacy_duplicates(self):
+        names = [default_storage.save(f'media_gallery/event_0_{i}.png', ContentFile(b'dup')) for i in range(3)]
+        unique = default_storage.save('gallery/lone.jpg', ContentFile(b'lone'))
+        default_storage.save(f'derivatives/{names[0][:-4]}/thumb.webp', ContentFile(b'old variant'))
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="F1")
+        member = FamilyMember.objects.create(family=family, name="A")
+        post = Post.objects.create(creator=member, post_type='news', title="t")
+        Media.objects.bulk_create([Media(uploader=member, post=post, media_url=name) for name in names])
+        Gallery.objects.bulk_create([Gallery(image=unique)])
+
+        out = StringIO()
+        call_command('dedupe_media', '--dry-run', stdout=out)
+        self.assertIn("Would move 4 files into 2 content-addressed files, freeing 6 bytes.", out.getvalue())
+        self.assertTrue(default_storage.exists(names[0]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_media', stdout=out)
+        self.assertIn("Counted 4 references to 2 stored files.", out.getvalue())
+        hashed = set(Media.objects.values_list('media_url', flat=True))
+        self.assertEqual(len(hashed), 1)
+        self.assertEqual(self.stored(hashed.pop()).refcount, 3)
+        self.assertTrue(all(name.startswith('sha256/') for name in self.files_on_disk()))
+        self.assertEqual(Job.objects.filter(task='backapi.imaging.ensure_variants').count(), 2)
+
+
+class MediaServingTests(TestCase):
+    """/media/ answers with validators, cache headers and byte ranges, or hands off to the proxy."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.data = bytes(range(256)) * 4
+        self.name = content_storage().save('clip.mp4', ContentFile(self.data))
+        self.url = f"/media/{self.name}"
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file_is_immutable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['ETag'], f'"{self.name[10:-4]}"')
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((again.status_code, again.content), (304, b''))
+        self.assertEqual(again['Cache-Control'], response['Cache-Control'])
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.data[10:20])
+        self.assertEqual((response['Content-Range'], response['Content-Length']), ('bytes 10-19/1024', '10'))
+
+        tail = self.client.get(self.url, HTTP_RANGE='bytes=-4')
+        self.assertEqual((tail['Content-Range'], self.body(tail)), ('bytes 1020-1023/1024', self.data[-4:]))
+        open_ended = self.client.get(self.url, HTTP_RANGE='bytes=1000-')
+        self.assertEqual(self.body(open_ended), self.data[1000:])
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual((unsatisfiable.status_code, unsatisfiable['Content-Range']), (416, 'bytes */1024'))
+        # A range of a different version than the client holds: send the whole file
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual((stale.status_code, len(self.body(stale))), (200, 1024))
+
+    def test_upload_named_files_revalidate(self):
+        name = default_storage.save('gallery/legacy.jpg', ContentFile(b'jpeg'))
+        response = self.client.get(f"/media/{name}")
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        modified = self.client.get(f"/media/{name}", HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(modified.status_code, 304)
+
+    def test_active_content_is_never_rendered_inline(self):
+        for name, data in (('page.html', b'<script>alert(1)</script>'), ('logo.svg', b'<svg onload="alert(1)"/>')):
+            name = default_storage.save(f'news_images/{name}', ContentFile(data))
+            response = self.client.get(f"/media/{name}")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Content-Disposition'].startswith('attachment;'), name)
+            self.assertIn('sandbox', response['Content-Security-Policy'])
+            self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+
+        image = self.client.get(f"/media/{default_storage.save('gallery/photo.jpg', ContentFile(b'jpeg'))}")
+        self.assertTrue(image['Content-Disposition'].startswith('inline;'))
+        self.assertIn('sandbox', image['Content-Security-Policy'])
+
+    def test_missing_and_outside_paths(self):
+        self.assertEqual(self.client.get("/media/sha256/00/none.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/media/..%2F..%2Fetc%2Fpasswd").status_code, 404)
+        self.assertEqual(self.client.get("/media/sha256").status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    async def test_async_view_streams_the_same_bytes(self):
+        async def body(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        with mock.patch('backapi.media.STREAM_CHUNK_SIZE', 100):
+            full = await aserve_media(AsyncRequestFactory().get(self.url), self.name)
+            self.assertEqual(full.status_code, 200)
+            self.assertEqual(await body(full), self.data)
+            self.assertEqual(full['Content-Length'], str(len(self.data)))
+            self.assertEqual(full['Content-Type'], 'video/mp4')
+            self.assertEqual(full['Content-Disposition'], f'inline; filename="{os.path.basename(self.name)}"')
+            self.assertIn('sandbox', full['Content-Security-Policy'])
+
+            part = await aserve_media(AsyncRequestFactory().get(self.url, headers={'Range': 'bytes=90-309'}), self.name)
+            self.assertEqual(part.status_code, 206)
+            self.assertEqual(await body(part), self.data[90:310])
+            self.assertEqual((part['Content-Range'], part['Content-Length']), ('bytes 90-309/1024', '220'))
+
+        etag = full['ETag']
+        again = await aserve_media(AsyncRequestFactory().get(self.url, headers={'If-None-Match': etag}), self.name)
+        self.assertEqual(again.status_code, 304)
+
+    async def test_async_view_keeps_file_system_calls_off_the_event_loop(self):
+        import threading
+        loop_thread = threading.current_thread()
+        threads = []
+        real_stat, real_open = os.stat, open
+
+        def stat(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return real_stat(*args, **kwargs)
+
+        def opener(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return real_open(*args, **kwargs)
+
+        with mock.patch('backapi.media.os.stat', stat), mock.patch('backapi.media.open', opener, create=True):
+            response = await aserve_media(AsyncRequestFactory().get(self.url), self.name)
+            self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), self.data)
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    @override_settings(MEDIA_SENDFILE='x-accel', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual((response.status_code, response.content), (200, b''))
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected-media/{self.name}")
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.name))
@@ -0,0 +1,12 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    list_display = ('task', 'queue', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'queue')
+    search_fields = ('task', 'unique_key')
+    ordering = ('-created_at',)
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
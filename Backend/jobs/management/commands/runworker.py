@@ -0,0 +1,39 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue until stopped (SIGTERM/SIGINT finish the current jobs first)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues', help="Queue to serve (repeatable; default: all in JOB_QUEUES).")
+        parser.add_argument('--concurrency', type=int, help="Worker threads (default: the sum of the queues' limits).")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when no job is ready.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is ready (cron, deploy hooks).")
+
+    def handle(self, *args, **options):
+        try:
+            worker = Worker(
+                queues=options['queues'],
+                concurrency=options['concurrency'],
+                poll_interval=options['poll_interval'],
+                burst=options['burst'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the current jobs...")
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        self.stdout.write(
+            f"Worker {worker.id}: {worker.concurrency} threads on queues {', '.join(worker.queues)}"
+        )
+        worker.run()
+        self.stdout.write(self.style.SUCCESS("Worker stopped."))
@@ -0,0 +1,64 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    One unit of background work: a registered task name plus JSON arguments.
+
+    Rows are created inside the caller's transaction (see jobs.queue.enqueue),
+    so a job becomes visible to workers exactly when the data it refers to is
+    committed, and is dropped with it on rollback.
+
+    Lifecycle: queued → running → done, or back to queued with a later
+    `run_at` after a failure, until `max_attempts` is reached (failed).
+    """
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    # While queued, at most one job per key (coalesces repeated requests for the same work)
+    unique_key = models.CharField(max_length=200, null=True, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim query: next ready job of a queue by priority, then age
+            models.Index(fields=['queue', 'status', '-priority', 'run_at', 'id'], name='jobs_claim_idx'),
+            # Reaping stale running jobs and purging finished ones
+            models.Index(fields=['status', 'locked_at'], name='jobs_status_locked_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'], condition=models.Q(status='queued'), name='jobs_unique_queued_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} [{self.status}] #{self.pk}"
+
+
+class JobQueue(models.Model):
+    """
+    Lock row per queue. Workers lock it while claiming, which makes the
+    per-queue concurrency limit exact across processes and hosts.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+
+    def __str__(self):
+        return self.name
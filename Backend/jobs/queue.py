@@ -0,0 +1,120 @@
+"""
+Task registry and enqueueing.
+
+    from jobs.queue import task
+
+    @task(queue='media', max_attempts=5)
+    def ensure_variants(name): ...
+
+    ensure_variants.enqueue('gallery/a.jpg')            # run later, by a worker
+    ensure_variants('gallery/a.jpg')                    # still callable inline
+
+Arguments must be JSON-serializable; pass ids and names, not model
+instances. enqueue() writes the Job row in the caller's transaction, so
+workers only ever see jobs whose data has been committed.
+
+Queues and their concurrency limits come from settings.JOB_QUEUES, e.g.
+{'default': {'concurrency': 4}, 'media': {'concurrency': 2}}.
+"""
+import importlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+DEFAULT_QUEUES = {'default': {'concurrency': 4}}
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, queue='default', priority=0, max_attempts=3, timeout=600, retry_delay=30):
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.timeout = timeout            # seconds before a running job counts as abandoned
+        self.retry_delay = retry_delay    # seconds; doubled after every failed attempt
+        self.__doc__ = func.__doc__
+        self.__wrapped__ = func
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, **kwargs):
+        return enqueue(self, *args, **kwargs)
+
+    def backoff(self, attempts):
+        return timedelta(seconds=self.retry_delay * 2 ** max(attempts - 1, 0))
+
+
+def task(func=None, **options):
+    """Register a function as a task; usable as @task or @task(queue=..., ...)."""
+    def register(f):
+        spec = Task(f, **options)
+        _registry[spec.name] = spec
+        return spec
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    """The registered Task for `name`, importing its module on first use (fresh worker processes)."""
+    if name not in _registry:
+        module = name.rsplit('.', 1)[0]
+        while module and name not in _registry:
+            try:
+                importlib.import_module(module)
+                break
+            except ImportError:
+                module = module.rpartition('.')[0]
+    return _registry[name]
+
+
+def queue_settings():
+    return getattr(settings, 'JOB_QUEUES', DEFAULT_QUEUES)
+
+
+def enqueue(task_or_name, *args, job_options=None, **kwargs):
+    """
+    Queue a call to a registered task; returns the Job.
+
+    job_options may override queue, priority, max_attempts, run_at (datetime)
+    or delay (seconds), and set unique_key: while a job with that key is
+    still queued, enqueueing another one returns the existing job instead.
+    """
+    spec = task_or_name if isinstance(task_or_name, Task) else get_task(task_or_name)
+    options = dict(job_options or {})
+    run_at = options.pop('run_at', None) or timezone.now() + timedelta(seconds=options.pop('delay', 0))
+    job = Job(
+        task=spec.name,
+        args=list(args),
+        kwargs=kwargs,
+        queue=options.pop('queue', spec.queue),
+        priority=options.pop('priority', spec.priority),
+        max_attempts=options.pop('max_attempts', spec.max_attempts),
+        unique_key=options.pop('unique_key', None),
+        run_at=run_at,
+    )
+    if options:
+        raise TypeError(f"Unknown job options: {', '.join(options)}")
+    if job.queue not in queue_settings():
+        raise ValueError(f"Unknown job queue '{job.queue}'")
+
+    if job.unique_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = Job.objects.filter(unique_key=job.unique_key, status=Job.QUEUED).first()
+        if existing is not None:
+            return existing
+        # Claimed by a worker in the meantime: this request needs a run of its own
+        job.save()
+        return job
@@ -0,0 +1,182 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import enqueue, task
+from jobs.worker import Worker, claim_job, reap_jobs, run_job, run_pending
+
+QUEUES = {'default': {'concurrency': 2}, 'media': {'concurrency': 1}}
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=60)
+def explode():
+    raise RuntimeError("boom")
+
+
+@task(queue='media', timeout=30)
+def slow_media(value):
+    calls.append(value)
+
+
+@override_settings(JOB_QUEUES=QUEUES)
+class JobQueueTests(TestCase):
+    """Enqueueing, ordering, retries and limits of the database job queue."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        job = record.enqueue('a')
+        self.assertEqual((job.task, job.args, job.queue, job.status), ('jobs.tests.record', ['a'], 'default', 'queued'))
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(calls, ['a'])
+
+    def test_priority_then_age(self):
+        record.enqueue('low')
+        record.enqueue('high', job_options={'priority': 10})
+        record.enqueue('later', job_options={'delay': 3600})
+        record.enqueue('low2')
+        run_pending()
+        self.assertEqual(calls, ['high', 'low', 'low2'])
+        self.assertEqual(Job.objects.filter(status='queued').count(), 1)
+
+    def test_retry_with_backoff_then_fail(self):
+        job = explode.enqueue()
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_unique_key_coalesces_queued_jobs(self):
+        first = record.enqueue('x', job_options={'unique_key': 'k'})
+        second = record.enqueue('y', job_options={'unique_key': 'k'})
+        self.assertEqual(first.pk, second.pk)
+        run_pending()
+        third = record.enqueue('z', job_options={'unique_key': 'k'})
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_concurrency_limit_per_queue(self):
+        for i in range(3):
+            slow_media.enqueue(i)
+        self.assertIsNotNone(claim_job('media', 'w1'))
+        # media allows one running job, whichever worker asks
+        self.assertIsNone(claim_job('media', 'w2'))
+
+    def test_abandoned_jobs_are_requeued(self):
+        job = slow_media.enqueue('v')
+        claim_job('media', 'dead-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=31))
+        self.assertEqual(reap_jobs()[:2], (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+
+    def test_failed_keyed_job_superseded_by_queued_duplicate(self):
+        job = explode.enqueue(job_options={'unique_key': 'k'})
+        claim_job('default', 'w')
+        newer = explode.enqueue(job_options={'unique_key': 'k'})
+        self.assertNotEqual(newer.pk, job.pk)
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            self.assertFalse(run_job(Job.objects.get(pk=job.pk)))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertIn("Superseded", job.last_error)
+        self.assertEqual(Job.objects.get(status='queued').pk, newer.pk)
+
+    def test_abandoned_keyed_job_superseded_by_queued_duplicate(self):
+        job = slow_media.enqueue('v', job_options={'unique_key': 'k'})
+        claim_job('media', 'dead-worker')
+        newer = slow_media.enqueue('v', job_options={'unique_key': 'k'})
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=31))
+        self.assertEqual(reap_jobs()[:2], (0, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(Job.objects.get(status='queued').pk, newer.pk)
+
+    def test_abandoned_keyed_job_requeued_without_duplicate(self):
+        job = slow_media.enqueue('v', job_options={'unique_key': 'k'})
+        claim_job('media', 'dead-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=31))
+        self.assertEqual(reap_jobs()[:2], (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+    def test_old_finished_jobs_purged(self):
+        job = record.enqueue('old')
+        run_pending()
+        Job.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(reap_jobs()[2], 1)
+
+    def test_unknown_task_fails_without_retry(self):
+        job = Job.objects.create(task='jobs.tests.missing')
+        claimed = claim_job('default', 'w')
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    def test_enqueue_rolls_back_with_transaction(self):
+        from django.db import transaction
+        try:
+            with transaction.atomic():
+                record.enqueue('never')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_queue_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue(record, 'x', job_options={'queue': 'nope'})
+
+
+@override_settings(JOB_QUEUES=QUEUES)
+class WorkerThreadTests(TransactionTestCase):
+    """The threaded worker drains every queue in burst mode."""
+    # One thread: the in-memory test database's shared-cache locks do not
+    # wait for each other the way file SQLite and Postgres locks do.
+
+    def test_burst_worker(self):
+        calls.clear()
+        for i in range(6):
+            record.enqueue(i)
+        slow_media.enqueue('m')
+        Worker(burst=True, concurrency=1, poll_interval=0.01).run()
+        self.assertEqual(sorted(calls, key=str), sorted([*range(6), 'm'], key=str))
+        self.assertEqual(Job.objects.filter(status='done').count(), 7)
+
+    def test_database_error_recording_outcome_keeps_thread_alive(self):
+        first, second = record.enqueue(1), record.enqueue(2)
+        real_run_job = run_job
+
+        def flaky(job):
+            if job.pk == first.pk:
+                raise DatabaseError("connection lost")
+            return real_run_job(job)
+
+        with mock.patch('jobs.worker.run_job', side_effect=flaky), self.assertLogs('jobs.worker', 'ERROR'):
+            Worker(burst=True, concurrency=1, poll_interval=0.01).run()
+        # The same thread went on to the next job; the first waits for the reaper
+        self.assertEqual(Job.objects.get(pk=second.pk).status, 'done')
+        self.assertEqual(Job.objects.get(pk=first.pk).status, 'running')
@@ -0,0 +1,223 @@
+"""
+Job worker.
+
+A Worker runs `concurrency` threads, each looping: claim the next ready job
+from its queues, run it, record the outcome. Claiming locks the queue's
+JobQueue row, counts that queue's running jobs against its limit from
+settings.JOB_QUEUES, and marks the chosen job running, all in one short
+transaction, so limits hold across any number of worker processes.
+
+Failures are retried with exponential backoff until the task's
+max_attempts; jobs left running by a worker that died are put back once
+their task's timeout has passed. A job with a unique_key is not put back
+while a newer job with that key is queued (at most one may be): it is
+marked done as superseded, the queued one doing the work. Finished jobs
+are purged after JOB_RETENTION_DAYS.
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobQueue
+from .queue import get_task, queue_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_TIMEOUT = 600
+ERROR_LIMIT = 10000
+SUPERSEDED = "Superseded by a queued job with the same unique_key."
+
+
+def claim_job(queue, worker_id):
+    """Mark the next ready job of `queue` running and return it, or None (idle or at its limit)."""
+    limit = queue_settings()[queue].get('concurrency', 1)
+    with transaction.atomic():
+        # A no-op UPDATE as the first statement takes the queue's write lock on
+        # every backend: a row lock on Postgres, the database lock on SQLite
+        # (where a read-then-write transaction could deadlock instead).
+        if not JobQueue.objects.filter(name=queue).update(name=queue):
+            JobQueue.objects.get_or_create(name=queue)
+            JobQueue.objects.filter(name=queue).update(name=queue)
+        if Job.objects.filter(queue=queue, status=Job.RUNNING).count() >= limit:
+            return None
+        job = (
+            Job.objects.filter(queue=queue, status=Job.QUEUED, run_at__lte=timezone.now())
+            .order_by('-priority', 'run_at', 'id').first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at'])
+    return job
+
+
+def requeue(jobs, unique_key, **fields):
+    """Put `jobs` back in the queue; False if a queued job with the same unique_key already covers them."""
+    if unique_key is not None and Job.objects.filter(unique_key=unique_key, status=Job.QUEUED).exists():
+        return False
+    try:
+        with transaction.atomic():
+            jobs.update(status=Job.QUEUED, locked_by='', locked_at=None, **fields)
+    except IntegrityError:
+        return False   # enqueued since the check
+    return True
+
+
+def supersede(jobs, error):
+    jobs.update(status=Job.DONE, finished_at=timezone.now(), last_error=f"{error}\n{SUPERSEDED}"[-ERROR_LIMIT:])
+
+
+def run_job(job):
+    """Run a claimed job and record done / retry / failed."""
+    try:
+        spec = get_task(job.task)
+        spec(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()[-ERROR_LIMIT:]
+        retry_in = None
+        if job.attempts < job.max_attempts:
+            try:
+                retry_in = get_task(job.task).backoff(job.attempts)
+            except KeyError:
+                retry_in = None   # unknown task: retrying cannot help
+        if retry_in is not None:
+            jobs = Job.objects.filter(pk=job.pk)
+            if requeue(jobs, job.unique_key, run_at=timezone.now() + retry_in, last_error=error):
+                logger.warning("Job %s failed (attempt %s/%s), retrying", job, job.attempts, job.max_attempts)
+            else:
+                logger.warning("Job %s failed, superseded by a queued job with the same key", job)
+                supersede(jobs, error)
+        else:
+            logger.error("Job %s failed permanently", job)
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error, finished_at=timezone.now())
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now(), last_error='')
+    return True
+
+
+def reap_jobs():
+    """Requeue jobs abandoned by dead workers and purge old finished jobs; returns (requeued, failed, purged)."""
+    now = timezone.now()
+    stale = []
+    for pk, name, locked_at in Job.objects.filter(status=Job.RUNNING).values_list('pk', 'task', 'locked_at'):
+        try:
+            timeout = get_task(name).timeout
+        except KeyError:
+            timeout = DEFAULT_TIMEOUT
+        if locked_at is None or locked_at < now - timedelta(seconds=timeout):
+            stale.append(pk)
+
+    message = "Abandoned by its worker (timeout)."
+    stale_jobs = Job.objects.filter(pk__in=stale, status=Job.RUNNING)
+    # The lost attempt was counted when it was claimed
+    retryable = stale_jobs.filter(attempts__lt=F('max_attempts'))
+    requeued = retryable.filter(unique_key__isnull=True).update(
+        status=Job.QUEUED, locked_by='', locked_at=None, last_error=message,
+    )
+    # Keyed jobs one at a time: each may already be covered by a queued job with its key
+    for pk, unique_key in retryable.exclude(unique_key__isnull=True).values_list('pk', 'unique_key'):
+        jobs = stale_jobs.filter(pk=pk)
+        if requeue(jobs, unique_key, last_error=message):
+            requeued += 1
+        else:
+            supersede(jobs, message)
+    failed = stale_jobs.update(status=Job.FAILED, finished_at=now, last_error=message)
+
+    retention = getattr(settings, 'JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    purged, _ = Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED), finished_at__lt=now - timedelta(days=retention)
+    ).delete()
+    return requeued, failed, purged
+
+
+def run_pending(queues=None, worker_id='inline'):
+    """Run ready jobs in this thread until none are left; returns how many ran (for tests and cron)."""
+    queues = list(queues or queue_settings())
+    ran = 0
+    while True:
+        job = next((j for j in (claim_job(q, worker_id) for q in queues) if j), None)
+        if job is None:
+            return ran
+        run_job(job)
+        ran += 1
+
+
+class Worker:
+    def __init__(self, queues=None, concurrency=None, poll_interval=1.0, reap_interval=60.0, burst=False):
+        self.queues = list(queues or queue_settings())
+        unknown = set(self.queues) - set(queue_settings())
+        if unknown:
+            raise ValueError(f"Unknown job queues: {', '.join(sorted(unknown))}")
+        self.concurrency = concurrency or sum(queue_settings()[q].get('concurrency', 1) for q in self.queues)
+        self.poll_interval = poll_interval
+        self.reap_interval = reap_interval
+        self.burst = burst
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def stop(self):
+        self.stopping.set()
+
+    def _next_job(self, offset):
+        # Rotate the starting queue per thread so one busy queue cannot starve the others
+        for i in range(len(self.queues)):
+            job = claim_job(self.queues[(offset + i) % len(self.queues)], self.id)
+            if job is not None:
+                return job
+        return None
+
+    def _loop(self, index):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                try:
+                    job = self._next_job(index)
+                except DatabaseError:
+                    # Lock timeouts or a dropped connection: back off, keep the thread alive
+                    logger.exception("Could not claim a job")
+                    connection.close()
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                try:
+                    run_job(job)
+                except DatabaseError:
+                    # Outcome not recorded: the job stays running until reap_jobs() puts it back
+                    logger.exception("Could not record the outcome of job %s", job)
+                    connection.close()
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def run(self):
+        """Process jobs until stop() (or, in burst mode, until no job is ready)."""
+        reap_jobs()
+        threads = [
+            threading.Thread(target=self._loop, args=(i,), name=f"jobs-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(self.reap_interval / len(threads))
+            if not self.stopping.is_set() and not self.burst:
+                close_old_connections()
+                reap_jobs()
+        connection.close()
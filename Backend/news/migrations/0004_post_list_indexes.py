@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('families', '0025_populate_lineage'),
+        ('news', '0003_post_is_kudumbayogam'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_at', 'id', 'post_type', 'event_date'], name='news_post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['post_type', 'event_date', 'id'], name='news_post_events_idx'),
+        ),
+    ]
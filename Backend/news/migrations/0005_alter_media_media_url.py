@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:26
+
+import files.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_post_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='media',
+            name='media_url',
+            field=models.FileField(storage=files.storage.content_storage, upload_to='media_gallery/'),
+        ),
+    ]
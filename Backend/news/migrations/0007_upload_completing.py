@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='completing',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,5 +1,23 @@
+import uuid
+
 from django.db import models
 
+from files.storage import content_storage
+
+
+class PostQuerySet(models.QuerySet):
+    def with_serializer_data(self):
+        """
+        Join and prefetch everything PostSerializer reads, so a page of N posts
+        serializes in a constant number of queries: creator and their user
+        account in the main query, media (in pk order, which `image` relies
+        on) in one more.
+        """
+        return self.select_related('creator__user_account').prefetch_related(
+            models.Prefetch('media', queryset=Media.objects.order_by('pk')),
+        )
+
+
 class Post(models.Model):
     # 3. CONTENT & UPDATES (News/Events)
     POST_TYPES = (
@@ -19,11 +37,20 @@ class Post(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.post_type})"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # News feed: keyset scan in created_at order, with the post_type /
+            # event_date OR-filter answered from the index
+            models.Index(fields=['created_at', 'id', 'post_type', 'event_date'], name='news_post_feed_idx'),
+            # Upcoming events: post_type equality, then event_date range and order
+            models.Index(fields=['post_type', 'event_date', 'id'], name='news_post_events_idx'),
+        ]
 
 
 class Media(models.Model):
@@ -36,7 +63,7 @@ class Media(models.Model):
     uploader = models.ForeignKey('families.FamilyMember', on_delete=models.CASCADE, related_name='uploaded_media')
     post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='media') # Linked if part of a news/event
     
-    media_url = models.FileField(upload_to='media_gallery/') # using FileField to support videos too
+    media_url = models.FileField(upload_to='media_gallery/', storage=content_storage) # using FileField to support videos too
     caption = models.CharField(max_length=255, blank=True, null=True)
     
     media_type = models.CharField(max_length=20, choices=MEDIA_TYPES, default='image')
@@ -46,3 +73,29 @@ class Media(models.Model):
 
     def __str__(self):
         return f"Media {self.id} ({self.media_type})"
+
+
+class Upload(models.Model):
+    """
+    A chunked upload in progress (see news/uploads.py). Bytes land in a
+    partial file under MEDIA_ROOT as each chunk arrives; `received` is how
+    many are safely on disk, so a client can resume from there. Completing
+    the upload turns it into a Media row and deletes this one; `completing`
+    is set while that runs, so a retried request cannot run it twice.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey('families.FamilyMember', on_delete=models.CASCADE, related_name='uploads')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='uploads')
+
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    caption = models.CharField(max_length=255, blank=True, null=True)
+    is_personal_gallery = models.BooleanField(default=False)
+    completing = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size})"
@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PostCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the news feed: each page is a range scan from the
+    cursor position on the (created_at, id) index, so fetching page 500 costs
+    the same as page 1. Posts sharing a created_at are split by the cursor's
+    offset; `id` keeps their order stable.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EventCursorPagination(PostCursorPagination):
+    """Upcoming events, soonest first, on the (post_type, event_date, id) index."""
+    ordering = ('event_date', 'id')
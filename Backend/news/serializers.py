@@ -1,7 +1,20 @@
+from collections import defaultdict
+
 from rest_framework import serializers
-from .models import Post, Media
+from backapi.fastserializers import RowSerializer, FileURL, Nested, datetime_value
+from backapi.imaging import variant_urls
+from .models import Post, Media, Upload
+from .uploads import CHUNK_SIZE, max_upload_size, media_type_for
 
 class MediaSerializer(serializers.ModelSerializer):
+    media_url_variants = serializers.SerializerMethodField()
+
+    def get_media_url_variants(self, obj):
+        # Videos have no image variants
+        if obj.media_type == 'image':
+            return variant_urls(obj.media_url.name)
+        return None
+
     class Meta:
         model = Media
         fields = '__all__'
@@ -12,6 +25,7 @@ class PostSerializer(serializers.ModelSerializer):
     creator_name = serializers.SerializerMethodField()
     author_id = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     def get_creator_name(self, obj):
         if obj.creator:
@@ -24,12 +38,20 @@ class PostSerializer(serializers.ModelSerializer):
         return None
     
     def get_image(self, obj):
-        # Return first image from media if exists
-        first_media = obj.media.filter(media_type='image').first()
+        # Return first image from media if exists; picked from `media` (prefetched
+        # in pk order by Post.objects.with_serializer_data()) rather than queried
+        first_media = self._first_image(obj)
         if first_media and first_media.media_url:
             return first_media.media_url.url
         return None
 
+    def get_image_variants(self, obj):
+        first_media = self._first_image(obj)
+        return variant_urls(first_media.media_url.name) if first_media else None
+
+    def _first_image(self, obj):
+        return next((m for m in sorted(obj.media.all(), key=lambda m: m.pk) if m.media_type == 'image'), None)
+
     class Meta:
         model = Post
         fields = (
@@ -44,5 +66,101 @@ class PostSerializer(serializers.ModelSerializer):
             'author_id',
             'media',
             'image',
+            'image_variants',
             'is_kudumbayogam'
         )
+
+
+# -- Read path for list endpoints (see backapi/fastserializers.py) -------------
+
+_media_storage = Media._meta.get_field('media_url').storage
+
+
+def _first_image(media_rows):
+    # PostSerializer.get_image: the first image, by pk
+    return next((media for media in media_rows if media['media_type'] == 'image'), None)
+
+
+def _first_image_url(media_rows):
+    media = _first_image(media_rows)
+    return _media_storage.url(media['media_url']) if media and media['media_url'] else None
+
+
+def _first_image_variants(media_rows):
+    media = _first_image(media_rows)
+    return variant_urls(media['media_url'], _media_storage) if media else None
+
+
+def _media_variants(row):
+    return variant_urls(row['media_url'], _media_storage) if row['media_type'] == 'image' else None
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    def get_chunk_size(self, obj):
+        return CHUNK_SIZE
+
+    def validate_filename(self, value):
+        value = value.replace('\\', '/').rsplit('/', 1)[-1]
+        if not media_type_for(value):
+            raise serializers.ValidationError("Only image and video files can be uploaded.")
+        return value
+
+    def validate_size(self, value):
+        if not 0 < value <= max_upload_size():
+            raise serializers.ValidationError(f"Size must be between 1 and {max_upload_size()} bytes.")
+        return value
+
+    class Meta:
+        model = Upload
+        fields = ['id', 'filename', 'size', 'offset', 'chunk_size', 'post', 'caption', 'is_personal_gallery', 'created_at']
+
+
+class MediaRowSerializer(RowSerializer):
+    """Rows rendered exactly like MediaSerializer."""
+    fields = (
+        # fields = '__all__' lists the pk, declared fields, plain fields, then relations
+        ('id', 'id', None),
+        ('media_url_variants', None, _media_variants),
+        ('media_url', 'media_url', FileURL(Media, 'media_url')),
+        ('caption', 'caption', None),
+        ('media_type', 'media_type', None),
+        ('is_personal_gallery', 'is_personal_gallery', None),
+        ('uploaded_at', 'uploaded_at', datetime_value),
+        ('uploader', 'uploader_id', None),
+        ('post', 'post_id', None),
+    )
+
+
+class PostRowSerializer(RowSerializer):
+    """Rows rendered exactly like PostSerializer; media for all posts in one query."""
+    fields = (
+        ('id', 'id', None),
+        ('title', 'title', None),
+        ('description', 'description', None),
+        ('post_type', 'post_type', None),
+        ('event_date', 'event_date', datetime_value),
+        ('location', 'location', None),
+        ('created_at', 'created_at', datetime_value),
+        ('creator_name', 'creator__name', None),
+        ('author_id', 'creator__user_account__id', None),
+        ('media', 'media', Nested(MediaRowSerializer)),
+        ('image', 'media', _first_image_url),
+        ('image_variants', 'media', _first_image_variants),
+        ('is_kudumbayogam', 'is_kudumbayogam', None),
+    )
+    attached = ('media',)
+
+    def attach(self, rows):
+        media = defaultdict(list)
+        if rows:
+            post_ids = [row['id'] for row in rows]
+            for media_row in (
+                Media.objects.filter(post_id__in=post_ids).order_by('pk')
+                .values(*MediaRowSerializer.columns())
+            ):
+                media[media_row['post_id']].append(media_row)
+        for row in rows:
+            row['media'] = media.get(row['id'], [])
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from backapi.cache import invalidate
+from backapi.imaging import schedule_variants
+from families.models import FamilyMember
+from .models import Post, Media
+
+# User saves that change nothing a post shows
+IRRELEVANT_USER_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=Media)
+def generate_media_variants(sender, instance, raw=False, **kwargs):
+    # Media also holds videos; only images get variants
+    if not raw and instance.media_type == 'image':
+        schedule_variants(instance.media_url)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Media)
+@receiver(post_delete, sender=Media)
+@receiver(post_save, sender=FamilyMember)
+@receiver(post_delete, sender=FamilyMember)
+def invalidate_news_on_write(sender, **kwargs):
+    # Posts show their media and the creator's name
+    invalidate('news')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_news_on_user_change(sender, update_fields=None, **kwargs):
+    """Posts show the creator's user id; skip login/password-only saves."""
+    if update_fields and set(update_fields) <= IRRELEVANT_USER_FIELDS:
+        return
+    invalidate('news')
@@ -0,0 +1,30 @@
+"""Background tasks for the news app (run by `manage.py runworker`)."""
+from django.utils import timezone
+
+from jobs.queue import task
+
+from .models import Upload
+
+
+def schedule_upload_sweep(delay=None):
+    from .uploads import UPLOAD_EXPIRY
+
+    delay = UPLOAD_EXPIRY if delay is None else delay
+    purge_stale_uploads.enqueue(
+        job_options={'delay': max(delay.total_seconds(), 0), 'unique_key': 'news:purge_stale_uploads'}
+    )
+
+
+@task(priority=-5)
+def purge_stale_uploads():
+    """Delete chunked uploads idle for longer than UPLOAD_EXPIRY; returns how many."""
+    from .uploads import UPLOAD_EXPIRY, discard
+
+    now = timezone.now()
+    stale = list(Upload.objects.filter(updated_at__lt=now - UPLOAD_EXPIRY))
+    for upload in stale:
+        discard(upload)
+    oldest = Upload.objects.order_by('updated_at').values_list('updated_at', flat=True).first()
+    if oldest is not None:
+        schedule_upload_sweep(oldest + UPLOAD_EXPIRY - now)
+    return len(stale)
@@ -1,10 +1,19 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from families.models import Family, FamilyMember
-from news.models import Post
+from news.models import Media, Post
+from news.views import EventsListView, NewsListView
 from news.serializers import PostSerializer
 from rest_framework.test import APIClient
+from backapi.asyncviews import as_async_view
+from backapi.cache import reset_stats, stats
 import datetime
+import io
+import json
 
 User = get_user_model()
 
@@ -58,3 +67,468 @@ class NewsTests(TestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, 400)
         self.assertIn("linked to a Family Member", response.data['error'])
+
+
+class PostSerializerQueryCountTests(TestCase):
+    """PostSerializer reads joined creator/account and prefetched media, not per-post queries."""
+
+    def setUp(self):
+        from news.models import Media
+        self.client = APIClient()
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="M150")
+        for i in range(50):
+            creator = FamilyMember.objects.create(family=family, name=f"Creator {i}", relation="Head")
+            if i % 2:
+                user = User.objects.create(username=f"c{i}", email=f"c{i}@e.com", member=creator)
+            post = Post.objects.create(creator=creator, post_type='news', title=f"Post {i}")
+            Media.objects.create(uploader=creator, post=post, media_url=f'media_gallery/{i}.mp4', media_type='video')
+            if i % 3:
+                Media.objects.create(uploader=creator, post=post, media_url=f'media_gallery/{i}.jpg')
+        self.client.force_authenticate(user=user)
+
+    def test_constant_queries(self):
+        posts = Post.objects.with_serializer_data()
+        with self.assertNumQueries(2):
+            data = PostSerializer(posts, many=True).data
+        self.assertEqual(len(data), 50)
+
+    def test_output_matches_plain_instances(self):
+        plain = PostSerializer(Post.objects.order_by('pk'), many=True).data
+        joined = PostSerializer(Post.objects.with_serializer_data().order_by('pk'), many=True).data
+        self.assertEqual(joined, plain)
+        self.assertEqual(joined[1]['image'], '/media/media_gallery/1.jpg')
+        self.assertIsNone(joined[0]['image'])
+        self.assertEqual([p['author_id'] is None for p in joined[:2]], [True, False])
+
+    def test_create_view_listing(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/news/create/')
+        self.assertEqual(len(response.data), 50)
+
+
+class PostListRowSerializerTests(TestCase):
+    """News/events lists render through PostRowSerializer with PostSerializer's exact JSON."""
+
+    def setUp(self):
+        from news.models import Media
+        from django.utils import timezone
+        self.client = APIClient()
+        self.family = Family.objects.create(sl_no="1", branch="Main", member_no="M200")
+        self.author = FamilyMember.objects.create(family=self.family, name="Author", relation="Head")
+        User.objects.create_user(username="author", email="a@e.com", password="pass", member=self.author)
+        self.orphan = FamilyMember.objects.create(family=self.family, name="No Account", relation="Son")
+
+        now = timezone.now()
+        news = Post.objects.create(creator=self.author, post_type='news', title='With media', description='D')
+        Media.objects.create(uploader=self.author, post=news, media_url='media_gallery/v.mp4', media_type='video')
+        Media.objects.create(uploader=self.author, post=news, media_url='media_gallery/a.jpg', caption='A')
+        Media.objects.create(uploader=self.author, post=news, media_url='media_gallery/b.jpg')
+        Post.objects.create(creator=self.orphan, post_type='news', title='Plain', description=None)
+        Post.objects.create(creator=self.author, post_type='event', title='Past', event_date=now - datetime.timedelta(days=3))
+        Post.objects.create(
+            creator=self.orphan, post_type='event', title='Upcoming', location='Hall',
+            event_date=now + datetime.timedelta(days=3), is_kudumbayogam=True,
+        )
+
+    def assert_matches_drf(self, url, queryset):
+        from rest_framework.renderers import JSONRenderer
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        context = {'request': response.wsgi_request}
+        expected = JSONRenderer().render(PostSerializer(queryset, many=True, context=context).data)
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
+        return response.json()['results']
+
+    def test_news_list_identical(self):
+        from django.db.models import Q
+        from django.utils import timezone
+        queryset = Post.objects.filter(
+            Q(post_type='news') | Q(post_type='event', event_date__lt=timezone.now()) |
+            Q(post_type='event', event_date__isnull=True)
+        ).order_by('-created_at', '-id')
+        data = self.assert_matches_drf('/api/news/list/', queryset)
+        self.assertEqual([p['title'] for p in data], ['Past', 'Plain', 'With media'])
+        with_media = data[2]
+        self.assertEqual(with_media['image'], '/media/media_gallery/a.jpg')
+        self.assertTrue(with_media['media'][0]['media_url'].startswith('http://testserver/media/'))
+        self.assertIsNone(data[1]['author_id'])
+
+    def test_events_list_identical(self):
+        from django.utils import timezone
+        queryset = Post.objects.filter(post_type='event', event_date__gte=timezone.now()).order_by('event_date', 'id')
+        data = self.assert_matches_drf('/api/news/events/', queryset)
+        self.assertEqual([p['title'] for p in data], ['Upcoming'])
+
+    def test_list_queries_constant(self):
+        with self.assertNumQueries(2):
+            self.client.get('/api/news/list/')
+
+
+class PostCursorPaginationTests(TestCase):
+    """News and events lists are keyset-paginated: stable pages, no gaps or repeats."""
+
+    def setUp(self):
+        from django.utils import timezone
+        self.client = APIClient()
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="M300")
+        self.author = FamilyMember.objects.create(family=family, name="Author", relation="Head")
+        self.now = timezone.now()
+
+    def add_posts(self, count, created_at=None, **fields):
+        posts = Post.objects.bulk_create([
+            Post(creator=self.author, title=f"{fields.get('post_type', 'news')} {i}", **{'post_type': 'news', **fields})
+            for i in range(count)
+        ])
+        if created_at is not None:
+            Post.objects.filter(pk__in=[p.pk for p in posts]).update(created_at=created_at)
+        return posts
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [p['id'] for p in response.data['results']]
+            url, pages = response.data['next'], pages + 1
+        return ids, pages
+
+    def test_news_pages_follow_cursor(self):
+        self.add_posts(25)
+        self.add_posts(3, post_type='event', event_date=self.now + datetime.timedelta(days=1))
+        first = self.client.get('/api/news/list/')
+        self.assertEqual(len(first.data['results']), 10)
+        self.assertIsNone(first.data['previous'])
+        self.assertIn('cursor=', first.data['next'])
+
+        ids, pages = self.walk('/api/news/list/')
+        expected = list(
+            Post.objects.filter(post_type='news').order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_equal_timestamps_are_not_skipped(self):
+        # One shared created_at forces every page boundary onto a tie
+        self.add_posts(23, created_at=self.now - datetime.timedelta(hours=1))
+        ids, _ = self.walk('/api/news/list/?page_size=5')
+        self.assertEqual(len(ids), 23)
+        self.assertEqual(len(set(ids)), 23)
+
+    def test_events_soonest_first(self):
+        for days in (5, 1, 3, 2, 4):
+            self.add_posts(1, post_type='event', event_date=self.now + datetime.timedelta(days=days))
+        self.add_posts(1, post_type='event', event_date=self.now - datetime.timedelta(days=1))
+        ids, pages = self.walk('/api/news/events/?page_size=2')
+        dates = [Post.objects.get(pk=pk).event_date for pk in ids]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(pages, 3)
+
+    def test_page_size_capped(self):
+        self.add_posts(120)
+        response = self.client.get('/api/news/list/?page_size=500')
+        self.assertEqual(len(response.data['results']), 100)
+
+    def explain(self, queryset):
+        from django.db import connection
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_pages_are_index_scans(self):
+        from news.views import NewsListView, EventsListView
+        feed = NewsListView().get_queryset().order_by('-created_at', '-id')
+        plan = self.explain(feed.filter(created_at__lt=self.now)[:11])
+        self.assertIn('news_post_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        events = EventsListView().get_queryset().order_by('event_date', 'id')
+        plan = self.explain(events.filter(event_date__gt=self.now)[:11])
+        self.assertIn('news_post_events_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ChunkedUploadTests(TestCase):
+    """Init / PUT chunks / complete, with resume after a dropped connection."""
+
+    def setUp(self):
+        import hashlib
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="U100")
+        self.member = FamilyMember.objects.create(family=family, name="Uploader")
+        self.user = User.objects.create(username="uploader", email="up@e.com", member=self.member)
+        self.post = Post.objects.create(creator=self.member, post_type='event', title="Feast")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.data = bytes(range(256)) * 400
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+
+    def start(self, **fields):
+        payload = {'filename': 'feast.MP4', 'size': len(self.data), 'post': self.post.pk, 'caption': 'Procession', **fields}
+        response = self.client.post('/api/news/uploads/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return f"/api/news/uploads/{response.data['id']}/", response.data
+
+    def put(self, url, offset, data):
+        return self.client.put(url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_upload_in_chunks(self):
+        import hashlib
+        import os
+        from news.models import Media, Upload
+        from news.uploads import partial_path
+        url, data = self.start()
+        self.assertEqual((data['offset'], data['chunk_size']), (0, 2 * 1024 * 1024))
+
+        first = self.put(url, 0, self.data[:40000])
+        self.assertEqual(first.data, {'offset': 40000, 'size': len(self.data),
+                                      'chunk_sha256': hashlib.sha256(self.data[:40000]).hexdigest()})
+        # A retried or out-of-order chunk is told where the upload really is
+        conflict = self.put(url, 0, self.data[:10])
+        self.assertEqual((conflict.status_code, conflict.data['offset']), (409, 40000))
+        self.assertEqual(self.client.post(f"{url}complete/").status_code, 400)
+        self.assertEqual(self.put(url, 40000, self.data[40000:]).data['offset'], len(self.data))
+
+        upload = Upload.objects.get()
+        response = self.client.post(f"{url}complete/", {'sha256': self.sha256}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        media = Media.objects.get()
+        self.assertEqual((media.post, media.media_type, media.caption), (self.post, 'video', 'Procession'))
+        self.assertEqual(media.media_url.name, f"sha256/{self.sha256[:2]}/{self.sha256}.mp4")
+        with media.media_url.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(Upload.objects.exists())
+        self.assertFalse(os.path.exists(partial_path(upload)))
+
+    def test_resume_after_dropped_connection(self):
+        import io
+        from news import uploads
+        from news.models import Upload
+        url, _ = self.start()
+
+        class Dropped(io.BytesIO):
+            def read(self, size=-1):
+                if self.tell() >= 65536:
+                    raise OSError("connection reset")
+                return super().read(size)
+
+        upload = Upload.objects.get()
+        with self.assertRaises(uploads.IncompleteChunk) as dropped:
+            uploads.write_chunk(upload, Dropped(self.data), 0, len(self.data))
+        # The block that arrived before the drop is kept
+        self.assertEqual(dropped.exception.offset, 65536)
+        self.assertEqual(self.client.get(url).data['offset'], 65536)
+
+        self.put(url, 65536, self.data[65536:])
+        response = self.client.post(f"{url}complete/", {'sha256': self.sha256}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_concurrent_chunks_for_one_offset(self):
+        import io
+        from news import uploads
+        from news.models import Upload
+        self.start()
+        winner = self.data[:1000]
+        loser = bytes(reversed(self.data[:1000]))
+
+        class Racing(io.BytesIO):
+            """Another request for the same offset finishes while this one is still reading."""
+            raced = False
+
+            def read(self, size=-1):
+                if not self.raced:
+                    self.raced = True
+                    uploads.write_chunk(Upload.objects.get(), io.BytesIO(winner), 0, len(winner))
+                return super().read(size)
+
+        upload = Upload.objects.get()
+        with self.assertRaises(uploads.UploadConflict) as conflict:
+            uploads.write_chunk(upload, Racing(loser), 0, len(loser))
+        self.assertEqual(conflict.exception.offset, len(winner))
+        with open(uploads.partial_path(upload), 'rb') as partial:
+            self.assertEqual(partial.read(), winner)
+
+    def test_retried_complete_while_completing(self):
+        from news.models import Media, Upload
+        url, _ = self.start()
+        self.put(url, 0, self.data)
+        # The first request is still hashing and moving the file
+        Upload.objects.update(completing=True)
+        response = self.client.post(f"{url}complete/", {'sha256': self.sha256}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Media.objects.exists())
+
+        Upload.objects.update(completing=False)
+        self.assertEqual(self.client.post(f"{url}complete/", {'sha256': self.sha256}, format='json').status_code, 201)
+        self.assertEqual(self.client.post(f"{url}complete/", {'sha256': self.sha256}, format='json').status_code, 404)
+
+    def test_checksum_mismatch_rejected(self):
+        from files.models import StoredFile
+        from news.models import Media
+        url, _ = self.start()
+        self.put(url, 0, self.data)
+        response = self.client.post(f"{url}complete/", {'sha256': '0' * 64}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Media.objects.exists())
+        self.assertEqual(StoredFile.objects.get().refcount, 0)
+
+    def test_validation_and_ownership(self):
+        from news.tasks import purge_stale_uploads
+        from news.models import Upload
+        response = self.client.post('/api/news/uploads/', {'filename': 'setup.exe', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/news/uploads/', {'filename': 'a.jpg', 'size': 0}, format='json').status_code, 400)
+
+        url, _ = self.start()
+        self.assertEqual(self.put(url, 0, self.data + b'extra').status_code, 400)
+        self.assertEqual(self.client.put(url, self.data[:5], content_type='application/octet-stream').status_code, 400)
+
+        stranger = User.objects.create(username="stranger", email="s@e.com")
+        self.client.force_authenticate(user=stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        Upload.objects.update(updated_at=timezone.now() - datetime.timedelta(days=2))
+        self.assertEqual(purge_stale_uploads(), 1)
+        self.assertFalse(Upload.objects.exists())
+
+
+@override_settings(RESPONSE_CACHING=True)
+class ResponseCacheTests(TestCase):
+    """Public lists are served from the response cache until a write invalidates them."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="M500")
+        self.author = FamilyMember.objects.create(family=family, name="Author", relation="Head")
+        Post.objects.create(creator=self.author, post_type='news', title='First')
+
+    def test_second_read_is_a_hit_with_the_same_body(self):
+        first = self.client.get('/api/news/list/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/news/list/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get('/api/news/list/')
+        self.assertEqual(self.client.get('/api/news/list/?page_size=1')['X-Cache'], 'MISS')
+
+    def test_post_and_creator_writes_invalidate(self):
+        self.client.get('/api/news/list/')
+        Post.objects.create(creator=self.author, post_type='news', title='Second')
+        response = self.client.get('/api/news/list/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([p['title'] for p in response.json()['results']], ['Second', 'First'])
+
+        self.author.name = 'Renamed'
+        self.author.save()
+        response = self.client.get('/api/news/list/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['creator_name'], 'Renamed')
+
+    def test_events_share_the_news_group(self):
+        self.client.get('/api/news/events/')
+        Post.objects.create(
+            creator=self.author, post_type='event', title='Feast',
+            event_date=timezone.now() + datetime.timedelta(days=3),
+        )
+        response = self.client.get('/api/news/events/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([p['title'] for p in response.json()['results']], ['Feast'])
+
+    def test_login_saves_do_not_invalidate(self):
+        user = User.objects.create_user(username="reader", email="r@e.com", password="pass")
+        self.client.get('/api/news/list/')
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get('/api/news/list/')['X-Cache'], 'HIT')
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get('/api/news/list/', HTTP_ACCEPT='text/html')
+        self.assertNotIn('X-Cache', self.client.get('/api/news/list/', HTTP_ACCEPT='text/html'))
+
+    def test_counters(self):
+        reset_stats()
+        for _ in range(3):
+            self.client.get('/api/news/list/')
+        self.assertEqual(stats()['news-list'], {'hits': 2, 'misses': 1})
+
+        out = io.StringIO()
+        call_command('cache_stats', '--reset', stdout=out)
+        self.assertIn('news-list', out.getvalue())
+        self.assertIn('67%', out.getvalue())
+        self.assertEqual(stats()['news-list'], {'hits': 0, 'misses': 0})
+
+    @override_settings(RESPONSE_CACHING=False)
+    def test_disabled(self):
+        self.client.get('/api/news/list/')
+        self.assertNotIn('X-Cache', self.client.get('/api/news/list/'))
+
+
+class AsyncReadViewTests(TestCase):
+    """The ASGI read path renders exactly what the DRF views do."""
+
+    def setUp(self):
+        cache.clear()
+        family = Family.objects.create(sl_no="1", branch="Main", member_no="M600")
+        author = FamilyMember.objects.create(family=family, name="Author", relation="Head")
+        posts = Post.objects.bulk_create([
+            Post(creator=author, post_type='news', title=f"News {i}") for i in range(15)
+        ])
+        Media.objects.create(uploader=author, post=posts[0], media_url="media_gallery/a.jpg")
+        Post.objects.create(
+            creator=author, post_type='event', title='Feast',
+            event_date=timezone.now() + datetime.timedelta(days=3),
+        )
+
+    def sync_get(self, view_class, url):
+        response = view_class.as_view()(RequestFactory().get(url))
+        return response.render().content
+
+    async def test_lists_match_the_sync_views(self):
+        for view_class, url in [
+            (NewsListView, '/api/news/list/'),
+            (NewsListView, '/api/news/list/?page_size=4'),
+            (EventsListView, '/api/news/events/'),
+        ]:
+            response = await as_async_view(view_class)(AsyncRequestFactory().get(url))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, await sync_to_async(self.sync_get)(view_class, url))
+
+    async def test_next_page_follows_the_cursor(self):
+        view = as_async_view(NewsListView)
+        first = json.loads((await view(AsyncRequestFactory().get('/api/news/list/'))).content)
+        second = await view(AsyncRequestFactory().get(first['next']))
+        self.assertEqual(second.content, await sync_to_async(self.sync_get)(NewsListView, first['next']))
+        self.assertEqual(len(json.loads(second.content)['results']), 5)
+
+    @override_settings(RESPONSE_CACHING=True)
+    async def test_shares_the_response_cache(self):
+        view = as_async_view(NewsListView)
+        miss = await view(AsyncRequestFactory().get('/api/news/list/'))
+        self.assertEqual(miss['X-Cache'], 'MISS')
+        hit = await sync_to_async(APIClient().get)('/api/news/list/')
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit.content, miss.content)
+
+    async def test_other_requests_go_to_the_drf_view(self):
+        view = as_async_view(NewsListView)
+        html = await view(AsyncRequestFactory().get('/api/news/list/', headers={'Accept': 'text/html'}))
+        await sync_to_async(html.render)()
+        self.assertEqual(html['Content-Type'], 'text/html; charset=utf-8')
+        self.assertIn(b'<html', html.content)
+        post = await view(AsyncRequestFactory().post('/api/news/list/'))
+        self.assertEqual(post.status_code, 405)
@@ -0,0 +1,208 @@
+"""
+Chunked, resumable media uploads.
+
+    POST   /api/news/uploads/                 {filename, size, post?, caption?, is_personal_gallery?}
+           → 201 {id, offset: 0, chunk_size, ...}
+    PUT    /api/news/uploads/<id>/            raw bytes, `Upload-Offset: <offset>` header
+           → 200 {offset, chunk_sha256}       409 {error, offset} if the offset is not the current one
+    GET    /api/news/uploads/<id>/            → {offset, size, ...} to resume after a failure
+    POST   /api/news/uploads/<id>/complete/   {sha256?} → 201 Media       409 while already completing
+    DELETE /api/news/uploads/<id>/            abandon
+
+Each chunk is copied from the request stream in BLOCK_SIZE pieces and
+hashed on the way through, so memory stays bounded whatever the file
+size, then appended to a partial file under MEDIA_ROOT. When a connection drops mid-chunk,
+the bytes that did arrive are kept and counted, and the client resumes from
+the offset GET reports. Completing the upload hashes the whole file once,
+into its content-addressed name (files/storage.py), and moves it into
+storage without copying. Uploads idle for longer than UPLOAD_EXPIRY are
+deleted by news.tasks.purge_stale_uploads.
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from files import refs
+from .models import Media, Upload
+
+BLOCK_SIZE = 64 * 1024
+# Advertised to clients; small enough for a slow mobile link to finish one
+# chunk well inside gunicorn's 30 s worker timeout
+CHUNK_SIZE = 2 * 1024 * 1024
+MAX_CHUNK_SIZE = 4 * CHUNK_SIZE
+DEFAULT_MAX_UPLOAD_SIZE = 2 * 1024 ** 3
+UPLOAD_EXPIRY = timedelta(days=1)
+PARTIAL_DIR = '.uploads'               # dot-directory: never served under MEDIA_URL
+
+
+class UploadConflict(Exception):
+    """The chunk does not start where the upload currently ends."""
+
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}.")
+        self.offset = offset
+
+
+class IncompleteChunk(Exception):
+    """The request body ended early; `offset` bytes are stored."""
+
+    def __init__(self, offset):
+        super().__init__(f"Chunk ended early; upload is at offset {offset}.")
+        self.offset = offset
+
+
+class AlreadyCompleting(Exception):
+    """Another request is already completing this upload."""
+
+    def __init__(self):
+        super().__init__("Upload is already being completed.")
+
+
+class PartialFile(File):
+    """A finished partial file; storage moves it into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def max_upload_size():
+    return getattr(settings, 'NEWS_UPLOAD_MAX_SIZE', DEFAULT_MAX_UPLOAD_SIZE)
+
+
+def media_type_for(filename):
+    """'image' or 'video' from the file name, or None for anything else."""
+    content_type = mimetypes.guess_type(filename)[0] or ''
+    kind = content_type.split('/')[0]
+    return kind if kind in ('image', 'video') else None
+
+
+def partial_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, PARTIAL_DIR, f'{upload.pk}.part')
+
+
+def start(upload):
+    """Create the partial file for a new Upload row and schedule the expiry sweep."""
+    from .tasks import schedule_upload_sweep
+
+    os.makedirs(os.path.dirname(partial_path(upload)), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    schedule_upload_sweep()
+
+
+def write_chunk(upload, stream, offset, length):
+    """
+    Append `length` bytes from `stream` at `offset`; returns (new offset,
+    sha256 of the chunk). Raises UploadConflict when `offset` is not where
+    the upload ends, IncompleteChunk when the body stops short.
+
+    The body is spooled to an unnamed file first, without holding any lock
+    however slow the client. Only once the compare-and-set on `received`
+    has succeeded is it copied into the partial file, in the same
+    transaction, so two requests for one offset can never both write.
+    """
+    if offset != upload.received:
+        raise UploadConflict(upload.received)
+    if offset + length > upload.size:
+        raise ValueError("Chunk runs past the declared upload size.")
+
+    digest = hashlib.sha256()
+    written = 0
+    with tempfile.TemporaryFile(dir=os.path.dirname(partial_path(upload))) as chunk:
+        while written < length:
+            try:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+            except OSError:   # client went away (UnreadablePostError)
+                break
+            if not block:
+                break
+            chunk.write(block)
+            digest.update(block)
+            written += len(block)
+
+        new_offset = offset + written
+        with transaction.atomic():
+            # The UPDATE comes first so it takes the write lock on every
+            # backend (row lock on Postgres, database lock on SQLite): a
+            # concurrent request for the same offset waits here, then matches
+            # nothing. A failed copy rolls the offset back with it.
+            if not Upload.objects.filter(pk=upload.pk, received=offset).update(
+                received=new_offset, updated_at=timezone.now(),
+            ):
+                raise UploadConflict(Upload.objects.filter(pk=upload.pk).values_list('received', flat=True).first() or 0)
+            chunk.seek(0)
+            with open(partial_path(upload), 'r+b') as partial:
+                # Anything past the acknowledged offset is an earlier attempt's torn write
+                partial.seek(offset)
+                partial.truncate()
+                shutil.copyfileobj(chunk, partial, BLOCK_SIZE)
+                partial.flush()
+                os.fsync(partial.fileno())
+
+    upload.received = new_offset
+    if written < length:
+        raise IncompleteChunk(new_offset)
+    return new_offset, digest.hexdigest()
+
+
+def discard(upload):
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def complete(upload, expected_sha256=None):
+    """
+    Store the finished file content-addressed and create its Media row;
+    returns the Media. Raises AlreadyCompleting while another request
+    holds the upload's `completing` claim.
+
+    The whole file is hashed here, once, while storage names it (the move
+    itself is a rename). The per-chunk digests cannot be carried over:
+    hashlib's running state cannot be saved between requests, which may
+    land on different processes.
+    """
+    if upload.received != upload.size:
+        raise ValueError(f"Upload incomplete: {upload.received} of {upload.size} bytes received.")
+    # Claimed by a conditional UPDATE rather than a row lock held for the whole hash and move
+    if not Upload.objects.filter(pk=upload.pk, completing=False).update(completing=True, updated_at=timezone.now()):
+        raise AlreadyCompleting()
+
+    field = Media._meta.get_field('media_url')
+    path = partial_path(upload)
+    try:
+        with PartialFile(open(path, 'rb'), name=upload.filename) as partial:
+            name = field.storage.save(upload.filename, partial, max_length=field.max_length)
+    except BaseException:
+        Upload.objects.filter(pk=upload.pk).update(completing=False)
+        raise
+    if os.path.exists(path):
+        os.remove(path)   # identical content was already stored; the partial copy was not needed
+
+    if expected_sha256 and field.storage.digest(name) != expected_sha256.lower():
+        # Count and release a reference so the purge job collects the file unless other rows use it
+        refs.acquire(name, field.storage)
+        refs.release(name)
+        upload.delete()
+        raise ValueError("Checksum mismatch: the stored file does not match the sha256 sent.")
+
+    with transaction.atomic():
+        media = Media.objects.create(
+            uploader=upload.uploader,
+            post=upload.post,
+            media_url=name,
+            caption=upload.caption,
+            media_type=media_type_for(upload.filename),
+            is_personal_gallery=upload.is_personal_gallery,
+        )
+        upload.delete()
+    return media
@@ -1,9 +1,16 @@
 from django.urls import path
-from .views import EventsListView, NewsListView, NewsCreateView, NewsDetailView
+from backapi.asyncviews import read_view
+from .views import (
+    EventsListView, NewsListView, NewsCreateView, NewsDetailView,
+    UploadCreateView, UploadDetailView, UploadCompleteView,
+)
 
 urlpatterns = [
-    path('events/', EventsListView.as_view()),
-    path('list/', NewsListView.as_view()),
+    path('events/', read_view(EventsListView)),
+    path('list/', read_view(NewsListView)),
     path('create/', NewsCreateView.as_view()),
     path('<int:pk>/', NewsDetailView.as_view()),
+    path('uploads/', UploadCreateView.as_view()),
+    path('uploads/<uuid:pk>/', UploadDetailView.as_view()),
+    path('uploads/<uuid:pk>/complete/', UploadCompleteView.as_view()),
 ]
@@ -1,38 +1,53 @@
 from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Q
-from .models import Post
-from .serializers import PostSerializer
+from .models import Post, Upload
+from .serializers import PostSerializer, PostRowSerializer, MediaSerializer, UploadSerializer
+from . import uploads
+from backapi.cache import CachedResponseMixin, CachePolicy
+from backapi.fastserializers import RowListMixin
 from .permissions import IsAuthorOrReadOnly
+from .pagination import PostCursorPagination, EventCursorPagination
 
 
-class EventsListView(ListAPIView):
+class EventsListView(CachedResponseMixin, RowListMixin, ListAPIView):
+    cache_policy = CachePolicy('news-events', groups=('news',), timeout=60)
     serializer_class = PostSerializer
+    row_serializer_class = PostRowSerializer
+    pagination_class = EventCursorPagination
 
     def get_queryset(self):
         # Future events: post_type='event' AND event_date >= now
-        return Post.objects.filter(
+        return Post.objects.with_serializer_data().filter(
             post_type='event', 
             event_date__gte=timezone.now()
         ).order_by('event_date')
 
 
-class NewsListView(ListAPIView):
+class NewsListView(CachedResponseMixin, RowListMixin, ListAPIView):
+    cache_policy = CachePolicy('news-list', groups=('news',), timeout=60)
     serializer_class = PostSerializer
+    row_serializer_class = PostRowSerializer
+    pagination_class = PostCursorPagination
 
     def get_queryset(self):
-        # News items OR Past events
+        # News items OR Past events OR events with no date set, written as
+        # "everything but upcoming events": an OR across post_type makes the
+        # planner merge per-branch index lookups and sort the whole result,
+        # while the negated form walks news_post_feed_idx in order and stops
+        # after one page.
         now = timezone.now()
-        return Post.objects.filter(
-            Q(post_type='news') | 
-            Q(post_type='event', event_date__lt=now) |
-            Q(post_type='event', event_date__isnull=True) # Fallback if no date set
+        return Post.objects.with_serializer_data().exclude(
+            post_type='event', event_date__gte=now
         ).order_by('-created_at')
 
 
 class NewsCreateView(ListCreateAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_serializer_data()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated]
 
@@ -52,13 +67,82 @@ class NewsCreateView(ListCreateAPIView):
                     media_url=image,
                     media_type='image'
                 )
+                # Size variants are queued for a background worker (news.signals)
         else:
             from rest_framework.exceptions import ValidationError
             raise ValidationError({"error": "Your user account is not linked to a Family Member profile. Please contact an admin or complete your onboarding to post news."})
 
 
 class NewsDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Post.objects.all()
+    queryset = Post.objects.with_serializer_data()
     serializer_class = PostSerializer
     permission_classes = [IsAuthorOrReadOnly]
 
+
+class UploadCreateView(APIView):
+    """Start a chunked upload (protocol in news/uploads.py)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        member = getattr(request.user, 'member', None)
+        if member is None:
+            return Response({"error": "Your user account is not linked to a Family Member profile."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        post = serializer.validated_data.get('post')
+        if post is not None and post.creator_id != member.pk and not request.user.is_superuser:
+            return Response({"error": "You can only add media to your own posts."}, status=status.HTTP_403_FORBIDDEN)
+        upload = serializer.save(uploader=member)
+        uploads.start(upload)
+        return Response(UploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class UploadDetailView(APIView):
+    """Resume point (GET), one chunk (PUT with Upload-Offset) or abandon (DELETE)."""
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, request, pk):
+        return get_object_or_404(Upload, pk=pk, uploader=getattr(request.user, 'member', None))
+
+    def get(self, request, pk):
+        return Response(UploadSerializer(self.get_upload(request, pk)).data)
+
+    def put(self, request, pk):
+        upload = self.get_upload(request, pk)
+        try:
+            offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response({"error": "Upload-Offset and Content-Length headers are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < length <= uploads.MAX_CHUNK_SIZE:
+            return Response({"error": f"Chunks must be 1 to {uploads.MAX_CHUNK_SIZE} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # request.stream is the raw body; nothing here parses or buffers it
+            offset, digest = uploads.write_chunk(upload, request.stream, offset, length)
+        except uploads.UploadConflict as e:
+            return Response({"error": str(e), "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+        except uploads.IncompleteChunk as e:
+            return Response({"error": str(e), "offset": e.offset}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"offset": offset, "size": upload.size, "chunk_sha256": digest})
+
+    def delete(self, request, pk):
+        uploads.discard(self.get_upload(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadCompleteView(UploadDetailView):
+    """Turn a fully received upload into a Media row."""
+    http_method_names = ['post', 'options']
+
+    def post(self, request, pk):
+        upload = self.get_upload(request, pk)
+        try:
+            media = uploads.complete(upload, request.data.get('sha256'))
+        except uploads.AlreadyCompleting as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(MediaSerializer(media, context={'request': request}).data, status=status.HTTP_201_CREATED)
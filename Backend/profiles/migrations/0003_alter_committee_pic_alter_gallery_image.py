@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:26
+
+import files.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_alter_gallery_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='committee',
+            name='pic',
+            field=models.ImageField(storage=files.storage.content_storage, upload_to='committee/'),
+        ),
+        migrations.AlterField(
+            model_name='gallery',
+            name='image',
+            field=models.ImageField(storage=files.storage.content_storage, upload_to='gallery/'),
+        ),
+    ]
@@ -1,9 +1,11 @@
 from django.db import models
 from django.conf import settings
 
+from files.storage import content_storage
+
 
 class Gallery(models.Model):
-	image = models.ImageField(upload_to='gallery/')
+	image = models.ImageField(upload_to='gallery/', storage=content_storage)
 	date = models.DateField(null=True, blank=True)
 	description = models.TextField(blank=True)
 
@@ -16,7 +18,7 @@ class Gallery(models.Model):
 class Committee(models.Model):
 	# linked to a user (the 'other id' requested)
 	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='committee_entries')
-	pic = models.ImageField(upload_to='committee/')
+	pic = models.ImageField(upload_to='committee/', storage=content_storage)
 	role = models.TextField(blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 
@@ -1,11 +1,16 @@
 from rest_framework import serializers
+from backapi.fastserializers import RowSerializer, FileURL, date_value, datetime_value
+from backapi.imaging import ImageVariantsField, variant_urls
+from families.models import FamilyMember
 from .models import Gallery, Committee
 
 
 class GallerySerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source='image')
+
     class Meta:
         model = Gallery
-        fields = ('id', 'image', 'date', 'description', 'created_at')
+        fields = ('id', 'image', 'image_variants', 'date', 'description', 'created_at')
 
 
 class CommitteeSerializer(serializers.ModelSerializer):
@@ -13,6 +18,7 @@ class CommitteeSerializer(serializers.ModelSerializer):
     age = serializers.SerializerMethodField()
     phone_no = serializers.SerializerMethodField()
     pic = serializers.SerializerMethodField()
+    pic_variants = serializers.SerializerMethodField()
     
     def get_name(self, obj):
         # Try to find family member linked to this user
@@ -37,6 +43,78 @@ class CommitteeSerializer(serializers.ModelSerializer):
             return obj.user.member.photo.url
         return None
 
+    def get_pic_variants(self, obj):
+        # Variants of whichever image `pic` shows
+        if obj.pic:
+            return variant_urls(obj.pic.name)
+        if hasattr(obj.user, 'member') and obj.user.member and obj.user.member.photo:
+            return variant_urls(obj.user.member.photo.name)
+        return None
+
     class Meta:
         model = Committee
-        fields = ('id', 'user', 'name', 'pic', 'role', 'age', 'phone_no', 'created_at')
+        fields = ('id', 'user', 'name', 'pic', 'pic_variants', 'role', 'age', 'phone_no', 'created_at')
+
+
+# -- Read path for list endpoints (see backapi/fastserializers.py) -------------
+
+class GalleryRowSerializer(RowSerializer):
+    """Rows rendered exactly like GallerySerializer."""
+    fields = (
+        ('id', 'id', None),
+        ('image', 'image', FileURL(Gallery, 'image')),
+        ('image_variants', 'image', variant_urls),
+        ('date', 'date', date_value),
+        ('description', 'description', None),
+        ('created_at', 'created_at', datetime_value),
+    )
+
+
+_pic_url = FileURL(Committee, 'pic', absolute=False).bind(None)
+_photo_url = FileURL(FamilyMember, 'photo', absolute=False).bind(None)
+
+
+def _committee_name(row):
+    if row['user__member']:
+        return row['user__member__name']
+    full_name = f"{row['user__first_name']} {row['user__last_name']}".strip()
+    return full_name or row['user__username']
+
+
+def _committee_pic(row):
+    if row['pic']:
+        return _pic_url(row['pic'])
+    if row['user__member'] and row['user__member__photo']:
+        return _photo_url(row['user__member__photo'])
+    return None
+
+
+def _committee_pic_variants(row):
+    if row['pic']:
+        return variant_urls(row['pic'])
+    if row['user__member'] and row['user__member__photo']:
+        return variant_urls(row['user__member__photo'])
+    return None
+
+
+def _from_member(column):
+    return lambda row: row[column] if row['user__member'] else None
+
+
+class CommitteeRowSerializer(RowSerializer):
+    """Rows rendered exactly like CommitteeSerializer, user and member joined in."""
+    fields = (
+        ('id', 'id', None),
+        ('user', 'user', None),
+        ('name', None, _committee_name),
+        ('pic', None, _committee_pic),
+        ('pic_variants', None, _committee_pic_variants),
+        ('role', 'role', None),
+        ('age', None, _from_member('user__member__age')),
+        ('phone_no', None, _from_member('user__member__phone_no')),
+        ('created_at', 'created_at', datetime_value),
+    )
+    extra_columns = (
+        'pic', 'user__username', 'user__first_name', 'user__last_name', 'user__member',
+        'user__member__name', 'user__member__photo', 'user__member__age', 'user__member__phone_no',
+    )
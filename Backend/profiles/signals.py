@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from backapi.cache import invalidate
+from backapi.imaging import schedule_variants
+from families.models import FamilyMember
+from .models import Gallery, Committee
+
+# User saves that change nothing a committee entry shows
+IRRELEVANT_USER_FIELDS = {'last_login', 'password'}
+
+
+@receiver(post_save, sender=Gallery)
+def generate_gallery_variants(sender, instance, raw=False, **kwargs):
+	if not raw:
+		schedule_variants(instance.image)
+
+
+@receiver(post_save, sender=Committee)
+def generate_committee_pic_variants(sender, instance, raw=False, **kwargs):
+	if not raw:
+		schedule_variants(instance.pic)
+
+
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+def invalidate_gallery_on_write(sender, **kwargs):
+	invalidate('gallery')
+
+
+@receiver(post_save, sender=Committee)
+@receiver(post_delete, sender=Committee)
+@receiver(post_save, sender=FamilyMember)
+@receiver(post_delete, sender=FamilyMember)
+def invalidate_committee_on_write(sender, **kwargs):
+	# Committee entries show the linked member's name, age, phone and photo
+	invalidate('committee')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_committee_on_user_change(sender, update_fields=None, **kwargs):
+	"""Committee entries fall back to the user's name; skip login/password-only saves."""
+	if update_fields and set(update_fields) <= IRRELEVANT_USER_FIELDS:
+		return
+	invalidate('committee')
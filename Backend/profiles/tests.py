@@ -0,0 +1,212 @@
+from django.core.cache import cache
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+import datetime
+
+from families.models import Family, FamilyMember
+from profiles.models import Gallery, Committee
+from profiles.serializers import GallerySerializer, CommitteeSerializer
+from profiles.views import GalleryListCreateView, CommitteeListCreateView
+from backapi.asyncviews import as_async_view
+
+User = get_user_model()
+
+
+class ProfileListRowSerializerTests(TestCase):
+	"""Gallery and committee lists render with their ModelSerializer's exact JSON."""
+
+	def setUp(self):
+		self.client = APIClient()
+		family = Family.objects.create(sl_no="1", branch="Main", member_no="P100")
+		with_photo = FamilyMember.objects.create(
+			family=family, name="Member Photo", relation="Head", age=61, phone_no="123", photo="members/photos/m.jpg"
+		)
+		no_photo = FamilyMember.objects.create(family=family, name="Member Plain", relation="Son")
+		users = [
+			User.objects.create_user(username="u1", email="u1@e.com", password="pass", member=with_photo),
+			User.objects.create_user(username="u2", email="u2@e.com", password="pass", member=no_photo),
+			User.objects.create_user(username="u3", email="u3@e.com", password="pass", first_name="Ann", last_name="Lee"),
+			User.objects.create_user(username="u4", email="u4@e.com", password="pass"),
+		]
+		Committee.objects.create(user=users[0], pic="", role="President")
+		Committee.objects.create(user=users[1], pic="committee/p.jpg", role="Secretary")
+		Committee.objects.create(user=users[2], pic="", role="")
+		Committee.objects.create(user=users[3], pic="committee/q.jpg", role="Member")
+
+		Gallery.objects.create(image="gallery/1.jpg", date=datetime.date(2024, 5, 1), description="Feast")
+		Gallery.objects.create(image="gallery/2.jpg")
+
+	def assert_matches_drf(self, url, serializer_class, queryset):
+		response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		context = {'request': response.wsgi_request}
+		expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+		self.assertEqual(response.content, expected)
+		return response.json()
+
+	def test_gallery_list_identical(self):
+		data = self.assert_matches_drf(
+			'/api/profiles/gallery/', GallerySerializer, Gallery.objects.all().order_by('-created_at')
+		)
+		self.assertEqual(data[1]['image'], 'http://testserver/media/gallery/1.jpg')
+		self.assertIsNone(data[0]['date'])
+
+	def test_committee_list_identical(self):
+		data = self.assert_matches_drf(
+			'/api/profiles/committee/', CommitteeSerializer, Committee.objects.all().order_by('-created_at')
+		)
+		self.assertEqual(
+			[(c['name'], c['pic']) for c in data],
+			[("u4", "/media/committee/q.jpg"), ("Ann Lee", None),
+			 ("Member Plain", "/media/committee/p.jpg"), ("Member Photo", "/media/members/photos/m.jpg")],
+		)
+		self.assertEqual(data[3]['age'], 61)
+
+	def test_committee_list_single_query(self):
+		with self.assertNumQueries(1):
+			self.client.get('/api/profiles/committee/')
+
+
+class ImageVariantTests(TestCase):
+	"""Uploaded images get upright, metadata-free WebP/JPEG variants at fixed sizes."""
+
+	def setUp(self):
+		import shutil
+		import tempfile
+		from django.test import override_settings
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+		media = override_settings(MEDIA_ROOT=self.media_root)
+		media.enable()
+		self.addCleanup(media.disable)
+		self.client = APIClient()
+
+	def photo(self, size=(1200, 600), fmt='JPEG', mode='RGB', orientation=None):
+		import io
+		from PIL import Image
+		image = Image.new(mode, size, (200, 40, 40, 128)[:len(mode)])
+		exif = Image.Exif()
+		exif[0x010F] = "CameraMaker"
+		if orientation:
+			exif[0x0112] = orientation
+		buffer = io.BytesIO()
+		image.save(buffer, fmt, exif=exif.tobytes())
+		return buffer.getvalue()
+
+	def open_variant(self, name, variant, ext):
+		from django.core.files.storage import default_storage
+		from PIL import Image
+		from backapi.imaging import variant_name
+		with default_storage.open(variant_name(name, variant, ext)) as f:
+			image = Image.open(f)
+			image.load()
+		return image
+
+	def test_upload_generates_variants(self):
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		upload = SimpleUploadedFile('rotated.jpg', self.photo(orientation=6), content_type='image/jpeg')
+		response = self.client.post('/api/profiles/gallery/', {'image': upload, 'description': 'x'}, format='multipart')
+		self.assertEqual(response.status_code, 201)
+		# Variants are a background job, not part of the request
+		from jobs.models import Job
+		from jobs.worker import run_pending
+		self.assertEqual(Job.objects.get().task, 'backapi.imaging.ensure_variants')
+		self.assertEqual(run_pending(), 1)
+		name = Gallery.objects.get().image.name
+
+		# EXIF orientation 6 turns the 1200x600 sensor image upright to 600x1200; no enlargement
+		expected = {'thumb': (150, 300), 'card': (400, 800), 'full': (600, 1200)}
+		for variant, size in expected.items():
+			for ext, fmt in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+				image = self.open_variant(name, variant, ext)
+				self.assertEqual((image.format, image.size), (fmt, size))
+				self.assertEqual(dict(image.getexif()), {})
+
+		variants = response.json()['image_variants']
+		self.assertEqual(variants['thumb']['webp'], f"/media/derivatives/{name[:-4]}/thumb.webp")
+		self.assertEqual(set(variants), {'thumb', 'card', 'full'})
+
+	def test_transparent_png(self):
+		from django.core.files.base import ContentFile
+		from backapi.imaging import generate_variants
+		from django.core.files.storage import default_storage
+		name = default_storage.save('gallery/alpha.png', ContentFile(self.photo((500, 500), 'PNG', 'RGBA')))
+		self.assertEqual(len(generate_variants(name)), 6)
+		self.assertEqual(self.open_variant(name, 'thumb', 'webp').mode, 'RGBA')
+		self.assertEqual(self.open_variant(name, 'thumb', 'jpg').mode, 'RGB')
+
+	def test_non_image_is_skipped(self):
+		from django.core.files.base import ContentFile
+		from django.core.files.storage import default_storage
+		from backapi.imaging import generate_variants
+		name = default_storage.save('media_gallery/clip.mp4', ContentFile(b'\x00\x00\x00\x18ftypmp42' + b'\x00' * 64))
+		with self.assertLogs('backapi.imaging', 'WARNING'):
+			self.assertEqual(generate_variants(name), [])
+
+	def test_backfill_command(self):
+		from io import StringIO
+		from django.core.files.base import ContentFile
+		from django.core.files.storage import default_storage
+		from django.core.management import call_command
+		name = default_storage.save('gallery/old.jpg', ContentFile(self.photo()))
+		Gallery.objects.bulk_create([Gallery(image=name)])
+		out = StringIO()
+		call_command('generate_image_variants', '--model', 'profiles.Gallery', stdout=out)
+		self.assertIn("profiles.Gallery.image: 6 files written", out.getvalue())
+		self.assertEqual(self.open_variant(name, 'thumb', 'jpg').size, (300, 150))
+		call_command('generate_image_variants', '--model', 'profiles.Gallery', stdout=out)
+		self.assertIn("profiles.Gallery.image: 0 files written", out.getvalue())
+
+
+@override_settings(RESPONSE_CACHING=True)
+class ProfileResponseCacheTests(TestCase):
+	"""Gallery and committee lists are cached until their own data changes."""
+
+	def setUp(self):
+		cache.clear()
+		self.client = APIClient()
+		family = Family.objects.create(sl_no="1", branch="Main", member_no="P300")
+		self.member = FamilyMember.objects.create(family=family, name="Treasurer", relation="Head")
+		self.user = User.objects.create_user(username="t1", email="t1@e.com", password="pass", member=self.member)
+		Committee.objects.create(user=self.user, pic="", role="Treasurer")
+		Gallery.objects.create(image="gallery/1.jpg", description="One")
+
+	def test_gallery_write_invalidates_only_the_gallery(self):
+		self.client.get('/api/profiles/gallery/')
+		self.client.get('/api/profiles/committee/')
+		Gallery.objects.create(image="gallery/2.jpg", description="Two")
+
+		response = self.client.get('/api/profiles/gallery/')
+		self.assertEqual(response['X-Cache'], 'MISS')
+		self.assertEqual(len(response.json()), 2)
+		self.assertEqual(self.client.get('/api/profiles/gallery/')['X-Cache'], 'HIT')
+		self.assertEqual(self.client.get('/api/profiles/committee/')['X-Cache'], 'HIT')
+
+	def test_linked_member_change_invalidates_the_committee(self):
+		self.client.get('/api/profiles/committee/')
+		self.member.name = "New Treasurer"
+		self.member.save()
+		response = self.client.get('/api/profiles/committee/')
+		self.assertEqual(response['X-Cache'], 'MISS')
+		self.assertEqual(response.json()[0]['name'], "New Treasurer")
+
+	def test_posting_is_not_cached(self):
+		self.client.get('/api/profiles/gallery/')
+		response = self.client.post('/api/profiles/gallery/', {'description': 'No image'})
+		self.assertNotIn('X-Cache', response)
+
+	async def test_async_views_match_the_sync_views(self):
+		for view_class, url in [
+			(GalleryListCreateView, '/api/profiles/gallery/'),
+			(CommitteeListCreateView, '/api/profiles/committee/'),
+		]:
+			with override_settings(RESPONSE_CACHING=False):
+				expected = await sync_to_async(lambda: view_class.as_view()(RequestFactory().get(url)).render().content)()
+			response = await as_async_view(view_class)(AsyncRequestFactory().get(url))
+			self.assertEqual(response.content, expected)
+			self.assertEqual(response['X-Cache'], 'MISS')
+			hit = await as_async_view(view_class)(AsyncRequestFactory().get(url))
+			self.assertEqual((hit['X-Cache'], hit.content), ('HIT', expected))
@@ -1,7 +1,8 @@
 from django.urls import path
+from backapi.asyncviews import read_view
 from .views import GalleryListCreateView, CommitteeListCreateView
 
 urlpatterns = [
-    path('gallery/', GalleryListCreateView.as_view()),
-    path('committee/', CommitteeListCreateView.as_view()),
+    path('gallery/', read_view(GalleryListCreateView)),
+    path('committee/', read_view(CommitteeListCreateView)),
 ]
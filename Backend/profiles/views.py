@@ -1,16 +1,22 @@
 from rest_framework.generics import ListCreateAPIView
 from rest_framework.permissions import AllowAny
 from .models import Gallery, Committee
-from .serializers import GallerySerializer, CommitteeSerializer
+from .serializers import GallerySerializer, CommitteeSerializer, GalleryRowSerializer, CommitteeRowSerializer
+from backapi.cache import CachedResponseMixin, CachePolicy
+from backapi.fastserializers import RowListMixin
 
 
-class GalleryListCreateView(ListCreateAPIView):
+class GalleryListCreateView(CachedResponseMixin, RowListMixin, ListCreateAPIView):
+	cache_policy = CachePolicy('gallery', groups=('gallery',), timeout=300)
 	queryset = Gallery.objects.all().order_by('-created_at')
 	serializer_class = GallerySerializer
+	row_serializer_class = GalleryRowSerializer
 	permission_classes = [AllowAny]
 
 
-class CommitteeListCreateView(ListCreateAPIView):
+class CommitteeListCreateView(CachedResponseMixin, RowListMixin, ListCreateAPIView):
+	cache_policy = CachePolicy('committee', groups=('committee',), timeout=300)
 	queryset = Committee.objects.all().order_by('-created_at')
 	serializer_class = CommitteeSerializer
+	row_serializer_class = CommitteeRowSerializer
 	permission_classes = [AllowAny]
@@ -6,6 +6,7 @@ export const useFamilyStore = defineStore('family', {
   state: () => ({
     members: [] as FamilyMember[],
     links: [] as any[], // Add links state
+    version: null as number | null, // Tree version the persisted data was built from
     loading: false,
     error: null as string | null
   }),
@@ -20,6 +21,11 @@ export const useFamilyStore = defineStore('family', {
       const apiBase = config.public.apiBase || 'http://localhost:8000'
 
       try {
+        // Returning visitors: only download what changed since the persisted version
+        if (this.version !== null && this.members.length && await this.syncChanges(apiBase)) {
+          return
+        }
+
         const response = await fetch(`${apiBase}/api/families/tree/`, {
              // Add Auth header if needed, but tree might be public or read-only
              // credentials: 'include' 
@@ -29,6 +35,8 @@ export const useFamilyStore = defineStore('family', {
             // Data is { nodes: [], links: [] }
             this.members = data.nodes || []
             this.links = data.links || [] // Store links
+            const version = response.headers.get('X-Tree-Version')
+            this.version = version ? Number(version) : null
         } else {
             this.error = 'Failed to load family data'
         }
@@ -40,6 +48,33 @@ export const useFamilyStore = defineStore('family', {
       }
     },
 
+    // Apply /tree/changes/ delta; returns false when a full reload is needed
+    async syncChanges(apiBase: string): Promise<boolean> {
+      const response = await fetch(`${apiBase}/api/families/tree/changes/?since=${this.version}`)
+      if (!response.ok) return false
+      const delta = await response.json()
+      if (delta.resync) return false
+
+      const linkKey = (l: any) => `${l.source}:${l.target}:${l.type}`
+      const removedNodes = new Set<number>(delta.nodes.removed)
+      const changedNodes = new Map<number, FamilyMember>()
+      for (const node of [...delta.nodes.updated, ...delta.nodes.added]) changedNodes.set(node.id, node)
+
+      const members = this.members
+        .filter(m => !removedNodes.has(m.id))
+        .map(m => changedNodes.get(m.id) ?? m)
+      const known = new Set(members.map(m => m.id))
+      for (const node of delta.nodes.added) {
+        if (!known.has(node.id)) members.push(node)
+      }
+
+      const removedLinks = new Set(delta.links.removed.map(linkKey))
+      this.members = members
+      this.links = [...this.links.filter(l => !removedLinks.has(linkKey(l))), ...delta.links.added]
+      this.version = delta.version
+      return true
+    },
+
     // find member by id
     findById(id: number): FamilyMember | undefined {
       return this.members.find(m => m.id === id)